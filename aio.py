@@ -0,0 +1,109 @@
+"""
+Exchange of compounds over asyncio streams (Python 3.6+ only).
+"""
+
+import asyncio
+
+from pyBTC.btc import *
+
+# Size of the write batches of write_compounds in bytes
+AIO_BATCH_SIZE = 1 << 16
+
+def encodeFrame(buf, compound):
+    """
+    Append a compound as frame: the payload length as IntVar and the
+    serialized compound.
+
+    Args:
+        buf: bytearray object.
+        compound: BTagCompound object.
+    """
+
+    payload = compound.to_bytes()
+    encodeIntVar(buf, len(payload))
+    buf += payload
+
+async def read_compound(reader, lazy=False, max_size=None):
+    """
+    Read the next frame of a stream and decode its compound. Returns None
+    if the stream ends before a frame.
+
+    Args:
+        reader: asyncio.StreamReader object.
+        lazy: Decode the entries of the compound on access.
+        max_size: Largest accepted payload in bytes (default: unlimited).
+    """
+
+    try:
+        type_val = await reader.readexactly(1)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise EOFError("Unexpected end of stream!")
+    try:
+        size = INTVAR_SIZES.get(type_val[0])
+        if size is None:
+            raise ValueError("Invalid frame length!")
+        length = decodeIntVar(type_val + await reader.readexactly(size), 0)[0]
+        if max_size is not None and length > max_size:
+            raise ValueError("Frame of "+str(length)+" bytes exceeds the "
+                             "maximum size of "+str(max_size)+" bytes!")
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise EOFError("Unexpected end of stream!")
+    return BTagCompound.from_bytes(payload, lazy=lazy)
+
+async def iter_compounds(reader, lazy=False, max_size=None):
+    """
+    Iterate over the compounds of a stream up to its end.
+
+    Usage:
+        async for compound in iter_compounds(reader):
+            ...
+    """
+
+    while True:
+        compound = await read_compound(reader, lazy, max_size)
+        if compound is None:
+            return
+        yield compound
+
+async def write_compound(writer, compound, drain=True):
+    """
+    Write a compound as frame. With drain the call waits until the write
+    buffer of the transport is below its high-water mark (backpressure).
+
+    Args:
+        writer: asyncio.StreamWriter object.
+        compound: BTagCompound object.
+        drain: Wait for the write buffer to drain.
+    """
+
+    buf = bytearray()
+    encodeFrame(buf, compound)
+    writer.write(bytes(buf))
+    if drain:
+        await writer.drain()
+
+async def write_compounds(writer, compounds, batch_size=AIO_BATCH_SIZE):
+    """
+    Write many compounds as frames. The frames are joined into batches of
+    about batch_size bytes, each written with a single call followed by
+    drain.
+
+    Args:
+        writer: asyncio.StreamWriter object.
+        compounds: Iterable of BTagCompound objects.
+        batch_size: Size of the write batches in bytes.
+    """
+
+    buf = bytearray()
+    for compound in compounds:
+        encodeFrame(buf, compound)
+        if len(buf) >= batch_size:
+            writer.write(bytes(buf))
+            del buf[:]
+            await writer.drain()
+    if buf:
+        writer.write(bytes(buf))
+    await writer.drain()
@@ -2,9 +2,12 @@
 The binary tag coumpound object.
 """
 
-import bisect
+import array
+import importlib
+import itertools
 
 from pyBTC.serialization import *
+from pyBTC.serialization import _UINT8, _toNative
 
 class DataType(object):
     """
@@ -26,21 +29,38 @@ class DataType(object):
     UINT64_ARR = 68
     FLOAT_ARR = 69
     DOUBLE_ARR = 70
+    # Array compressed with a stdlib codec (see pyBTC.compression)
+    COMPRESSED_ARR = 71
+    # Integer arrays in the delta zigzag varint representation
+    UINT32_DELTA_ARR = 72
+    UINT64_DELTA_ARR = 73
+    # Marks the end of a compound whose entry count is unknown (INTVAR_UNKNOWN)
+    END = 255
 
 class ABTag(object):
     """
     Abstract base class of all BTag objects.
     """
 
+    __slots__ = ('_data',)
+
     def __init__(self, obj_value):
         self._data = obj_value
 
+    def __getstate__(self):
+        # Objects with __slots__ have no __dict__ for the older pickle
+        # protocols
+        return (self._data,)
+
+    def __setstate__(self, state):
+        self._data, = state
+
     def get_type_id(self):
         """
         Get the identifier for the data type.
         """
 
-        raise Exception("Not implemented!"+self.__class__)
+        raise Exception("Not implemented!"+str(self.__class__))
 
     def get_data(self):
         """
@@ -54,27 +74,66 @@ class ABTag(object):
         Serialize the object to the stream.
         """
 
-        raise Exception("Not implemented!"+self.__class__)
+        raise Exception("Not implemented!"+str(self.__class__))
 
     def deserialize(self, instream):
         """
         Deserialize the object from stream.
         """
 
-        raise Exception("Not implemented!"+self.__class__)
+        raise Exception("Not implemented!"+str(self.__class__))
+
+    def serialize_into(self, buf):
+        """
+        Append the serialized object to a bytearray.
+        """
+
+        raise Exception("Not implemented!"+str(self.__class__))
+
+    def deserialize_from(self, buf, offset, copy=True):
+        """
+        Deserialize the object from a buffer (bytes, bytearray, memoryview,
+        mmap) at offset and return the offset behind it.
+        If not copy, integer arrays become read-only views into the buffer.
+        """
+
+        raise Exception("Not implemented!"+str(self.__class__))
+
+    def to_bytes(self):
+        """
+        Get the serialized object as a single bytes object.
+        """
+
+        buf = bytearray()
+        self.serialize_into(buf)
+        return bytes(buf)
+
+    @classmethod
+    def from_bytes(cls, buf, offset=0, copy=True):
+        """
+        Create an object from its serialized representation in a buffer.
+        With copy=False integer arrays are read-only numpy views into buf
+        (e.g. a mmap of a file) instead of copies.
+        """
+
+        obj = cls()
+        obj.deserialize_from(buf, offset, copy)
+        return obj
 
     def to_string(self, increment):
         """
         Get a string representation of the object.
         """
 
-        raise Exception("Not implemented!"+self.__class__)
+        raise Exception("Not implemented!"+str(self.__class__))
 
 class BTagByte(ABTag):
     """
     BTagBase class for the unsigned char type.
     """
 
+    __slots__ = ()
+
     def __init__(self, byte_value=0):
         super(BTagByte, self).__init__(byte_value)
 
@@ -87,6 +146,13 @@ class BTagByte(ABTag):
     def deserialize(self, instream):
         self._data = deserializeByte(instream)
 
+    def serialize_into(self, buf):
+        encodeByte(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeByte(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "b{"+str(self._data)+"}"
 
@@ -98,6 +164,8 @@ class BTagShort(ABTag):
     BTagBase class for the unsigned short type.
     """
 
+    __slots__ = ()
+
     def __init__(self, short_value=0):
         super(BTagShort, self).__init__(short_value)
 
@@ -110,6 +178,13 @@ class BTagShort(ABTag):
     def deserialize(self, instream):
         self._data = deserializeShort(instream)
 
+    def serialize_into(self, buf):
+        encodeShort(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeShort(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "s{"+str(self._data)+"}"
 
@@ -121,6 +196,8 @@ class BTagInt(ABTag):
     BTagBase class for the unsigned long type.
     """
 
+    __slots__ = ()
+
     def __init__(self, int_value=0):
         super(BTagInt, self).__init__(int_value)
 
@@ -133,6 +210,13 @@ class BTagInt(ABTag):
     def deserialize(self, instream):
         self._data = deserializeInt(instream)
 
+    def serialize_into(self, buf):
+        encodeInt(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeInt(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "i{"+str(self._data)+"}"
 
@@ -144,6 +228,8 @@ class BTagLong(ABTag):
     BTagBase class for the unsigned long long type.
     """
 
+    __slots__ = ()
+
     def __init__(self, long_value=0):
         super(BTagLong, self).__init__(long_value)
 
@@ -156,6 +242,13 @@ class BTagLong(ABTag):
     def deserialize(self, instream):
         self._data = deserializeLong(instream)
 
+    def serialize_into(self, buf):
+        encodeLong(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeLong(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "l{"+str(self._data)+"}"
 
@@ -167,6 +260,8 @@ class BTagFloat(ABTag):
     BTagBase class for the float type.
     """
 
+    __slots__ = ()
+
     def __init__(self, float_value=0.):
         super(BTagFloat, self).__init__(float_value)
 
@@ -179,6 +274,13 @@ class BTagFloat(ABTag):
     def deserialize(self, instream):
         self._data = deserializeFloat(instream)
 
+    def serialize_into(self, buf):
+        encodeFloat(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeFloat(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "f{"+str(self._data)+"}"
 
@@ -190,6 +292,8 @@ class BTagDouble(ABTag):
     BTagBase class for the double type.
     """
 
+    __slots__ = ()
+
     def __init__(self, double_value=0.):
         super(BTagDouble, self).__init__(double_value)
 
@@ -202,6 +306,13 @@ class BTagDouble(ABTag):
     def deserialize(self, instream):
         self._data = deserializeDouble(instream)
 
+    def serialize_into(self, buf):
+        encodeDouble(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeDouble(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "d{"+str(self._data)+"}"
 
@@ -213,6 +324,8 @@ class BTagString(ABTag):
     BTagBase class for the string type.
     """
 
+    __slots__ = ()
+
     def __init__(self, string_value=""):
         super(BTagString, self).__init__(string_value)
 
@@ -225,19 +338,40 @@ class BTagString(ABTag):
     def deserialize(self, instream):
         self._data = deserializeString(instream)
 
+    def serialize_into(self, buf):
+        encodeString(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeString(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "st{\""+str(self._data)+"\"}"
 
     def __str__(self):
         return self.to_string(0)
 
+def _arraySequence(array):
+    """
+    Check the data of an array tag. A tag can be serialized any number of
+    times, so iterables of chunks are refused, they can only be written
+    once by the serialize*Array functions or BTagStreamWriter.write_array.
+    """
+
+    if not hasattr(array, '__len__'):
+        raise ValueError("Array tags need a sequence, use "
+                         "BTagStreamWriter.write_array for chunks!")
+    return array
+
 class BTagByteArr(ABTag):
     """
     BTagBase class for the unsigned char* type.
     """
 
+    __slots__ = ()
+
     def __init__(self, byte_array=[]):
-        super(BTagByteArr, self).__init__(byte_array)
+        super(BTagByteArr, self).__init__(_arraySequence(byte_array))
 
     def get_type_id(self):
         return DataType.UINT8_ARR
@@ -245,8 +379,15 @@ class BTagByteArr(ABTag):
     def serialize(self, outstream):
         serializeByteArray(outstream, self._data)
 
-    def deserialize(self, instream):
-        self._data = deserializeByteArray(instream)
+    def deserialize(self, instream, out=None):
+        self._data = deserializeByteArray(instream, out)
+
+    def serialize_into(self, buf):
+        encodeByteArray(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeByteArray(buf, offset, copy)
+        return offset
 
     def to_string(self, increment):
         return "ba{len="+str(len(self._data))+"}"
@@ -259,8 +400,10 @@ class BTagShortArr(ABTag):
     BTagBase class for the unsigned short type.
     """
 
+    __slots__ = ()
+
     def __init__(self, short_array=[]):
-        super(BTagShortArr, self).__init__(short_array)
+        super(BTagShortArr, self).__init__(_arraySequence(short_array))
 
     def get_type_id(self):
         return DataType.UINT16_ARR
@@ -268,8 +411,15 @@ class BTagShortArr(ABTag):
     def serialize(self, outstream):
         serializeShortArray(outstream, self._data)
 
-    def deserialize(self, instream):
-        self._data = deserializeShortArray(instream)
+    def deserialize(self, instream, out=None):
+        self._data = deserializeShortArray(instream, out)
+
+    def serialize_into(self, buf):
+        encodeShortArray(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeShortArray(buf, offset, copy)
+        return offset
 
     def to_string(self, increment):
         return "sa{len="+str(len(self._data))+"}"
@@ -282,8 +432,10 @@ class BTagIntArr(ABTag):
     BTagBase class for the unsigned long type.
     """
 
+    __slots__ = ()
+
     def __init__(self, int_array=[]):
-        super(BTagIntArr, self).__init__(int_array)
+        super(BTagIntArr, self).__init__(_arraySequence(int_array))
 
     def get_type_id(self):
         return DataType.UINT32_ARR
@@ -291,8 +443,15 @@ class BTagIntArr(ABTag):
     def serialize(self, outstream):
         serializeIntArray(outstream, self._data)
 
-    def deserialize(self, instream):
-        self._data = deserializeIntArray(instream)
+    def deserialize(self, instream, out=None):
+        self._data = deserializeIntArray(instream, out)
+
+    def serialize_into(self, buf):
+        encodeIntArray(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeIntArray(buf, offset, copy)
+        return offset
 
     def to_string(self, increment):
         return "ia{len="+str(len(self._data))+"}"
@@ -305,8 +464,10 @@ class BTagLongArr(ABTag):
     BTagBase class for the unsigned long long type.
     """
 
+    __slots__ = ()
+
     def __init__(self, long_array=[]):
-        super(BTagLongArr, self).__init__(long_array)
+        super(BTagLongArr, self).__init__(_arraySequence(long_array))
 
     def get_type_id(self):
         return DataType.UINT64_ARR
@@ -314,8 +475,15 @@ class BTagLongArr(ABTag):
     def serialize(self, outstream):
         serializeLongArray(outstream, self._data)
 
-    def deserialize(self, instream):
-        self._data = deserializeLongArray(instream)
+    def deserialize(self, instream, out=None):
+        self._data = deserializeLongArray(instream, out)
+
+    def serialize_into(self, buf):
+        encodeLongArray(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeLongArray(buf, offset, copy)
+        return offset
 
     def to_string(self, increment):
         return "la{len="+str(len(self._data))+"}"
@@ -328,8 +496,10 @@ class BTagFloatArr(ABTag):
     BTagBase class for the float type.
     """
 
+    __slots__ = ()
+
     def __init__(self, float_array=[]):
-        super(BTagFloatArr, self).__init__(float_array)
+        super(BTagFloatArr, self).__init__(_arraySequence(float_array))
 
     def get_type_id(self):
         return DataType.FLOAT_ARR
@@ -337,8 +507,15 @@ class BTagFloatArr(ABTag):
     def serialize(self, outstream):
         serializeFloatArray(outstream, self._data)
 
-    def deserialize(self, instream):
-        self._data = deserializeFloatArray(instream)
+    def deserialize(self, instream, out=None):
+        self._data = deserializeFloatArray(instream, out)
+
+    def serialize_into(self, buf):
+        encodeFloatArray(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeFloatArray(buf, offset)
+        return offset
 
     def to_string(self, increment):
         return "fa{len="+str(len(self._data))+"}"
@@ -351,8 +528,10 @@ class BTagDoubleArr(ABTag):
     BTagBase class for the double type.
     """
 
+    __slots__ = ()
+
     def __init__(self, double_array=[]):
-        super(BTagDoubleArr, self).__init__(double_array)
+        super(BTagDoubleArr, self).__init__(_arraySequence(double_array))
 
     def get_type_id(self):
         return DataType.DOUBLE_ARR
@@ -360,8 +539,15 @@ class BTagDoubleArr(ABTag):
     def serialize(self, outstream):
         serializeDoubleArray(outstream, self._data)
 
-    def deserialize(self, instream):
-        self._data = deserializeDoubleArray(instream)
+    def deserialize(self, instream, out=None):
+        self._data = deserializeDoubleArray(instream, out)
+
+    def serialize_into(self, buf):
+        encodeDoubleArray(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeDoubleArray(buf, offset)
+        return offset
 
     def to_string(self, increment):
         return "da{len="+str(len(self._data))+"}"
@@ -374,6 +560,8 @@ class BTagStringArr(ABTag):
     BTagBase class for the string type.
     """
 
+    __slots__ = ()
+
     def __init__(self, string_array=[]):
         super(BTagStringArr, self).__init__(string_array)
 
@@ -386,62 +574,515 @@ class BTagStringArr(ABTag):
     def deserialize(self, instream):
         self._data = deserializeStringArray(instream)
 
+    def serialize_into(self, buf):
+        encodeStringArray(buf, self._data)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeStringArray(buf, offset)
+        return offset
+
     def to_string(self, increment):
         return "sta{len="+str(len(self._data))+"}"
 
     def __str__(self):
         return self.to_string(0)
 
+class BTagDeltaIntArr(BTagIntArr):
+    """
+    BTagBase class for the unsigned long type, stored as delta zigzag
+    varints (compact for sorted or slowly changing values).
+    """
+
+    __slots__ = ()
+
+    def get_type_id(self):
+        return DataType.UINT32_DELTA_ARR
+
+    def serialize(self, outstream):
+        serializeDeltaArray(outstream, self._data, 4)
+
+    def deserialize(self, instream):
+        self._data = deserializeDeltaArray(instream, 4)
+
+    def serialize_into(self, buf):
+        encodeDeltaArray(buf, self._data, 4)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeDeltaArray(buf, offset, 4)
+        return offset
+
+    def to_string(self, increment):
+        return "dia{len="+str(len(self._data))+"}"
+
+class BTagDeltaLongArr(BTagLongArr):
+    """
+    BTagBase class for the unsigned long long type, stored as delta zigzag
+    varints (compact for sorted or slowly changing values).
+    """
+
+    __slots__ = ()
+
+    def get_type_id(self):
+        return DataType.UINT64_DELTA_ARR
+
+    def serialize(self, outstream):
+        serializeDeltaArray(outstream, self._data, 8)
+
+    def deserialize(self, instream):
+        self._data = deserializeDeltaArray(instream, 8)
+
+    def serialize_into(self, buf):
+        encodeDeltaArray(buf, self._data, 8)
+
+    def deserialize_from(self, buf, offset, copy=True):
+        self._data, offset = decodeDeltaArray(buf, offset, 8)
+        return offset
+
+    def to_string(self, increment):
+        return "dla{len="+str(len(self._data))+"}"
+
+def selectIntArrayTag(int_arr, itemsize):
+    """
+    Create the tag for an unsigned integer array of 4 or 8 byte elements
+    with the smaller representation: plain or delta zigzag varints.
+    """
+
+    if itemsize == 4:
+        plain_class, delta_class = BTagIntArr, BTagDeltaIntArr
+    elif itemsize == 8:
+        plain_class, delta_class = BTagLongArr, BTagDeltaLongArr
+    else:
+        raise ValueError("Delta arrays need 4 or 8 byte elements!")
+    # The delta representation has an additional IntVar for the payload size
+    if deltaArraySize(int_arr, itemsize) + 9 < len(int_arr)*itemsize:
+        return delta_class(int_arr)
+    return plain_class(int_arr)
+
+# Type dispatch tables, filled by registerTagType:
+# type id -> tag class
+_TAG_CLASSES = {}
+# type id -> function(instream) returning the decoded value
+_DECODERS = {}
+# type id -> function(buf, offset, copy) returning (decoded value, offset)
+_BUFFER_DECODERS = {}
+# type id -> function(buf, offset) returning the offset behind the value
+_SKIPPERS = {}
+# type id -> function(instream) moving the stream behind the value
+_STREAM_SKIPPERS = {}
+
+def registerTagType(type_id, tag_class, decoder=None, buffer_decoder=None,
+                    skipper=None, stream_skipper=None):
+    """
+    Register a tag class for a data type id. Compounds decode entries of
+    this type with the given functions, so new types take the same table
+    driven path as the built-in ones.
+
+    Args:
+        type_id: Data type identifier (0 <= type_id < 256) which is
+            returned by get_type_id of the tag objects.
+        tag_class: ABTag subclass which can be constructed without args.
+        decoder: function(instream) returning the decoded tag object.
+            Defaults to calling deserialize on a new tag_class object.
+        buffer_decoder: function(buf, offset, copy) returning the decoded
+            tag object and the offset behind it. Defaults to calling
+            deserialize_from on a new tag_class object.
+        skipper: function(buf, offset) returning the offset behind the
+            value without decoding it. Defaults to decoding the value.
+        stream_skipper: function(instream) moving the stream behind the
+            value without decoding it. Defaults to decoding the value.
+    """
+
+    if decoder is None:
+        def decoder(instream):
+            obj = tag_class()
+            obj.deserialize(instream)
+            return obj
+    if buffer_decoder is None:
+        def buffer_decoder(buf, offset, copy):
+            obj = tag_class()
+            offset = obj.deserialize_from(buf, offset, copy)
+            return obj, offset
+    _TAG_CLASSES[type_id] = tag_class
+    _DECODERS[type_id] = decoder
+    _BUFFER_DECODERS[type_id] = buffer_decoder
+    if skipper is None:
+        _SKIPPERS.pop(type_id, None)
+    else:
+        _SKIPPERS[type_id] = skipper
+    if stream_skipper is None:
+        _STREAM_SKIPPERS.pop(type_id, None)
+    else:
+        _STREAM_SKIPPERS[type_id] = stream_skipper
+
+# Data types which are registered by another module, it is imported on the
+# first use of the type
+_TYPE_MODULES = {DataType.COMPRESSED_ARR: 'pyBTC.compression'}
+
+def _unknownType(type_id):
+    return ValueError("Unknown data type "+str(type_id)+"!")
+
+def _registered(table, type_id):
+    """
+    Get the function of a data type from a dispatch table, the module of a
+    type which is not registered yet is imported first.
+    """
+
+    function = table.get(type_id)
+    if function is None and type_id in _TYPE_MODULES:
+        importlib.import_module(_TYPE_MODULES[type_id])
+        function = table.get(type_id)
+    if function is None:
+        raise _unknownType(type_id)
+    return function
+
+# Sizes of the fixed-width data types and array elements in bytes
+FIXED_SIZES = {DataType.UINT8: 1, DataType.UINT16: 2, DataType.UINT32: 4,
+               DataType.UINT64: 8, DataType.FLOAT: 4, DataType.DOUBLE: 8}
+ITEM_SIZES = {DataType.UINT8_ARR: 1, DataType.UINT16_ARR: 2,
+              DataType.UINT32_ARR: 4, DataType.UINT64_ARR: 8,
+              DataType.FLOAT_ARR: 4, DataType.DOUBLE_ARR: 8}
+
+def arrayTypeOf(array):
+    """
+    Get the data type of an array from its numpy dtype or its elements.
+    Signed integers are stored as the unsigned type of the same size, so
+    arrays with negative values are refused.
+    """
+
+    dtype = getattr(array, 'dtype', None)
+    if dtype is not None and dtype.kind != 'O':
+        if dtype.kind in 'US':
+            return DataType.STRING_ARR
+        if dtype.kind == 'i' and len(array) > 0 and array.min() < 0:
+            raise ValueError("Negative values cannot be stored as unsigned "
+                             "integers!")
+        if dtype.kind in 'ui':
+            return {1: DataType.UINT8_ARR, 2: DataType.UINT16_ARR,
+                    4: DataType.UINT32_ARR,
+                    8: DataType.UINT64_ARR}[dtype.itemsize]
+        if dtype.kind == 'f':
+            if dtype.itemsize <= 4:
+                return DataType.FLOAT_ARR
+            return DataType.DOUBLE_ARR
+    elif hasattr(array, '__len__') and len(array) > 0:
+        if isinstance(array[0], (str, bytes, type(u''))):
+            return DataType.STRING_ARR
+        if isinstance(array[0], float):
+            return DataType.DOUBLE_ARR
+    raise ValueError("Cannot determine the data type of the array!")
+
+def deserializeValue(instream, type_id):
+    """
+    Deserialize a single value of the given data type as it is stored in a
+    compound (plain value for scalars, tag object otherwise).
+    """
+
+    decoder = _DECODERS.get(type_id)
+    if decoder is None:
+        decoder = _registered(_DECODERS, type_id)
+    return decoder(instream)
+
+def decodeValue(buf, offset, type_id, copy=True):
+    """
+    Decode a single value of the given data type from a buffer at offset.
+    Returns the value as it is stored in a compound and the offset behind
+    it.
+    """
+
+    decoder = _BUFFER_DECODERS.get(type_id)
+    if decoder is None:
+        decoder = _registered(_BUFFER_DECODERS, type_id)
+    return decoder(buf, offset, copy)
+
+def skipStreamValue(instream, type_id):
+    """
+    Skip a serialized value in a stream without decoding it. Fixed-width
+    values and array bodies are skipped by seeking (or reading in chunks
+    on streams which cannot seek).
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        type_id: Data type of the value.
+    """
+
+    if type_id in FIXED_SIZES:
+        skipBytes(instream, FIXED_SIZES[type_id])
+    elif type_id in ITEM_SIZES:
+        skipBytes(instream, deserializeIntVar(instream)*ITEM_SIZES[type_id])
+    elif type_id == DataType.STRING:
+        skipBytes(instream, deserializeIntVar(instream))
+    elif type_id in (DataType.UINT32_DELTA_ARR, DataType.UINT64_DELTA_ARR):
+        deserializeIntVar(instream)
+        skipBytes(instream, deserializeIntVar(instream))
+    elif type_id == DataType.STRING_ARR:
+        for i in range(deserializeIntVar(instream)):
+            skipBytes(instream, deserializeIntVar(instream))
+    elif type_id == DataType.COMPOUND:
+        data_len = deserializeIntVar(instream, allow_unknown=True)
+        for i in _entryRange(data_len):
+            skipBytes(instream, deserializeByte(instream))
+            type_temp = deserializeByte(instream)
+            if type_temp == DataType.END and data_len is None:
+                break
+            skipStreamValue(instream, type_temp)
+    elif type_id in _STREAM_SKIPPERS:
+        _STREAM_SKIPPERS[type_id](instream)
+    elif type_id in _DECODERS:
+        _DECODERS[type_id](instream)
+    else:
+        # Register the type (or fail) and skip it with its own function
+        _registered(_DECODERS, type_id)
+        skipStreamValue(instream, type_id)
+
+def _entryRange(data_len):
+    """
+    Range of the entries of a compound, unbounded if the count is unknown.
+    The entries are then terminated by an entry of type DataType.END.
+    """
+
+    if data_len is None:
+        return itertools.count()
+    return range(data_len)
+
+def skipValue(buf, offset, type_id):
+    """
+    Get the offset behind a serialized value without decoding it.
+    Fixed-width values and arrays are skipped by arithmetic, only strings
+    and compounds need to read their lengths.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+        type_id: Data type of the value.
+    """
+
+    skipper = _SKIPPERS.get(type_id)
+    if skipper is not None:
+        offset = skipper(buf, offset)
+    elif type_id in _BUFFER_DECODERS:
+        offset = _BUFFER_DECODERS[type_id](buf, offset, False)[1]
+    else:
+        # Register the type (or fail) and skip it with its own function
+        _registered(_BUFFER_DECODERS, type_id)
+        return skipValue(buf, offset, type_id)
+    if offset > len(buf):
+        raise EOFError("Unexpected end of buffer!")
+    return offset
+
+class _LazyTag(ABTag):
+    """
+    Placeholder for a not yet decoded entry of a lazily deserialized
+    compound. It references the encoded bytes of the entry in the source
+    buffer, which are written unchanged if the entry is never decoded.
+    """
+
+    __slots__ = ('_type_id', '_buf', '_offset', '_end', '_copy')
+
+    def __init__(self, type_id, buf, offset, end, copy):
+        super(_LazyTag, self).__init__(None)
+        self._type_id = type_id
+        self._buf = buf
+        self._offset = offset
+        self._end = end
+        self._copy = copy
+
+    def __reduce__(self):
+        # Only the encoded bytes of the entry are pickled (and copied), not
+        # the whole source buffer (which may be a mmap)
+        return (_LazyTag, (self._type_id,
+                           bytes(self._buf[self._offset:self._end]), 0,
+                           self._end - self._offset, self._copy))
+
+    def decode(self):
+        """
+        Decode the referenced entry into a new tag object.
+        """
+
+        if self._type_id == DataType.COMPOUND:
+            obj = BTagCompound()
+            obj.deserialize_from(self._buf, self._offset, self._copy, True)
+            return obj
+        return _registered(_BUFFER_DECODERS, self._type_id)(
+            self._buf, self._offset, self._copy)[0]
+
+    def get_type_id(self):
+        return self._type_id
+
+    def get_data(self):
+        return self.decode().get_data()
+
+    def serialize(self, outstream):
+        outstream.write(self._buf[self._offset:self._end])
+
+    def serialize_into(self, buf):
+        buf += self._buf[self._offset:self._end]
+
+    def to_string(self, increment):
+        return self.decode().to_string(increment)
+
+# Scalar types which are stored unboxed in a compound:
+# (tag class, serialize, encode)
+_SCALAR_CODECS = {
+    DataType.STRING: (BTagString, serializeString, encodeString),
+    DataType.UINT8: (BTagByte, serializeByte, encodeByte),
+    DataType.UINT16: (BTagShort, serializeShort, encodeShort),
+    DataType.UINT32: (BTagInt, serializeInt, encodeInt),
+    DataType.UINT64: (BTagLong, serializeLong, encodeLong),
+    DataType.FLOAT: (BTagFloat, serializeFloat, encodeFloat),
+    DataType.DOUBLE: (BTagDouble, serializeDouble, encodeDouble),
+}
+
 class BTagCompound(ABTag):
     """
     Binary tag compound class.
+    The entries are kept in insertion order in parallel lists of tags, type
+    ids and values. Values of the scalar types are stored unboxed, their
+    tag object is only created when it is requested by getTag.
+
+    With enable_cache the encoded bytes of the compound and of its
+    non-scalar entries are kept, and serializing again only re-encodes the
+    entries which were set since (and the compounds on the path to them).
+    Nested compounds are cached along with their parent. Mutations have to
+    go through the set methods, in-place changes of the data of a tag (e.g.
+    of a numpy array) are not noticed. A compound can only be contained in
+    one caching compound, setting it in a second one raises ValueError
+    (copy it or clear the cache of the first parent). The cache is not
+    pickled.
     """
 
+    __slots__ = ('_index', '_tags', '_types', '_values', '_cache', '_pieces',
+                 '_parent')
+
     def __init__(self):
-        super(BTagCompound, self).__init__([])
-        self._tagmap = []
+        super(BTagCompound, self).__init__(None)
+        # Position of each tag in the parallel lists
+        self._index = {}
         self._tags = []
+        self._types = array.array('B')
+        self._values = []
+        # Encoded compound, encoded non-scalar entries (None if not caching)
+        self._cache = None
+        self._pieces = None
+        # Caching compound containing this one, invalidated along with it
+        self._parent = None
+
+    def __getstate__(self):
+        # The cache and the link to the parent are not part of the value
+        return (self._index, self._tags, self._types, self._values)
+
+    def __setstate__(self, state):
+        self._index, self._tags, self._types, self._values = state
+        self._data = None
+        self._cache = None
+        self._pieces = None
+        self._parent = None
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Create a compound from key-value pairs in one pass.
+
+        Args:
+            items: Iterable of (tag, btag_obj) pairs or a mapping.
+        """
+
+        obj = cls()
+        obj.update(items)
+        return obj
+
+    def _set(self, tag, type_id, value):
+        """
+        Set the (boxed or unboxed) value of a tag.
+        """
+
+        if self._pieces is not None and type_id == DataType.COMPOUND:
+            self._link(value)
+        i = self._index.get(tag)
+        # Tag exists -> store new value
+        if i is not None:
+            old = self._values[i]
+            self._types[i] = type_id
+            self._values[i] = value
+            if self._pieces is not None:
+                self._pieces[i] = None
+            # A replaced compound stays linked if it is still an entry
+            if (isinstance(old, BTagCompound) and old._parent is self and
+                    not any(v is old for v in self._values)):
+                old._parent = None
+        else:
+            self._index[tag] = len(self._tags)
+            self._tags.append(tag)
+            self._types.append(type_id)
+            self._values.append(value)
+            if self._pieces is not None:
+                self._pieces.append(None)
+        if self._pieces is not None or self._parent is not None:
+            self._invalidate()
+
+    def _link(self, compound):
+        """
+        Make this caching compound the parent of a nested compound.
+        """
+
+        if compound._parent is not None and compound._parent is not self:
+            raise ValueError("Compound is already contained in another "
+                             "caching compound!")
+        compound._parent = self
+
+    def _invalidate(self):
+        """
+        Drop the cached encoding of this compound and the compounds
+        containing it.
+        """
+
+        # Only caching compounds link their nested compounds, so the path
+        # ends at the outermost caching compound
+        node = self
+        while node is not None:
+            node._cache = None
+            node = node._parent
 
     def setTag(self, tag, btag_obj):
         """
         Set key-value pair in the list.
         """
 
-        # Search for the tag
-        if (len(self._tagmap) > 0):
-            i = bisect.bisect_left(self._tags, tag)
-            # Tag exists -> store new value
-            if i != len(self._tagmap) and self._tagmap[i][0] == tag:
-                self._data[self._tagmap[i][1]] = (tag, btag_obj)
-                return
-        self._tagmap.append((tag, len(self._data)))
-        self._tags.append(tag)
-        if len(self._tagmap) > 1:
-            self._tagmap.sort(key=lambda x: x[0])
-            for i in range(len(self._tagmap)):
-                self._tags[i] = self._tagmap[i][0]
-        self._data.append((tag, btag_obj))
+        self._set(tag, btag_obj.get_type_id(), btag_obj)
+
+    def update(self, items):
+        """
+        Set all key-value pairs of items in the list.
+
+        Args:
+            items: Iterable of (tag, btag_obj) pairs or a mapping (including
+                another compound).
+        """
+
+        if hasattr(items, 'items'):
+            items = items.items()
+        for tag, btag_obj in items:
+            self._set(tag, btag_obj.get_type_id(), btag_obj)
 
     def setByte(self, tag, byte_val):
-        self.setTag(tag, BTagByte(byte_val))
+        self._set(tag, DataType.UINT8, byte_val)
 
     def setShort(self, tag, short_val):
-        self.setTag(tag, BTagShort(short_val))
+        self._set(tag, DataType.UINT16, short_val)
 
     def setInt(self, tag, int_val):
-        self.setTag(tag, BTagInt(int_val))
+        self._set(tag, DataType.UINT32, int_val)
 
     def setLong(self, tag, long_val):
-        self.setTag(tag, BTagLong(long_val))
+        self._set(tag, DataType.UINT64, long_val)
 
     def setFloat(self, tag, float_val):
-        self.setTag(tag, BTagFloat(float_val))
+        self._set(tag, DataType.FLOAT, float_val)
 
     def setDouble(self, tag, double_val):
-        self.setTag(tag, BTagDouble(double_val))
+        self._set(tag, DataType.DOUBLE, double_val)
 
     def setString(self, tag, string_val):
-        self.setTag(tag, BTagString(string_val))
+        self._set(tag, DataType.STRING, string_val)
 
     def setByteArray(self, tag, byte_arr):
         self.setTag(tag, BTagByteArr(byte_arr))
@@ -449,11 +1090,29 @@ class BTagCompound(ABTag):
     def setShortArray(self, tag, short_arr):
         self.setTag(tag, BTagShortArr(short_arr))
 
-    def setIntArray(self, tag, int_arr):
-        self.setTag(tag, BTagIntArr(int_arr))
+    def setIntArray(self, tag, int_arr, delta=False):
+        """
+        Set an array of 4 byte unsigned integers. With delta the smaller of
+        the plain and the delta representation is stored (see
+        selectIntArrayTag).
+        """
+
+        if delta:
+            self.setTag(tag, selectIntArrayTag(int_arr, 4))
+        else:
+            self.setTag(tag, BTagIntArr(int_arr))
+
+    def setLongArray(self, tag, long_arr, delta=False):
+        """
+        Set an array of 8 byte unsigned integers. With delta the smaller of
+        the plain and the delta representation is stored (see
+        selectIntArrayTag).
+        """
 
-    def setLongArray(self, tag, long_arr):
-        self.setTag(tag, BTagLongArr(long_arr))
+        if delta:
+            self.setTag(tag, selectIntArrayTag(long_arr, 8))
+        else:
+            self.setTag(tag, BTagLongArr(long_arr))
 
     def setFloatArray(self, tag, float_arr):
         self.setTag(tag, BTagFloatArr(float_arr))
@@ -465,86 +1124,291 @@ class BTagCompound(ABTag):
         self.setTag(tag, BTagStringArr(string_arr))
 
     def getTag(self, tag):
-        # Search for the tag
-        if (len(self._tagmap) > 0):
-            i = bisect.bisect_left(self._tags, tag)
-            # Tag exists -> store new value
-            if i != len(self._tagmap) and self._tagmap[i][0] == tag:
-                return self._data[self._tagmap[i][1]][1]
-            else:
-                return None
-        else:
+        i = self._index.get(tag)
+        if i is None:
             return None
+        return self._resolve(i)
 
     def getEntry(self, tag):
-        result = self.getTag(tag)
-        if result != None:
-            return result.data
-        return result
+        i = self._index.get(tag)
+        if i is None:
+            return None
+        value = self._values[i]
+        if isinstance(value, ABTag):
+            return self._resolve(i).get_data()
+        return value
+
+    def _entry(self, index):
+        """
+        Get the tag object at position index without storing it.
+        """
+
+        value = self._values[index]
+        if isinstance(value, ABTag):
+            return value
+        return _SCALAR_CODECS[self._types[index]][0](value)
+
+    def _resolve(self, index):
+        """
+        Get the tag object at position index. Unboxed values are boxed and
+        lazy entries decoded on first access, the result replaces the
+        stored value.
+        """
+
+        value = self._values[index]
+        if isinstance(value, _LazyTag):
+            lazy = value
+            value = lazy.decode()
+            if isinstance(value, BTagCompound) and self._pieces is not None:
+                # The parent may have cached the entry, so the decoded
+                # compound caches its (known) encoding as well
+                value._parent = self
+                value._cache = bytes(lazy._buf[lazy._offset:lazy._end])
+                value.enable_cache()
+        elif not isinstance(value, ABTag):
+            value = _SCALAR_CODECS[self._types[index]][0](value)
+        else:
+            return value
+        self._values[index] = value
+        return value
 
     def size(self):
-        return len(self._data)
+        return len(self._tags)
 
     def items(self):
-        return self._data
+        return [(self._tags[i], self._resolve(i))
+                for i in range(len(self._tags))]
 
     def get_type_id(self):
         return DataType.COMPOUND
 
+    def get_data(self):
+        return self.items()
+
+    @classmethod
+    def from_bytes(cls, buf, offset=0, copy=True, lazy=False):
+        """
+        Create a compound from its serialized representation in a buffer.
+        With copy=False integer arrays are read-only numpy views into buf,
+        with lazy=True the entries are decoded on first access.
+        """
+
+        obj = cls()
+        obj.deserialize_from(buf, offset, copy, lazy)
+        return obj
+
+    def _append(self, tag, type_id, value):
+        """
+        Append a deserialized entry.
+        """
+
+        self._index[tag] = len(self._tags)
+        self._tags.append(tag)
+        self._types.append(type_id)
+        self._values.append(value)
+        if self._pieces is not None:
+            if isinstance(value, BTagCompound):
+                value._parent = self
+            self._pieces.append(None)
+        if self._pieces is not None or self._parent is not None:
+            self._invalidate()
+
+    def enable_cache(self):
+        """
+        Keep the encoded bytes for the following serializations.
+        """
+
+        if self._pieces is None:
+            for value in self._values:
+                if (isinstance(value, BTagCompound) and
+                        value._parent is not None and
+                        value._parent is not self):
+                    raise ValueError("Compound is already contained in "
+                                     "another caching compound!")
+            self._pieces = [None]*len(self._tags)
+            for value in self._values:
+                if isinstance(value, BTagCompound):
+                    value._parent = self
+
+    def clear_cache(self):
+        """
+        Stop caching and drop the cached bytes (of nested compounds too).
+        Compounds containing this one lose their cached bytes as well.
+        """
+
+        self._invalidate()
+        if self._pieces is None:
+            return
+        self._pieces = None
+        for value in self._values:
+            if isinstance(value, BTagCompound):
+                value._parent = None
+                value.clear_cache()
+
+    def _cachedBytes(self):
+        """
+        Get the encoded compound, re-encoding only the entries without
+        cached bytes.
+        """
+
+        if self._cache is not None:
+            return self._cache
+        self.enable_cache()
+        buf = bytearray()
+        encodeIntVar(buf, len(self._tags))
+        for i in range(len(self._tags)):
+            value = self._values[i]
+            if isinstance(value, BTagCompound):
+                encodeString8(buf, self._tags[i])
+                encodeByte(buf, DataType.COMPOUND)
+                buf += value._cachedBytes()
+            elif isinstance(value, ABTag):
+                piece = self._pieces[i]
+                if piece is None:
+                    piece = bytearray()
+                    encodeString8(piece, self._tags[i])
+                    encodeByte(piece, self._types[i])
+                    value.serialize_into(piece)
+                    piece = bytes(piece)
+                    self._pieces[i] = piece
+                buf += piece
+            else:
+                encodeString8(buf, self._tags[i])
+                type_id = self._types[i]
+                encodeByte(buf, type_id)
+                _SCALAR_CODECS[type_id][2](buf, value)
+        self._cache = bytes(buf)
+        return self._cache
+
+    def to_bytes(self):
+        if self._pieces is not None:
+            return self._cachedBytes()
+        return super(BTagCompound, self).to_bytes()
+
     def serialize(self, outstream):
+        if self._pieces is not None:
+            outstream.write(self._cachedBytes())
+            return
         # Serialize number of data entries
-        serializeIntVar(outstream, len(self._data))
-        for dataobj in self._data:
+        serializeIntVar(outstream, len(self._tags))
+        for i in range(len(self._tags)):
             # Tag
-            serializeString8(outstream, dataobj[0])
+            serializeString8(outstream, self._tags[i])
             # Data type
-            serializeByte(outstream, dataobj[1].get_type_id())
+            type_id = self._types[i]
+            serializeByte(outstream, type_id)
             # Object
-            dataobj[1].serialize(outstream)
+            value = self._values[i]
+            if isinstance(value, ABTag):
+                value.serialize(outstream)
+            else:
+                _SCALAR_CODECS[type_id][1](outstream, value)
 
-    def deserialize(self, instream):
-        data_len = deserializeIntVar(instream)
+    def deserialize(self, instream, out=None):
+        """
+        Deserialize the compound from a stream.
+
+        Args:
+            instream: Stream object inheriting (io.RawIOBase).
+            out: Optional mapping of tags to the output arrays of
+                fixed-width array entries (see deserializeUIntArray) and
+                to such mappings for nested compounds.
+        """
+
+        data_len = deserializeIntVar(instream, allow_unknown=True)
         type_temp = 0
-        for i in range(data_len):
+        for i in _entryRange(data_len):
             tag = deserializeString8(instream)
             type_temp = deserializeByte(instream)
-            if type_temp == DataType.COMPOUND:
-                self._data.append((tag, BTagCompound()))
-            elif type_temp == DataType.STRING:
-                self._data.append((tag, BTagString()))
-            elif type_temp == DataType.UINT8:
-                self._data.append((tag, BTagByte()))
-            elif type_temp == DataType.UINT16:
-                self._data.append((tag, BTagShort()))
-            elif type_temp == DataType.UINT32:
-                self._data.append((tag, BTagInt()))
-            elif type_temp == DataType.UINT64:
-                self._data.append((tag, BTagLong()))
-            elif type_temp == DataType.FLOAT:
-                self._data.append((tag, BTagFloat()))
-            elif type_temp == DataType.DOUBLE:
-                self._data.append((tag, BTagDouble()))
-            elif type_temp == DataType.STRING_ARR:
-                self._data.append((tag, BTagStringArr()))
-            elif type_temp == DataType.UINT8_ARR:
-                self._data.append((tag, BTagByteArr()))
-            elif type_temp == DataType.UINT16_ARR:
-                self._data.append((tag, BTagShortArr()))
-            elif type_temp == DataType.UINT32_ARR:
-                self._data.append((tag, BTagIntArr()))
-            elif type_temp == DataType.UINT64_ARR:
-                self._data.append((tag, BTagLongArr()))
-            elif type_temp == DataType.FLOAT_ARR:
-                self._data.append((tag, BTagFloatArr()))
-            elif type_temp == DataType.DOUBLE_ARR:
-                self._data.append((tag, BTagDoubleArr()))
-            self._tagmap.append((tag, len(self._data)-1))
-            self._tags.append(tag)
-            self._data[-1][1].deserialize(instream)
-        if len(self._tagmap) > 1:
-            self._tagmap.sort(key=lambda x: x[0])
-            for i in range(len(self._tagmap)):
-                self._tags[i] = self._tagmap[i][0]
+            if type_temp == DataType.END and data_len is None:
+                break
+            if out is not None and tag in out:
+                if (type_temp not in ITEM_SIZES and
+                        type_temp != DataType.COMPOUND):
+                    raise ValueError("Entry "+str(tag)+" of type "
+                                     + str(type_temp)+" cannot be read into "
+                                     "an output array!")
+                value = _TAG_CLASSES[type_temp]()
+                value.deserialize(instream, out[tag])
+                self._append(tag, type_temp, value)
+                continue
+            decoder = _DECODERS.get(type_temp)
+            if decoder is None:
+                decoder = _registered(_DECODERS, type_temp)
+            self._append(tag, type_temp, decoder(instream))
+
+    def serialize_into(self, buf):
+        if self._pieces is not None:
+            buf += self._cachedBytes()
+            return
+        # Serialize number of data entries
+        encodeIntVar(buf, len(self._tags))
+        for i in range(len(self._tags)):
+            # Tag
+            encodeString8(buf, self._tags[i])
+            # Data type
+            type_id = self._types[i]
+            encodeByte(buf, type_id)
+            # Object
+            value = self._values[i]
+            if isinstance(value, ABTag):
+                value.serialize_into(buf)
+            else:
+                _SCALAR_CODECS[type_id][2](buf, value)
+
+    def deserialize_from(self, buf, offset, copy=True, lazy=False):
+        """
+        Deserialize the compound from a buffer at offset.
+        If lazy, only the tag, type and position of each non-scalar entry
+        is recorded and the entry is decoded on its first access by
+        getTag/getEntry. The buffer must then stay alive (and unchanged) as
+        long as the compound is used.
+        """
+
+        data_len, offset = decodeIntVar(buf, offset, allow_unknown=True)
+        buf_len = len(buf)
+        first = len(self._tags)
+        # The entries are appended to the lists directly, the cache and the
+        # links of a caching compound are updated once at the end
+        index = self._index
+        tags = self._tags
+        types = self._types
+        values = self._values
+        unpack_byte = _UINT8.unpack_from
+        decoders = _BUFFER_DECODERS
+        try:
+            for i in _entryRange(data_len):
+                # Tag (String8) and data type
+                end = offset + 1 + unpack_byte(buf, offset)[0]
+                if end >= buf_len:
+                    raise EOFError("Unexpected end of buffer!")
+                tag = _toNative(buf[offset+1:end])
+                type_temp = unpack_byte(buf, end)[0]
+                offset = end + 1
+                if data_len is None and type_temp == DataType.END:
+                    break
+                decoder = decoders.get(type_temp)
+                if decoder is None:
+                    decoder = _registered(_BUFFER_DECODERS, type_temp)
+                if lazy and type_temp not in _SCALAR_CODECS:
+                    end = skipValue(buf, offset, type_temp)
+                    value = _LazyTag(type_temp, buf, offset, end, copy)
+                    offset = end
+                else:
+                    value, offset = decoder(buf, offset, copy)
+                index[tag] = len(tags)
+                tags.append(tag)
+                types.append(type_temp)
+                values.append(value)
+        finally:
+            if self._pieces is not None:
+                for value in values[first:]:
+                    if isinstance(value, BTagCompound):
+                        value._parent = self
+                self._pieces.extend([None]*(len(tags) - first))
+            if self._pieces is not None or self._parent is not None:
+                self._invalidate()
+        return offset
 
     def to_string(self, increment):
         rep = "c{"
@@ -554,8 +1418,8 @@ class BTagCompound(ABTag):
             rep += '\n'
             for j in range((increment+1)*2):
                 rep += ' '
-            rep += '('+str(i)+",\'"+self._data[i][0]+"\'):"
-            rep += self._data[i][1].to_string(increment+1)
+            rep += '('+str(i)+",\'"+self._tags[i]+"\'):"
+            rep += self._entry(i).to_string(increment+1)
         rep += '\n'
         for i in range(increment*2):
             rep += ' '
@@ -565,3 +1429,112 @@ class BTagCompound(ABTag):
     def __str__(self):
         return self.to_string(0)
 
+# Decoders of the built-in types, they directly return the value which is
+# stored in a compound (unboxed for scalars)
+
+def _scalarDecoders(deserialize, decode, size=None, skipper=None):
+    if size is not None:
+        def skipper(buf, offset):
+            return offset + size
+    return deserialize, decode, skipper
+
+def _arrayDecoders(tag_class, deserialize, decode, itemsize=None,
+                   skipper=None):
+    def decoder(instream):
+        return tag_class(deserialize(instream))
+    def buffer_decoder(buf, offset, copy):
+        array, offset = decode(buf, offset, copy)
+        return tag_class(array), offset
+    if itemsize is not None:
+        def skipper(buf, offset):
+            array_len, offset = decodeIntVar(buf, offset)
+            return offset + array_len*itemsize
+    return decoder, buffer_decoder, skipper
+
+def _decodeCompound(instream):
+    obj = BTagCompound()
+    obj.deserialize(instream)
+    return obj
+
+def _bufferDecodeCompound(buf, offset, copy):
+    obj = BTagCompound()
+    offset = obj.deserialize_from(buf, offset, copy)
+    return obj, offset
+
+def _skipString(buf, offset):
+    string_len, offset = decodeIntVar(buf, offset)
+    return offset + string_len
+
+def _skipStringArray(buf, offset):
+    array_len, offset = decodeIntVar(buf, offset)
+    for i in range(array_len):
+        offset = _skipString(buf, offset)
+    return offset
+
+def _skipDeltaArray(buf, offset):
+    offset = decodeIntVar(buf, offset)[1]
+    data_len, offset = decodeIntVar(buf, offset)
+    return offset + data_len
+
+def _skipCompound(buf, offset):
+    data_len, offset = decodeIntVar(buf, offset, allow_unknown=True)
+    for i in _entryRange(data_len):
+        offset += 1 + decodeByte(buf, offset)[0]
+        type_temp, offset = decodeByte(buf, offset)
+        if type_temp == DataType.END and data_len is None:
+            break
+        offset = skipValue(buf, offset, type_temp)
+    return offset
+
+registerTagType(DataType.COMPOUND, BTagCompound, _decodeCompound,
+                _bufferDecodeCompound, _skipCompound)
+registerTagType(DataType.STRING, BTagString,
+                *_scalarDecoders(deserializeString, decodeString,
+                                 skipper=_skipString))
+registerTagType(DataType.UINT8, BTagByte,
+                *_scalarDecoders(deserializeByte, decodeByte, 1))
+registerTagType(DataType.UINT16, BTagShort,
+                *_scalarDecoders(deserializeShort, decodeShort, 2))
+registerTagType(DataType.UINT32, BTagInt,
+                *_scalarDecoders(deserializeInt, decodeInt, 4))
+registerTagType(DataType.UINT64, BTagLong,
+                *_scalarDecoders(deserializeLong, decodeLong, 8))
+registerTagType(DataType.FLOAT, BTagFloat,
+                *_scalarDecoders(deserializeFloat, decodeFloat, 4))
+registerTagType(DataType.DOUBLE, BTagDouble,
+                *_scalarDecoders(deserializeDouble, decodeDouble, 8))
+registerTagType(DataType.STRING_ARR, BTagStringArr,
+                *_arrayDecoders(BTagStringArr, deserializeStringArray,
+                                decodeStringArray, skipper=_skipStringArray))
+registerTagType(DataType.UINT8_ARR, BTagByteArr,
+                *_arrayDecoders(BTagByteArr, deserializeByteArray,
+                                decodeByteArray, 1))
+registerTagType(DataType.UINT16_ARR, BTagShortArr,
+                *_arrayDecoders(BTagShortArr, deserializeShortArray,
+                                decodeShortArray, 2))
+registerTagType(DataType.UINT32_ARR, BTagIntArr,
+                *_arrayDecoders(BTagIntArr, deserializeIntArray,
+                                decodeIntArray, 4))
+registerTagType(DataType.UINT64_ARR, BTagLongArr,
+                *_arrayDecoders(BTagLongArr, deserializeLongArray,
+                                decodeLongArray, 8))
+registerTagType(DataType.FLOAT_ARR, BTagFloatArr,
+                *_arrayDecoders(BTagFloatArr, deserializeFloatArray,
+                                decodeFloatArray, 4))
+registerTagType(DataType.DOUBLE_ARR, BTagDoubleArr,
+                *_arrayDecoders(BTagDoubleArr, deserializeDoubleArray,
+                                decodeDoubleArray, 8))
+registerTagType(DataType.UINT32_DELTA_ARR, BTagDeltaIntArr,
+                *_arrayDecoders(BTagDeltaIntArr,
+                                lambda instream: deserializeDeltaArray(instream,
+                                                                       4),
+                                lambda buf, offset, copy: decodeDeltaArray(
+                                    buf, offset, 4),
+                                skipper=_skipDeltaArray))
+registerTagType(DataType.UINT64_DELTA_ARR, BTagDeltaLongArr,
+                *_arrayDecoders(BTagDeltaLongArr,
+                                lambda instream: deserializeDeltaArray(instream,
+                                                                       8),
+                                lambda buf, offset, copy: decodeDeltaArray(
+                                    buf, offset, 8),
+                                skipper=_skipDeltaArray))
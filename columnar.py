@@ -0,0 +1,178 @@
+"""
+Columnar batch encoding: many compounds with the same scalar layout are
+stored as one compound of typed column arrays.
+"""
+
+from collections import OrderedDict
+
+from pyBTC.btc import *
+
+# Array tag classes of the columns by data type
+_COLUMN_TAGS = {
+    DataType.STRING_ARR: BTagStringArr,
+    DataType.UINT8_ARR: BTagByteArr,
+    DataType.UINT16_ARR: BTagShortArr,
+    DataType.UINT32_ARR: BTagIntArr,
+    DataType.UINT64_ARR: BTagLongArr,
+    DataType.FLOAT_ARR: BTagFloatArr,
+    DataType.DOUBLE_ARR: BTagDoubleArr,
+}
+
+# Column data type of the scalar field types
+_COLUMN_TYPES = {
+    DataType.STRING: DataType.STRING_ARR,
+    DataType.UINT8: DataType.UINT8_ARR,
+    DataType.UINT16: DataType.UINT16_ARR,
+    DataType.UINT32: DataType.UINT32_ARR,
+    DataType.UINT64: DataType.UINT64_ARR,
+    DataType.FLOAT: DataType.FLOAT_ARR,
+    DataType.DOUBLE: DataType.DOUBLE_ARR,
+}
+# Scalar field type of the column data types
+_FIELD_TYPES = dict((column_type, field_type) for field_type, column_type
+                    in _COLUMN_TYPES.items())
+
+# numpy dtypes in which the numeric columns of records are collected
+# (floats in double precision, they are rounded by the float codec just
+# like the scalars)
+if ASSERT_NUMPY:
+    _COLUMN_DTYPES = {
+        DataType.UINT8_ARR: numpy.uint8,
+        DataType.UINT16_ARR: numpy.uint16,
+        DataType.UINT32_ARR: numpy.uint32,
+        DataType.UINT64_ARR: numpy.uint64,
+        DataType.FLOAT_ARR: numpy.float64,
+        DataType.DOUBLE_ARR: numpy.float64,
+    }
+
+def columnsToCompound(columns):
+    """
+    Create a compound of column arrays. The data type of each column is
+    chosen from its numpy dtype (see arrayTypeOf).
+
+    Args:
+        columns: Mapping or sequence of (name, array) pairs, all arrays of
+            the same length.
+    """
+
+    if hasattr(columns, 'items'):
+        columns = columns.items()
+    compound = BTagCompound()
+    length = None
+    for name, array in columns:
+        if length is None:
+            length = len(array)
+        elif len(array) != length:
+            raise ValueError("Column "+str(name)+" has a different length!")
+        compound.setTag(name, _COLUMN_TAGS[arrayTypeOf(array)](array))
+    return compound
+
+def recordsToCompound(records):
+    """
+    Create a compound of column arrays from compounds which all have the
+    same scalar entries (same tags and types in the same order).
+
+    Args:
+        records: Sequence of BTagCompound objects.
+    """
+
+    compound = BTagCompound()
+    if not records:
+        return compound
+    first = records[0]
+    tags = first._tags
+    types = first._types
+    for type_id in types:
+        if type_id not in _COLUMN_TYPES:
+            raise ValueError("Only scalar entries can be stored as columns!")
+    for record in records:
+        if record._tags != tags or record._types != types:
+            raise ValueError("Records have different layouts!")
+    for i in range(len(tags)):
+        column = [record._values[i] for record in records]
+        for j in range(len(column)):
+            if isinstance(column[j], ABTag):
+                column[j] = column[j].get_data()
+        column_type = _COLUMN_TYPES[types[i]]
+        if ASSERT_NUMPY and column_type in _COLUMN_DTYPES:
+            column = numpy.array(column, dtype=_COLUMN_DTYPES[column_type])
+        compound.setTag(tags[i], _COLUMN_TAGS[column_type](column))
+    return compound
+
+def compoundToColumns(compound):
+    """
+    Get the column arrays of a compound as an ordered dictionary.
+    """
+
+    return OrderedDict((tag, btag_obj.get_data())
+                       for tag, btag_obj in compound.items())
+
+def compoundToStructured(compound):
+    """
+    Get the columns of a compound as a numpy structured array (one element
+    per record, string columns as objects).
+    """
+
+    columns = compoundToColumns(compound)
+    dtype = []
+    length = 0
+    for name, array in columns.items():
+        array = numpy.asarray(array)
+        if array.dtype.kind in 'USO':
+            dtype.append((str(name), object))
+        else:
+            dtype.append((str(name), array.dtype))
+        length = len(array)
+    result = numpy.empty(length, dtype=dtype)
+    for name, array in columns.items():
+        result[str(name)] = array
+    return result
+
+def compoundToRecords(compound):
+    """
+    Split a compound of column arrays into one compound per record.
+    """
+
+    columns = []
+    length = 0
+    for tag, btag_obj in compound.items():
+        field_type = _FIELD_TYPES.get(btag_obj.get_type_id())
+        if field_type is None:
+            raise ValueError("Entry "+str(tag)+" is not a column!")
+        array = btag_obj.get_data()
+        if hasattr(array, 'tolist'):
+            array = array.tolist()
+        columns.append((tag, field_type, array))
+        length = len(array)
+    records = []
+    for j in range(length):
+        record = BTagCompound()
+        for tag, field_type, array in columns:
+            record._set(tag, field_type, array[j])
+        records.append(record)
+    return records
+
+def serializeColumns(outstream, columns):
+    """
+    Serialize columns (mapping or pairs of arrays) or records (sequence of
+    BTagCompound objects) as a compound of column arrays.
+    """
+
+    if (not hasattr(columns, 'items') and len(columns) > 0 and
+            isinstance(columns[0], BTagCompound)):
+        compound = recordsToCompound(columns)
+    else:
+        compound = columnsToCompound(columns)
+    compound.serialize(outstream)
+
+def deserializeColumns(instream, structured=False):
+    """
+    Deserialize a compound of column arrays as an ordered dictionary of
+    arrays or, if structured, as a numpy structured array.
+    """
+
+    compound = BTagCompound()
+    compound.deserialize(instream)
+    if structured:
+        return compoundToStructured(compound)
+    return compoundToColumns(compound)
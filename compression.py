@@ -0,0 +1,377 @@
+"""
+Optional compression of documents and arrays with the codecs of the standard
+library (zlib, bz2 and lzma where available).
+"""
+
+import io
+import zlib
+import bz2
+try:
+    import lzma
+except ImportError:
+    # Python 2
+    lzma = None
+
+from pyBTC.btc import *
+
+class Codec(object):
+    """
+    Simple enum type.
+    """
+
+    NONE = 0
+    ZLIB = 1
+    BZ2 = 2
+    LZMA = 3
+
+# Number of bytes passed to the (de)compressor at once
+COMPRESSION_CHUNK_SIZE = 1 << 16
+# Arrays with fewer payload bytes are stored uncompressed
+COMPRESSION_THRESHOLD = 4096
+# Start of a compressed document, it never starts a plain one
+_MAGIC = b'BTCZ'
+
+def _compressor(codec, level):
+    """
+    Create a compressor object for the codec.
+    """
+
+    if codec == Codec.ZLIB:
+        if level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        return zlib.compressobj(level)
+    if codec == Codec.BZ2:
+        if level is None:
+            level = 9
+        return bz2.BZ2Compressor(level)
+    if codec == Codec.LZMA:
+        if lzma is None:
+            raise ValueError("Codec lzma is not available!")
+        if level is None:
+            level = lzma.PRESET_DEFAULT
+        return lzma.LZMACompressor(preset=level)
+    raise ValueError("Unknown codec "+str(codec)+"!")
+
+def _decompressor(codec):
+    """
+    Create a decompressor object for the codec (None for Codec.NONE).
+    """
+
+    if codec == Codec.NONE:
+        return None
+    if codec == Codec.ZLIB:
+        return zlib.decompressobj()
+    if codec == Codec.BZ2:
+        return bz2.BZ2Decompressor()
+    if codec == Codec.LZMA:
+        if lzma is None:
+            raise ValueError("Codec lzma is not available!")
+        return lzma.LZMADecompressor()
+    raise ValueError("Unknown codec "+str(codec)+"!")
+
+def compressBytes(data, codec=Codec.ZLIB, level=None):
+    """
+    Compress bytes in one call.
+    """
+
+    compressor = _compressor(codec, level)
+    return compressor.compress(bytes(data)) + compressor.flush()
+
+def decompressBytes(data, codec):
+    """
+    Decompress bytes in one call.
+    """
+
+    decompressor = _decompressor(codec)
+    if decompressor is None:
+        return bytes(data)
+    return decompressor.decompress(bytes(data))
+
+class CompressedWriter(object):
+    """
+    Writable stream which compresses everything written to it into another
+    stream. Data is collected and compressed in blocks of chunk_size bytes,
+    so memory stays bounded independent of the amount of data.
+    """
+
+    def __init__(self, outstream, codec=Codec.ZLIB, level=None,
+                 chunk_size=COMPRESSION_CHUNK_SIZE):
+        """
+        Args:
+            outstream: Stream object inheriting (io.RawIOBase).
+            codec: Codec of the compressed data.
+            level: Compression level (default of the codec if None).
+            chunk_size: Number of bytes compressed at once.
+        """
+
+        self._outstream = outstream
+        self._compressor = _compressor(codec, level)
+        self._chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self._outstream.write(
+                self._compressor.compress(bytes(self._buffer)))
+            del self._buffer[:]
+        return len(data)
+
+    def close(self):
+        """
+        Write the remaining data and the end of the compressed stream. The
+        underlying stream is not closed.
+        """
+
+        if self._compressor is None:
+            return
+        self._outstream.write(self._compressor.compress(bytes(self._buffer))
+                              + self._compressor.flush())
+        del self._buffer[:]
+        self._compressor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class CompressedReader(object):
+    """
+    Readable stream which decompresses the data of another stream in blocks
+    of chunk_size bytes. At the end of the compressed data the underlying
+    stream is moved back behind it if it is seekable, otherwise the bytes
+    read too far are available as unused_data.
+    """
+
+    def __init__(self, instream, codec=Codec.ZLIB,
+                 chunk_size=COMPRESSION_CHUNK_SIZE, prefix=b''):
+        """
+        Args:
+            instream: Stream object inheriting (io.RawIOBase).
+            codec: Codec of the compressed data.
+            chunk_size: Number of bytes decompressed at once.
+            prefix: Already decompressed bytes which are read first.
+        """
+
+        self._instream = instream
+        self._decompressor = _decompressor(codec)
+        self._chunk_size = chunk_size
+        self._buffer = bytearray(prefix)
+        self._eof = False
+        self.unused_data = b''
+
+    def _fill(self):
+        """
+        Decompress the next block of the underlying stream.
+        """
+
+        data = self._instream.read(self._chunk_size)
+        if not data:
+            self._eof = True
+            return
+        self._buffer += self._decompressor.decompress(data)
+        unused = self._decompressor.unused_data
+        if unused or getattr(self._decompressor, 'eof', False):
+            self._eof = True
+            try:
+                self._instream.seek(-len(unused), 1)
+            except (AttributeError, IOError, OSError):
+                self.unused_data = unused
+
+    def read(self, size=-1):
+        if self._decompressor is None:
+            # Uncompressed: pass through after the buffered bytes
+            if not self._buffer:
+                return self._instream.read(size)
+            if size < 0 or size > len(self._buffer):
+                self._buffer += self._instream.read(
+                    size - len(self._buffer) if size >= 0 else -1)
+            if size < 0 or size > len(self._buffer):
+                size = len(self._buffer)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+        while (size < 0 or len(self._buffer) < size) and not self._eof:
+            self._fill()
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+def serializeCompressed(outstream, btag_obj, codec=Codec.ZLIB, level=None):
+    """
+    Serialize a tag object (usually the document compound) compressed.
+    The output starts with a magic number and the codec, followed by the
+    compressed serialization.
+
+    Args:
+        outstream: Stream object inheriting (io.RawIOBase).
+        btag_obj: Tag object to serialize.
+        codec: Codec of the compressed data.
+        level: Compression level (default of the codec if None).
+    """
+
+    outstream.write(_MAGIC)
+    serializeByte(outstream, codec)
+    with CompressedWriter(outstream, codec, level) as writer:
+        btag_obj.serialize(writer)
+
+def deserializeCompressed(instream, btag_obj=None):
+    """
+    Deserialize a document written by serializeCompressed. Plain documents
+    (written by serialize) are recognized and read as well.
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        btag_obj: Tag object to deserialize into (new BTagCompound if None).
+    """
+
+    head = instream.read(len(_MAGIC))
+    if head == _MAGIC:
+        reader = CompressedReader(instream, deserializeByte(instream))
+    else:
+        reader = CompressedReader(instream, Codec.NONE, prefix=head)
+    if btag_obj is None:
+        btag_obj = BTagCompound()
+    btag_obj.deserialize(reader)
+    return btag_obj
+
+def _payloadSize(array_tag):
+    """
+    Get the (estimated) number of payload bytes of an array tag.
+    """
+
+    data = array_tag.get_data()
+    type_id = array_tag.get_type_id()
+    if type_id in ITEM_SIZES:
+        return len(data)*ITEM_SIZES[type_id]
+    if type_id == DataType.STRING_ARR:
+        return sum(len(string) for string in data)
+    return len(array_tag.to_bytes())
+
+class BTagCompressedArr(ABTag):
+    """
+    BTagBase class for an array tag whose payload is compressed. Arrays with
+    fewer payload bytes than the threshold are stored uncompressed (still
+    within this type).
+
+    Serialized as: type of the array, codec, then for Codec.NONE the array
+    as usual and otherwise the IntVar length of the compressed bytes and
+    the compressed serialization of the array.
+    """
+
+    __slots__ = ('_codec', '_level', '_threshold')
+
+    def __init__(self, array_tag=None, codec=Codec.ZLIB, level=None,
+                 threshold=COMPRESSION_THRESHOLD):
+        super(BTagCompressedArr, self).__init__(array_tag)
+        self._codec = codec
+        self._level = level
+        self._threshold = threshold
+
+    def __getstate__(self):
+        return (self._data, self._codec, self._level, self._threshold)
+
+    def __setstate__(self, state):
+        self._data, self._codec, self._level, self._threshold = state
+
+    def get_type_id(self):
+        return DataType.COMPRESSED_ARR
+
+    def get_tag(self):
+        """
+        Get the wrapped array tag.
+        """
+
+        return self._data
+
+    def get_data(self):
+        return self._data.get_data()
+
+    def _compressed(self):
+        """
+        Get the codec used for the array and the compressed bytes (None if
+        the array is stored uncompressed).
+        """
+
+        if (self._codec == Codec.NONE or
+                _payloadSize(self._data) < self._threshold):
+            return Codec.NONE, None
+        compressed = io.BytesIO()
+        with CompressedWriter(compressed, self._codec, self._level) as writer:
+            self._data.serialize(writer)
+        return self._codec, compressed.getvalue()
+
+    def serialize(self, outstream):
+        codec, data = self._compressed()
+        serializeByte(outstream, self._data.get_type_id())
+        serializeByte(outstream, codec)
+        if data is None:
+            self._data.serialize(outstream)
+        else:
+            serializeIntVar(outstream, len(data))
+            outstream.write(data)
+
+    def deserialize(self, instream):
+        type_id = deserializeByte(instream)
+        self._codec = deserializeByte(instream)
+        if self._codec == Codec.NONE:
+            self._data = deserializeValue(instream, type_id)
+            return
+        data_len = deserializeIntVar(instream)
+        data = instream.read(data_len)
+        if len(data) != data_len:
+            raise EOFError("Unexpected end of stream!")
+        self._data = decodeValue(decompressBytes(data, self._codec), 0,
+                                 type_id)[0]
+
+    def serialize_into(self, buf):
+        codec, data = self._compressed()
+        encodeByte(buf, self._data.get_type_id())
+        encodeByte(buf, codec)
+        if data is None:
+            self._data.serialize_into(buf)
+        else:
+            encodeIntVar(buf, len(data))
+            buf += data
+
+    def deserialize_from(self, buf, offset, copy=True):
+        type_id, offset = decodeByte(buf, offset)
+        self._codec, offset = decodeByte(buf, offset)
+        if self._codec == Codec.NONE:
+            self._data, offset = decodeValue(buf, offset, type_id, copy)
+            return offset
+        data_len, offset = decodeIntVar(buf, offset)
+        if offset + data_len > len(buf):
+            raise EOFError("Unexpected end of buffer!")
+        data = decompressBytes(buf[offset:offset+data_len], self._codec)
+        self._data = decodeValue(data, 0, type_id, copy)[0]
+        return offset + data_len
+
+    def to_string(self, increment):
+        return "z"+self._data.to_string(increment)
+
+    def __str__(self):
+        return self.to_string(0)
+
+def _skipCompressedArr(buf, offset):
+    type_id, offset = decodeByte(buf, offset)
+    codec, offset = decodeByte(buf, offset)
+    if codec == Codec.NONE:
+        return skipValue(buf, offset, type_id)
+    data_len, offset = decodeIntVar(buf, offset)
+    return offset + data_len
+
+def _skipStreamCompressedArr(instream):
+    type_id = deserializeByte(instream)
+    codec = deserializeByte(instream)
+    if codec == Codec.NONE:
+        skipStreamValue(instream, type_id)
+    else:
+        skipBytes(instream, deserializeIntVar(instream))
+
+registerTagType(DataType.COMPRESSED_ARR, BTagCompressedArr,
+                skipper=_skipCompressedArr,
+                stream_skipper=_skipStreamCompressedArr)
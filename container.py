@@ -0,0 +1,284 @@
+"""
+Append-only container file holding many compound records.
+"""
+
+import io
+import os
+import struct
+import zlib
+
+from pyBTC.btc import *
+
+# Start of a container file
+_MAGIC = b'BTCF'
+# Record header: payload length and crc32 of the payload
+_RECORD_HEADER = struct.Struct('<QI')
+# Index entry: offset of a record in the data file
+_INDEX_ENTRY = struct.Struct('<Q')
+# Size of the batches of sequential reads in bytes
+CONTAINER_BUFFER_SIZE = 1 << 20
+
+def _crc32(data):
+    return zlib.crc32(data) & 0xffffffff
+
+class BTagFile(object):
+    """
+    File of independent BTagCompound records which are appended one after
+    another. Each record is stored as a header (8 byte length, crc32) and
+    the serialized compound. The offsets of the records are kept in a
+    sidecar index file (path + '.idx', 8 bytes per record), so a record is
+    found by its number with a single seek.
+
+    Records are written before their index entry. When a file is opened a
+    torn or corrupt final record (e.g. after a crash) is detected by its
+    length and crc32; in modes 'a' and 'w' it is truncated and the index is
+    repaired (including records which were written but not indexed).
+
+    Usage:
+        with BTagFile("records.btc", 'a') as records:
+            number = records.append(compound)
+        with BTagFile("records.btc") as records:
+            compound = records[number]
+            for compound in records:
+                ...
+    """
+
+    def __init__(self, path, mode='r', index_path=None,
+                 buffer_size=CONTAINER_BUFFER_SIZE):
+        """
+        Args:
+            path: Path of the data file.
+            mode: 'r' (read), 'a' (read and append, create if missing) or
+                'w' (create or truncate).
+            index_path: Path of the index file (default: path + '.idx').
+            buffer_size: Size of the I/O buffer and of the batches of
+                sequential reads in bytes.
+        """
+
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError("Invalid mode "+str(mode)+"!")
+        if index_path is None:
+            index_path = path + '.idx'
+        self._path = path
+        self._index_path = index_path
+        self._buffer_size = buffer_size
+        self._writable = mode != 'r'
+        if mode == 'w' or (mode == 'a' and not os.path.exists(path)):
+            with io.open(path, 'wb') as f:
+                f.write(_MAGIC)
+            with io.open(index_path, 'wb'):
+                pass
+        if self._writable:
+            self._file = io.open(path, 'r+b', buffering=buffer_size)
+        else:
+            self._file = io.open(path, 'rb', buffering=buffer_size)
+        self._index = None
+        if self._file.read(len(_MAGIC)) != _MAGIC:
+            self._file.close()
+            raise ValueError("Not a BTagFile: "+path+"!")
+        self._offsets = self._loadIndex()
+        self._recover()
+        if self._writable:
+            self._index = io.open(index_path, 'ab')
+
+    def _loadIndex(self):
+        """
+        Read the record offsets from the index file (empty if missing).
+        """
+
+        try:
+            with io.open(self._index_path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return []
+        # An incomplete final entry is dropped
+        data = data[:len(data) - len(data) % _INDEX_ENTRY.size]
+        offsets = unpackUIntArray(data, _INDEX_ENTRY.size)
+        if hasattr(offsets, 'tolist'):
+            offsets = offsets.tolist()
+        return offsets
+
+    def _checkRecord(self, offset, file_size):
+        """
+        Get the end of the record at offset, None if it is torn or corrupt.
+        """
+
+        if offset + _RECORD_HEADER.size > file_size:
+            return None
+        self._file.seek(offset)
+        length, crc = _RECORD_HEADER.unpack(
+            self._file.read(_RECORD_HEADER.size))
+        end = offset + _RECORD_HEADER.size + length
+        if end > file_size or _crc32(self._file.read(length)) != crc:
+            return None
+        return end
+
+    def _recover(self):
+        """
+        Validate the index against the data file, index complete records
+        behind it and drop a torn final record.
+        """
+
+        file_size = self._file.seek(0, 2)
+        offsets = self._offsets
+        old_count = len(offsets)
+        # The offsets must start behind the magic and increase
+        previous = len(_MAGIC) - 1
+        for i in range(len(offsets)):
+            if offsets[i] <= previous or offsets[i] >= file_size:
+                del offsets[i:]
+                break
+            previous = offsets[i]
+        # The last indexed record must be complete
+        end = None
+        while offsets:
+            end = self._checkRecord(offsets[-1], file_size)
+            if end is not None:
+                break
+            offsets.pop()
+        if not offsets:
+            end = len(_MAGIC)
+        # Complete records behind the index
+        indexed = len(offsets)
+        while True:
+            record_end = self._checkRecord(end, file_size)
+            if record_end is None:
+                break
+            offsets.append(end)
+            end = record_end
+        self._end = end
+        if not self._writable:
+            return
+        if end < file_size:
+            self._file.truncate(end)
+        if indexed != old_count or len(offsets) != old_count:
+            with io.open(self._index_path, 'wb') as f:
+                f.write(packUIntArray(offsets, _INDEX_ENTRY.size))
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def append(self, compound):
+        """
+        Append a compound and get its record number.
+        """
+
+        return self.append_bytes(compound.to_bytes())
+
+    def append_bytes(self, payload):
+        """
+        Append an already serialized compound and get its record number.
+        """
+
+        if not self._writable:
+            raise IOError("BTagFile is opened read-only!")
+        payload = bytes(payload)
+        self._file.seek(self._end)
+        self._file.write(_RECORD_HEADER.pack(len(payload), _crc32(payload)))
+        self._file.write(payload)
+        self._index.write(_INDEX_ENTRY.pack(self._end))
+        self._offsets.append(self._end)
+        self._end += _RECORD_HEADER.size + len(payload)
+        return len(self._offsets) - 1
+
+    def _recordNumber(self, number):
+        if number < 0:
+            number += len(self._offsets)
+        if number < 0 or number >= len(self._offsets):
+            raise IndexError("Record "+str(number)+" does not exist!")
+        return number
+
+    def read_bytes(self, number):
+        """
+        Get the serialized compound of a record.
+        """
+
+        number = self._recordNumber(number)
+        self._file.seek(self._offsets[number])
+        length, crc = _RECORD_HEADER.unpack(
+            self._file.read(_RECORD_HEADER.size))
+        payload = self._file.read(length)
+        if len(payload) != length or _crc32(payload) != crc:
+            raise ValueError("Record "+str(number)+" is corrupt!")
+        return payload
+
+    def read(self, number, lazy=False):
+        """
+        Get the compound of a record (negative numbers count from the end).
+        """
+
+        return BTagCompound.from_bytes(self.read_bytes(number), lazy=lazy)
+
+    def __getitem__(self, number):
+        return self.read(number)
+
+    def iter_records(self, start=0, stop=None, lazy=False):
+        """
+        Iterate over the compounds of the records start <= number < stop
+        (negative numbers count from the end). Consecutive records are read
+        in batches of up to buffer_size bytes with a single read each.
+        """
+
+        if start < 0:
+            start += len(self._offsets)
+        if start < 0 or start > len(self._offsets):
+            raise IndexError("Record "+str(start)+" does not exist!")
+        if stop is None or stop > len(self._offsets):
+            stop = len(self._offsets)
+        elif stop < 0:
+            stop += len(self._offsets)
+        number = start
+        while number < stop:
+            # Records of the batch: number <= i < batch_stop
+            batch_start = self._offsets[number]
+            batch_stop = number + 1
+            while (batch_stop < stop and self._offsets[batch_stop]
+                   - batch_start < self._buffer_size):
+                batch_stop += 1
+            if batch_stop < len(self._offsets):
+                batch_end = self._offsets[batch_stop]
+            else:
+                batch_end = self._end
+            self._file.seek(batch_start)
+            data = self._file.read(batch_end - batch_start)
+            for i in range(number, batch_stop):
+                offset = self._offsets[i] - batch_start
+                length, crc = _RECORD_HEADER.unpack_from(data, offset)
+                offset += _RECORD_HEADER.size
+                payload = data[offset:offset+length]
+                if len(payload) != length or _crc32(payload) != crc:
+                    raise ValueError("Record "+str(i)+" is corrupt!")
+                yield BTagCompound.from_bytes(payload, lazy=lazy)
+            number = batch_stop
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def flush(self, sync=False):
+        """
+        Write buffered records and index entries to the files, with sync
+        also to the disk.
+        """
+
+        if not self._writable:
+            return
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+        self._index.flush()
+        if sync:
+            os.fsync(self._index.fileno())
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        if self._index is not None:
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
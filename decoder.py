@@ -0,0 +1,216 @@
+"""
+Incremental decoding of documents from byte chunks, independent of any
+I/O (for selectors, epoll loops or non-blocking sockets).
+"""
+
+import collections
+import struct
+import types
+
+from pyBTC.btc import *
+from pyBTC.btc import _BUFFER_DECODERS, _unknownType
+from pyBTC.compression import Codec
+
+# Data types of delta coded arrays (count, payload size, payload)
+_DELTA_TYPES = (DataType.UINT32_DELTA_ARR, DataType.UINT64_DELTA_ARR)
+
+class BTCDecoder(object):
+    """
+    Push decoder: chunks of any size are fed as they arrive and complete
+    documents are taken out. The parse state is kept between the chunks,
+    so every byte is scanned only once to find the end of a document,
+    which is then decoded as a whole.
+
+    The parser consists of generators which yield either the number of
+    bytes they need at the current position or a generator to run first
+    (a trampoline, so nested compounds need no recursion across chunks).
+
+    Usage:
+        decoder = BTCDecoder()
+        decoder.feed(sock.recv(65536))
+        while True:
+            compound = decoder.next_document()
+            if compound is None:
+                break
+            ...
+    """
+
+    __slots__ = ('_buf', '_pos', '_start', '_stack', '_need', '_int',
+                 '_documents', '_framed', '_lazy')
+
+    def __init__(self, framed=False, lazy=False):
+        """
+        Args:
+            framed: Documents are preceded by their length as IntVar (the
+                frames of pyBTC.aio) instead of following each other.
+            lazy: Decode the entries of the documents on access.
+        """
+
+        self._buf = bytearray()
+        self._pos = 0
+        self._start = 0
+        self._stack = []
+        self._need = 0
+        self._int = None
+        self._documents = collections.deque()
+        self._framed = framed
+        self._lazy = lazy
+
+    def feed(self, data):
+        """
+        Add received bytes and parse as far as possible.
+        """
+
+        self._buf += data
+        self._advance()
+
+    def next_document(self):
+        """
+        Get the next complete document (None if more bytes are needed).
+        """
+
+        if not self._documents:
+            return None
+        return BTagCompound.from_bytes(self._documents.popleft(),
+                                       lazy=self._lazy)
+
+    def __iter__(self):
+        while self._documents:
+            yield self.next_document()
+
+    def pending(self):
+        """
+        Number of complete documents which have not been taken out.
+        """
+
+        return len(self._documents)
+
+    def close(self):
+        """
+        Check that no incomplete document is left at the end of the input.
+        """
+
+        if self._stack or self._pos < len(self._buf):
+            raise EOFError("Unexpected end of stream!")
+
+    def _advance(self):
+        buf = self._buf
+        stack = self._stack
+        while True:
+            if not stack:
+                if self._pos >= len(buf):
+                    return
+                self._start = self._pos
+                if self._framed:
+                    stack.append(self._parseFrame())
+                else:
+                    stack.append(self._parseCompound())
+                self._need = 0
+            if len(buf) - self._pos < self._need:
+                return
+            try:
+                request = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                self._need = 0
+                if not stack:
+                    self._finish()
+                continue
+            if isinstance(request, types.GeneratorType):
+                stack.append(request)
+                self._need = 0
+            else:
+                self._need = request
+
+    def _finish(self):
+        """
+        Store the bytes of the parsed document and drop them from the
+        buffer.
+        """
+
+        self._documents.append(bytes(self._buf[self._start:self._pos]))
+        del self._buf[:self._pos]
+        self._pos = 0
+        self._start = 0
+
+    def _readIntVar(self, allow_unknown=False):
+        yield 1
+        type_val = self._buf[self._pos]
+        if type_val == INTVAR_UNKNOWN:
+            if not allow_unknown:
+                raise ValueError("Unknown count marker where a length is "
+                                 "expected!")
+            self._pos += 1
+            self._int = None
+            return
+        size = INTVAR_SIZES.get(type_val)
+        if size is None:
+            raise ValueError("Invalid IntVar type "+str(type_val)+"!")
+        yield 1 + size
+        self._int, self._pos = decodeIntVar(self._buf, self._pos)
+
+    def _skip(self, size):
+        yield size
+        self._pos += size
+
+    def _parseFrame(self):
+        yield self._readIntVar()
+        self._start = self._pos
+        yield self._skip(self._int)
+
+    def _parseCompound(self):
+        yield self._readIntVar(allow_unknown=True)
+        data_len = self._int
+        i = 0
+        while data_len is None or i < data_len:
+            yield 1
+            tag_len = self._buf[self._pos]
+            yield 2 + tag_len
+            type_id = self._buf[self._pos + 1 + tag_len]
+            self._pos += 2 + tag_len
+            if type_id == DataType.END and data_len is None:
+                return
+            yield self._parseValue(type_id)
+            i += 1
+
+    def _parseValue(self, type_id):
+        if type_id in FIXED_SIZES:
+            yield self._skip(FIXED_SIZES[type_id])
+        elif type_id in ITEM_SIZES:
+            yield self._readIntVar()
+            yield self._skip(self._int*ITEM_SIZES[type_id])
+        elif type_id == DataType.STRING:
+            yield self._readIntVar()
+            yield self._skip(self._int)
+        elif type_id == DataType.COMPOUND:
+            yield self._parseCompound()
+        elif type_id == DataType.STRING_ARR:
+            yield self._readIntVar()
+            for i in range(self._int):
+                yield self._readIntVar()
+                yield self._skip(self._int)
+        elif type_id in _DELTA_TYPES:
+            yield self._readIntVar()
+            yield self._readIntVar()
+            yield self._skip(self._int)
+        elif type_id == DataType.COMPRESSED_ARR:
+            yield 2
+            data_type = self._buf[self._pos]
+            codec = self._buf[self._pos + 1]
+            self._pos += 2
+            if codec == Codec.NONE:
+                yield self._parseValue(data_type)
+            else:
+                yield self._readIntVar()
+                yield self._skip(self._int)
+        elif type_id in _BUFFER_DECODERS:
+            # Registered types of unknown layout are skipped on the buffered
+            # bytes and retried when more bytes have arrived
+            while True:
+                try:
+                    self._pos = skipValue(self._buf, self._pos, type_id)
+                    return
+                except (EOFError, IndexError, struct.error):
+                    yield len(self._buf) - self._pos + 1
+        else:
+            raise _unknownType(type_id)
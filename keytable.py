@@ -0,0 +1,163 @@
+"""
+Keyed encoding of compound streams: the tags are stored once per stream in
+a key table and referenced by number afterwards.
+"""
+
+import sys
+
+from pyBTC.btc import *
+from pyBTC.btc import _LazyTag, _SCALAR_CODECS
+
+if sys.version_info[0] >= 3:
+    _intern = sys.intern
+else:
+    _intern = intern
+
+# Start of a keyed stream
+_MAGIC = b'BTCK'
+# Key references up to this value are a single byte, larger ones follow
+# as IntVar
+_KEY_EXTENDED = 255
+
+class KeyedWriter(object):
+    """
+    Writer of a stream of compounds in which every tag is written only on
+    its first occurrence. The format is the one of BTagCompound.serialize
+    except for the tags: each is a key reference (one byte for the first
+    255 keys, otherwise 255 and an IntVar), a reference to the next unused
+    key is followed by the String8 of the new key.
+
+    The documents of a keyed stream can only be read in order with a
+    KeyedReader, since the key table is built while reading.
+    """
+
+    def __init__(self, outstream, keys=()):
+        """
+        Args:
+            outstream: Stream object inheriting (io.RawIOBase).
+            keys: Predefined keys, which are never written and have to be
+                given to the reader as well.
+        """
+
+        self._outstream = outstream
+        self._ids = {}
+        for key in keys:
+            self._ids[key] = len(self._ids)
+        self._started = False
+
+    def _encodeKey(self, buf, key):
+        key_id = self._ids.get(key)
+        new = key_id is None
+        if new:
+            key_id = len(self._ids)
+            self._ids[key] = key_id
+        if key_id < _KEY_EXTENDED:
+            encodeByte(buf, key_id)
+        else:
+            encodeByte(buf, _KEY_EXTENDED)
+            encodeIntVar(buf, key_id)
+        if new:
+            encodeString8(buf, key)
+
+    def _encodeCompound(self, buf, compound):
+        encodeIntVar(buf, compound.size())
+        for i in range(compound.size()):
+            self._encodeKey(buf, compound._tags[i])
+            type_id = compound._types[i]
+            encodeByte(buf, type_id)
+            value = compound._values[i]
+            if type_id == DataType.COMPOUND:
+                if isinstance(value, _LazyTag):
+                    value = value.decode()
+                self._encodeCompound(buf, value)
+            elif isinstance(value, ABTag):
+                value.serialize_into(buf)
+            else:
+                _SCALAR_CODECS[type_id][2](buf, value)
+
+    def write(self, compound):
+        """
+        Write a compound to the stream.
+        """
+
+        buf = bytearray()
+        if not self._started:
+            buf += _MAGIC
+            self._started = True
+        self._encodeCompound(buf, compound)
+        self._outstream.write(bytes(buf))
+
+class KeyedReader(object):
+    """
+    Reader of a stream written by a KeyedWriter. The keys are interned and
+    every decoded compound shares the same key strings.
+
+    Usage:
+        for compound in KeyedReader(instream):
+            ...
+    """
+
+    def __init__(self, instream, keys=()):
+        """
+        Args:
+            instream: Stream object inheriting (io.RawIOBase).
+            keys: Predefined keys, the same as given to the writer.
+        """
+
+        self._instream = instream
+        self._keys = [_intern(key) for key in keys]
+        self._started = False
+
+    def _decodeKey(self):
+        key_id = deserializeByte(self._instream)
+        if key_id == _KEY_EXTENDED:
+            key_id = deserializeIntVar(self._instream)
+        if key_id < len(self._keys):
+            return self._keys[key_id]
+        if key_id != len(self._keys):
+            raise ValueError("Undefined key "+str(key_id)+"!")
+        key = _intern(deserializeString8(self._instream))
+        self._keys.append(key)
+        return key
+
+    def _decodeCompound(self, data_len):
+        obj = BTagCompound()
+        for i in range(data_len):
+            tag = self._decodeKey()
+            type_id = deserializeByte(self._instream)
+            if type_id == DataType.COMPOUND:
+                value = self._decodeCompound(
+                    deserializeIntVar(self._instream))
+            else:
+                value = deserializeValue(self._instream, type_id)
+            obj._append(tag, type_id, value)
+        return obj
+
+    def read(self):
+        """
+        Read the next compound (None at the end of the stream).
+        """
+
+        if not self._started:
+            magic = self._instream.read(len(_MAGIC))
+            if not magic:
+                return None
+            if magic != _MAGIC:
+                raise ValueError("Not a keyed stream!")
+            self._started = True
+        # The entry count, read in parts to detect the end of the stream
+        type_val = self._instream.read(1)
+        if not type_val:
+            return None
+        size = INTVAR_SIZES.get(bytearray(type_val)[0])
+        if size is None:
+            raise ValueError("Invalid entry count!")
+        data = type_val + self._instream.read(size)
+        return self._decodeCompound(decodeIntVar(data, 0)[0])
+
+    def __iter__(self):
+        while True:
+            compound = self.read()
+            if compound is None:
+                return
+            yield compound
@@ -0,0 +1,223 @@
+"""
+Parallel encoding and decoding of the top-level entries of large compounds.
+"""
+
+import multiprocessing
+import multiprocessing.pool
+try:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport
+    ProcessPoolExecutor = ThreadPoolExecutor = None
+
+from pyBTC.btc import *
+from pyBTC.btc import _LazyTag
+from pyBTC.serialization import _isSeekable, _readExact
+
+# Entries with fewer (estimated) bytes are encoded/decoded in the calling
+# process
+PARALLEL_THRESHOLD = 1 << 20
+
+def _estimateSize(type_id, value):
+    """
+    Estimate the number of encoded bytes of a compound entry.
+    """
+
+    if isinstance(value, _LazyTag):
+        # Written as a slice of its source buffer
+        return 0
+    if not isinstance(value, ABTag):
+        return 8
+    if type_id == DataType.COMPOUND:
+        return sum(_estimateSize(value._types[i], value._values[i])
+                   for i in range(value.size()))
+    if type_id in ITEM_SIZES:
+        return len(value.get_data())*ITEM_SIZES[type_id]
+    try:
+        return len(value.get_data())*8
+    except TypeError:
+        return 8
+
+def _encodeJob(btag_obj):
+    return btag_obj.to_bytes()
+
+def _decodeJob(job):
+    type_id, buf, offset = job
+    return decodeValue(buf, offset, type_id)[0]
+
+def _parallelMap(function, jobs, workers, processes, executor):
+    """
+    Apply function to all jobs in a pool and return the results in order.
+
+    Args:
+        function: Module level function (picklable for processes).
+        jobs: List of arguments.
+        workers: Number of workers (number of CPUs if None).
+        processes: Use processes instead of threads.
+        executor: Existing executor or pool with a map method, which is
+            used instead of creating one.
+    """
+
+    if executor is not None:
+        return list(executor.map(function, jobs))
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if ProcessPoolExecutor is not None:
+        if processes:
+            pool = ProcessPoolExecutor(workers)
+        else:
+            pool = ThreadPoolExecutor(workers)
+        try:
+            return list(pool.map(function, jobs))
+        finally:
+            pool.shutdown()
+    if processes:
+        pool = multiprocessing.Pool(workers)
+    else:
+        pool = multiprocessing.pool.ThreadPool(workers)
+    try:
+        return pool.map(function, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+def toBytesParallel(compound, workers=None, processes=True,
+                    threshold=PARALLEL_THRESHOLD, executor=None):
+    """
+    Get the serialized representation of a compound, encoding its large
+    top-level entries concurrently. The result is identical to to_bytes.
+
+    Args:
+        compound: BTagCompound object.
+        workers: Number of workers (number of CPUs if None).
+        processes: Use a process pool (default) instead of threads. The
+            entries are pickled to the processes, threads only run in
+            parallel where numpy releases the GIL.
+        threshold: Minimal estimated size in bytes of an entry to encode it
+            in the pool.
+        executor: Existing executor or pool to use instead of creating one.
+    """
+
+    jobs = []
+    job_entries = []
+    for i in range(compound.size()):
+        value = compound._values[i]
+        if _estimateSize(compound._types[i], value) >= threshold:
+            jobs.append(value)
+            job_entries.append(i)
+    encoded = {}
+    if len(jobs) > 1:
+        encoded = dict(zip(job_entries, _parallelMap(
+            _encodeJob, jobs, workers, processes, executor)))
+    buf = bytearray()
+    encodeIntVar(buf, compound.size())
+    for i in range(compound.size()):
+        encodeString8(buf, compound._tags[i])
+        encodeByte(buf, compound._types[i])
+        if i in encoded:
+            buf += encoded[i]
+        else:
+            compound._entry(i).serialize_into(buf)
+    return bytes(buf)
+
+def serializeParallel(outstream, compound, workers=None, processes=True,
+                      threshold=PARALLEL_THRESHOLD, executor=None):
+    """
+    Serialize a compound to a stream with toBytesParallel.
+    """
+
+    outstream.write(toBytesParallel(compound, workers, processes, threshold,
+                                    executor))
+
+def fromBytesParallel(buf, offset=0, workers=None, processes=True,
+                      threshold=PARALLEL_THRESHOLD, executor=None):
+    """
+    Create a compound from its serialized representation in a buffer. The
+    entry boundaries are scanned first (with skipValue), then top-level
+    entries of at least threshold bytes are decoded concurrently.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the compound in the buffer.
+        workers: Number of workers (number of CPUs if None).
+        processes: Use a process pool (default) instead of threads (also
+            tells whether a given executor runs processes). The encoded
+            bytes of the entries are sent to the processes and the decoded
+            tags are pickled back.
+        threshold: Minimal size in bytes of an entry to decode it in the
+            pool.
+        executor: Existing executor or pool to use instead of creating one.
+    """
+
+    # Scan the entries: (tag, type id, start, end)
+    entries = []
+    data_len, offset = decodeIntVar(buf, offset, allow_unknown=True)
+    while data_len is None or len(entries) < data_len:
+        tag, offset = decodeString8(buf, offset)
+        type_id, offset = decodeByte(buf, offset)
+        if type_id == DataType.END and data_len is None:
+            break
+        end = skipValue(buf, offset, type_id)
+        entries.append((tag, type_id, offset, end))
+        offset = end
+    jobs = []
+    job_entries = []
+    for i, (tag, type_id, start, end) in enumerate(entries):
+        if end - start >= threshold:
+            if processes:
+                jobs.append((type_id, bytes(buf[start:end]), 0))
+            else:
+                jobs.append((type_id, buf, start))
+            job_entries.append(i)
+    decoded = {}
+    if len(jobs) > 1:
+        decoded = dict(zip(job_entries, _parallelMap(
+            _decodeJob, jobs, workers, processes, executor)))
+    obj = BTagCompound()
+    for i, (tag, type_id, start, end) in enumerate(entries):
+        if i in decoded:
+            value = decoded[i]
+        else:
+            value = decodeValue(buf, start, type_id)[0]
+        obj._append(tag, type_id, value)
+    return obj
+
+class _RecordingStream(object):
+    """
+    Stream wrapper keeping a copy of all bytes read from the stream.
+    """
+
+    __slots__ = ('_instream', 'data')
+
+    def __init__(self, instream):
+        self._instream = instream
+        self.data = bytearray()
+
+    def read(self, size=-1):
+        data = self._instream.read(size)
+        self.data += data
+        return data
+
+def deserializeParallel(instream, workers=None, processes=True,
+                        threshold=PARALLEL_THRESHOLD, executor=None):
+    """
+    Deserialize a compound from a stream with fromBytesParallel. Only the
+    bytes of the compound are read, the stream is left behind it.
+    On a seekable stream the end of the compound is found by seeking over
+    its entries first, the compound is then read in one piece. Other
+    streams are read once, the bytes are kept while the entries are
+    skipped (the whole compound is held in memory either way).
+    """
+
+    if _isSeekable(instream):
+        start = instream.tell()
+        skipStreamValue(instream, DataType.COMPOUND)
+        size = instream.tell() - start
+        instream.seek(start)
+        data = _readExact(instream, size)
+    else:
+        recorder = _RecordingStream(instream)
+        skipStreamValue(recorder, DataType.COMPOUND)
+        data = bytes(recorder.data)
+    return fromBytesParallel(data, 0, workers, processes, threshold,
+                             executor)
@@ -0,0 +1,153 @@
+"""
+In-place patching of fixed-width values in serialized documents.
+"""
+
+import mmap
+
+from pyBTC.btc import *
+
+# Encoders of the fixed-width scalar types
+_SCALAR_ENCODERS = {
+    DataType.UINT8: encodeByte,
+    DataType.UINT16: encodeShort,
+    DataType.UINT32: encodeInt,
+    DataType.UINT64: encodeLong,
+    DataType.FLOAT: encodeFloat,
+    DataType.DOUBLE: encodeDouble,
+}
+
+# Packers of the elements of the fixed-width array types
+_ARRAY_PACKERS = {
+    DataType.UINT8_ARR: lambda values: packUIntArray(values, 1),
+    DataType.UINT16_ARR: lambda values: packUIntArray(values, 2),
+    DataType.UINT32_ARR: lambda values: packUIntArray(values, 4),
+    DataType.UINT64_ARR: lambda values: packUIntArray(values, 8),
+    DataType.FLOAT_ARR: packFloatArray,
+    DataType.DOUBLE_ARR: packDoubleArray,
+}
+
+def _splitPath(path):
+    """
+    Get the tags of a path ('/' separated string or sequence of tags).
+    """
+
+    if isinstance(path, (str, type(u''))):
+        return path.split('/')
+    return list(path)
+
+def _isBuffer(target):
+    # A mmap is a stream as well, but accessed as a buffer
+    return isinstance(target, mmap.mmap) or not hasattr(target, 'read')
+
+def _findEntry(target, offset, tag):
+    """
+    Find an entry of the compound at offset by its tag and get its type
+    and the offset of its value (None if there is no such entry).
+    """
+
+    if _isBuffer(target):
+        data_len, offset = decodeIntVar(target, offset, allow_unknown=True)
+        i = 0
+        while data_len is None or i < data_len:
+            entry_tag, offset = decodeString8(target, offset)
+            type_id, offset = decodeByte(target, offset)
+            if type_id == DataType.END and data_len is None:
+                break
+            if entry_tag == tag:
+                return type_id, offset
+            offset = skipValue(target, offset, type_id)
+            i += 1
+        return None
+    target.seek(offset)
+    data_len = deserializeIntVar(target, allow_unknown=True)
+    i = 0
+    while data_len is None or i < data_len:
+        entry_tag = deserializeString8(target)
+        type_id = deserializeByte(target)
+        if type_id == DataType.END and data_len is None:
+            break
+        if entry_tag == tag:
+            return type_id, target.tell()
+        skipStreamValue(target, type_id)
+        i += 1
+    return None
+
+def locateValue(target, path, offset=0):
+    """
+    Find a value in a serialized document by its tag path without decoding
+    the document. Returns the data type and the offset of the value.
+
+    Args:
+        target: Buffer (mmap, bytes, bytearray, memoryview) or seekable
+            stream.
+        path: '/' separated tags (e.g. "header/count") or sequence of tags.
+        offset: Position of the document.
+    """
+
+    type_id = DataType.COMPOUND
+    for tag in _splitPath(path):
+        if type_id != DataType.COMPOUND:
+            raise KeyError(path)
+        entry = _findEntry(target, offset, tag)
+        if entry is None:
+            raise KeyError(path)
+        type_id, offset = entry
+    return type_id, offset
+
+def _write(target, offset, data):
+    if _isBuffer(target):
+        target[offset:offset+len(data)] = data
+    else:
+        target.seek(offset)
+        target.write(data)
+
+def patchValue(target, path, value, index=None, offset=0):
+    """
+    Overwrite a fixed-width value of a serialized document in place. Only
+    changes which keep the layout are possible: scalars of the types
+    UINT8 - UINT64, FLOAT and DOUBLE, and elements of the arrays of these
+    types.
+
+    Args:
+        target: Writable buffer (mmap, bytearray, memoryview) or seekable
+            stream opened for reading and writing.
+        path: '/' separated tags (e.g. "header/count") or sequence of tags.
+        value: New value of a scalar. For arrays a single element (with
+            index), a sequence of elements starting at index or, without
+            index, a sequence of the same length as the array.
+        index: Position of the first patched array element.
+        offset: Position of the document.
+    """
+
+    type_id, offset = locateValue(target, path, offset)
+    if type_id in _SCALAR_ENCODERS:
+        if index is not None:
+            raise ValueError("Scalar "+str(path)+" has no elements!")
+        data = bytearray()
+        _SCALAR_ENCODERS[type_id](data, value)
+        _write(target, offset, bytes(data))
+        return
+    if type_id not in _ARRAY_PACKERS:
+        raise ValueError("Value "+str(path)+" of type "+str(type_id)
+                         + " cannot be patched without changing the layout!")
+    if _isBuffer(target):
+        array_len, offset = decodeIntVar(target, offset)
+    else:
+        target.seek(offset)
+        array_len = deserializeIntVar(target)
+        offset = target.tell()
+    if not hasattr(value, '__len__'):
+        if index is None:
+            raise ValueError("Array "+str(path)+" needs an index!")
+        value = [value]
+    if index is None:
+        if len(value) != array_len:
+            raise ValueError("Array length of "+str(path)+" cannot change ("
+                             + str(len(value))+" != "+str(array_len)+")!")
+        index = 0
+    if index < 0:
+        index += array_len
+    if index < 0 or index + len(value) > array_len:
+        raise IndexError("Elements out of the range of "+str(path)+"!")
+    _write(target, offset + index*ITEM_SIZES[type_id],
+           _ARRAY_PACKERS[type_id](value))
@@ -0,0 +1,171 @@
+"""
+Projection queries: selected values are decoded from serialized documents
+without building the compound tree.
+"""
+
+from pyBTC.btc import *
+from pyBTC.btc import _entryRange
+from pyBTC.patch import _splitPath, _isBuffer
+
+def _pathKey(path):
+    return tuple(path) if isinstance(path, list) else path
+
+def _pathTree(paths):
+    """
+    Get the requested paths as nested dicts of tags, a selected value is
+    marked by the list of its path keys instead of a dict. Paths below a
+    selected compound are returned separately as (key, key of the
+    compound, remaining tags).
+    """
+
+    tree = {}
+    nested = []
+    for path in sorted(paths, key=lambda path: len(_splitPath(path))):
+        key = _pathKey(path)
+        tags = _splitPath(path)
+        node = tree
+        for j in range(len(tags) - 1):
+            child = node.get(tags[j])
+            if child is None:
+                child = node[tags[j]] = {}
+            elif isinstance(child, list):
+                nested.append((key, child[0], tags[j+1:]))
+                break
+            node = child
+        else:
+            # Shorter paths come first, so this is no dict of child tags
+            keys = node.setdefault(tags[-1], [])
+            if key not in keys:
+                keys.append(key)
+    return tree, nested
+
+def _plainValue(value):
+    if isinstance(value, ABTag) and not isinstance(value, BTagCompound):
+        return value.get_data()
+    return value
+
+class _Query(object):
+    """
+    State of a query: the requested paths, the values found so far and the
+    number of selected values which have not been found yet.
+    """
+
+    __slots__ = ('tree', 'nested', 'result', 'pending')
+
+    def __init__(self, paths):
+        self.tree, self.nested = _pathTree(paths)
+        self.result = {}
+        self.pending = self._count(self.tree)
+
+    def _count(self, node):
+        count = 0
+        for child in node.values():
+            if isinstance(child, list):
+                count += 1
+            else:
+                count += self._count(child)
+        return count
+
+    def found(self, keys, value):
+        value = _plainValue(value)
+        for key in keys:
+            self.result[key] = value
+        self.pending -= 1
+
+    def resolveNested(self, default):
+        """
+        Get the values of the paths below selected compounds.
+        """
+
+        for key, parent_key, tags in self.nested:
+            value = self.result.get(parent_key)
+            for tag in tags:
+                if isinstance(value, BTagCompound):
+                    value = value.getTag(tag)
+                else:
+                    value = None
+                if value is None:
+                    value = default
+                    break
+                value = _plainValue(value)
+            self.result[key] = value
+
+    def walkBuffer(self, buf, offset, node):
+        """
+        Walk the compound at offset. Returns the offset behind it or None
+        once every path has been found.
+        """
+
+        data_len, offset = decodeIntVar(buf, offset, allow_unknown=True)
+        for i in _entryRange(data_len):
+            tag, offset = decodeString8(buf, offset)
+            type_id, offset = decodeByte(buf, offset)
+            if type_id == DataType.END and data_len is None:
+                break
+            selected = node.get(tag)
+            if isinstance(selected, list):
+                value, offset = decodeValue(buf, offset, type_id)
+                self.found(selected, value)
+                if self.pending <= 0:
+                    return None
+            elif selected is not None and type_id == DataType.COMPOUND:
+                offset = self.walkBuffer(buf, offset, selected)
+                if offset is None:
+                    return None
+            else:
+                offset = skipValue(buf, offset, type_id)
+        return offset
+
+    def walkStream(self, instream, node):
+        """
+        Walk the compound at the position of the stream up to its end.
+        """
+
+        data_len = deserializeIntVar(instream, allow_unknown=True)
+        for i in _entryRange(data_len):
+            tag = deserializeString8(instream)
+            type_id = deserializeByte(instream)
+            if type_id == DataType.END and data_len is None:
+                break
+            selected = node.get(tag)
+            if isinstance(selected, list):
+                self.found(selected, deserializeValue(instream, type_id))
+            elif selected is not None and type_id == DataType.COMPOUND:
+                self.walkStream(instream, selected)
+            else:
+                skipStreamValue(instream, type_id)
+
+def query(target, paths, offset=0, default=None):
+    """
+    Get selected values of a serialized document by their tag paths. The
+    entries are walked in a single pass, only the selected values are
+    decoded and all other bodies are skipped. Buffers are walked until the
+    last path is found, streams are left behind the document.
+
+    Usage:
+        values = query(buf, ["meta/id", "stats/mean", "samples"])
+        values["stats/mean"]
+
+    Args:
+        target: Buffer (mmap, bytes, bytearray, memoryview) or stream object
+            inheriting (io.RawIOBase) positioned at the document.
+        paths: Sequence of paths, each a '/' separated string or a
+            sequence of tags.
+        offset: Position of the document in a buffer.
+        default: Value of the paths which are not in the document.
+
+    Returns:
+        Dictionary of the values by path (lists of tags as tuples). Scalars
+        and arrays are plain values, compounds BTagCompound objects.
+    """
+
+    state = _Query(paths)
+    if _isBuffer(target):
+        if state.pending > 0:
+            state.walkBuffer(target, offset, state.tree)
+    else:
+        state.walkStream(target, state.tree)
+    state.resolveNested(default)
+    for path in paths:
+        state.result.setdefault(_pathKey(path), default)
+    return state.result
@@ -0,0 +1,174 @@
+"""
+Encoders and decoders compiled for compounds with a fixed layout.
+"""
+
+import array
+import struct
+
+from pyBTC.btc import *
+from pyBTC.serialization import (_floatToBits, _bitsToFloat, _doubleToBits,
+                                 _bitsToDouble)
+
+# Fixed-width scalar types: (struct code, value to field, field to value)
+_FIELD_FORMATS = {
+    DataType.UINT8: ('B', None, None),
+    DataType.UINT16: ('H', None, None),
+    DataType.UINT32: ('I', None, None),
+    DataType.UINT64: ('Q', None, None),
+    DataType.FLOAT: ('I', _floatToBits, _bitsToFloat),
+    DataType.DOUBLE: ('Q', _doubleToBits, _bitsToDouble),
+}
+
+class BTagSchema(object):
+    """
+    Encoder/decoder for compounds which all have the same tags and types in
+    the same order (e.g. the records of a BTagFile).
+
+    The layout is compiled into segments: a precomputed struct holding the
+    constant tag/type bytes and the fixed-width scalars up to the next
+    variable-width entry (string, array, compound), which is coded as
+    usual. A compound of only fixed-width scalars is thus encoded and
+    decoded with a single pack/unpack call. The bytes are identical to
+    those of BTagCompound.serialize; compounds or buffers which do not
+    match the layout are coded by the generic functions.
+    """
+
+    def __init__(self, prototype):
+        """
+        Args:
+            prototype: BTagCompound with the layout or sequence of
+                (tag, type_id) pairs.
+        """
+
+        if isinstance(prototype, BTagCompound):
+            pairs = list(zip(prototype._tags, prototype._types))
+        else:
+            pairs = list(prototype)
+        self._tags = [tag for tag, type_id in pairs]
+        self._types = array.array('B', [type_id for tag, type_id in pairs])
+        self._index = dict((tag, i) for i, tag in enumerate(self._tags))
+        # Segments: (struct, template of the pack arguments, positions of
+        # the constants, fields, variable entry after the struct or None).
+        # Fields: (argument position, entry index, to field, to value)
+        self._segments = []
+        formats = ['<']
+        template = []
+        constants = []
+        fields = []
+        def add_constant(data):
+            if constants and constants[-1] == len(template)-1:
+                template[-1] += data
+                formats[-1] = str(len(template[-1]))+'s'
+            else:
+                constants.append(len(template))
+                template.append(data)
+                formats.append(str(len(data))+'s')
+        def add_segment(variable):
+            self._segments.append((struct.Struct(''.join(formats)),
+                                   list(template), list(constants),
+                                   list(fields), variable))
+            del formats[1:]
+            del template[:]
+            del constants[:]
+            del fields[:]
+        head = bytearray()
+        encodeIntVar(head, len(pairs))
+        add_constant(bytes(head))
+        for i, (tag, type_id) in enumerate(pairs):
+            head = bytearray()
+            encodeString8(head, tag)
+            encodeByte(head, type_id)
+            add_constant(bytes(head))
+            if type_id in _FIELD_FORMATS:
+                code, to_field, to_value = _FIELD_FORMATS[type_id]
+                fields.append((len(template), i, to_field, to_value))
+                template.append(0)
+                formats.append(code)
+            else:
+                add_segment((i, type_id))
+        add_segment(None)
+
+    def matches(self, compound):
+        """
+        Check whether a compound has the layout of the schema.
+        """
+
+        return compound._tags == self._tags and compound._types == self._types
+
+    def encode_into(self, buf, compound):
+        """
+        Append the serialized compound to a bytearray.
+        """
+
+        if compound._pieces is not None or not self.matches(compound):
+            compound.serialize_into(buf)
+            return
+        values = compound._values
+        for packer, template, constants, fields, variable in self._segments:
+            args = list(template)
+            for position, i, to_field, to_value in fields:
+                value = values[i]
+                if isinstance(value, ABTag):
+                    value = value.get_data()
+                if to_field is not None:
+                    value = to_field(value)
+                args[position] = value
+            buf += packer.pack(*args)
+            if variable is not None:
+                value = values[variable[0]]
+                if isinstance(value, ABTag):
+                    value.serialize_into(buf)
+                else:
+                    encodeString(buf, value)
+
+    def encode(self, compound):
+        """
+        Get the serialized compound as bytes.
+        """
+
+        buf = bytearray()
+        self.encode_into(buf, compound)
+        return bytes(buf)
+
+    def serialize(self, outstream, compound):
+        """
+        Serialize the compound to a stream.
+        """
+
+        outstream.write(self.encode(compound))
+
+    def decode(self, buf, offset=0):
+        """
+        Decode a compound from a buffer at offset. Returns the compound and
+        the offset behind it.
+        """
+
+        start = offset
+        values = [None]*len(self._tags)
+        for packer, template, constants, fields, variable in self._segments:
+            if offset + packer.size > len(buf):
+                return self._decodeGeneric(buf, start)
+            unpacked = packer.unpack_from(buf, offset)
+            for position in constants:
+                if unpacked[position] != template[position]:
+                    return self._decodeGeneric(buf, start)
+            for position, i, to_field, to_value in fields:
+                value = unpacked[position]
+                if to_value is not None:
+                    value = to_value(value)
+                values[i] = value
+            offset += packer.size
+            if variable is not None:
+                values[variable[0]], offset = decodeValue(buf, offset,
+                                                          variable[1])
+        obj = BTagCompound()
+        obj._index = dict(self._index)
+        obj._tags = list(self._tags)
+        obj._types = array.array('B', self._types)
+        obj._values = values
+        return obj, offset
+
+    def _decodeGeneric(self, buf, offset):
+        obj = BTagCompound()
+        offset = obj.deserialize_from(buf, offset)
+        return obj, offset
@@ -2,7 +2,11 @@
 Fundamental serialization functions for the primitive types.
 """
 
+import array
 import math
+import numbers
+import struct
+import sys
 
 # Check numpy availability
 ASSERT_NUMPY = True
@@ -11,6 +15,76 @@ try:
 except ImportError:
     ASSERT_NUMPY = False
 
+# Little-endian and native numpy types of the unsigned integers by byte size
+if ASSERT_NUMPY:
+    _LE_DTYPES = {1: numpy.dtype('<u1'), 2: numpy.dtype('<u2'),
+                  4: numpy.dtype('<u4'), 8: numpy.dtype('<u8')}
+    _NATIVE_DTYPES = {1: numpy.uint8, 2: numpy.uint16,
+                      4: numpy.uint32, 8: numpy.uint64}
+
+def _arrayTypecode(itemsize):
+    """
+    Find the typecode of the stdlib array module for an unsigned integer of
+    the given byte size (None if the platform has none).
+    """
+
+    for code in 'BHILQ':
+        try:
+            if array.array(code).itemsize == itemsize:
+                return code
+        except ValueError:
+            # 'Q' is not available on Python 2
+            pass
+    return None
+
+_ARRAY_TYPECODES = dict((n, _arrayTypecode(n)) for n in (1, 2, 4, 8))
+
+# Precompiled little-endian layouts of the primitive types
+_UINT8 = struct.Struct('<B')
+_UINT16 = struct.Struct('<H')
+_UINT32 = struct.Struct('<I')
+_UINT64 = struct.Struct('<Q')
+_IEEE_DOUBLE = struct.Struct('<d')
+_UINT_FORMATS = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+_UINT_STRUCTS = {1: _UINT8, 2: _UINT16, 4: _UINT32, 8: _UINT64}
+# IntVar: type byte followed by the value
+_INTVAR_STRUCTS = (struct.Struct('<BB'), struct.Struct('<BH'),
+                   struct.Struct('<BI'), struct.Struct('<BQ'))
+
+_MANT52_MASK = (1 << 52) - 1
+
+# Type byte of serializeIntVar for a count which is not known in advance.
+# The counted items are then terminated by an end marker instead.
+INTVAR_UNKNOWN = 255
+# Number of value bytes behind the type byte of an IntVar
+INTVAR_SIZES = dict((type_val, intvar.size - 1)
+                    for type_val, intvar in enumerate(_INTVAR_STRUCTS))
+
+def _toBytes(string):
+    """
+    Get the byte representation of a string (text is encoded as UTF-8).
+    """
+
+    if isinstance(string, bytes):
+        return string
+    if isinstance(string, (bytearray, memoryview)):
+        return bytes(bytearray(string))
+    return string.encode('utf-8', 'surrogateescape'
+                         if str is not bytes else 'strict')
+
+def _toNative(data):
+    """
+    Get the native string type of a deserialized byte string.
+    On Python 3 the bytes are decoded as UTF-8, undecodable bytes are kept
+    as surrogates so that serialization restores them.
+    """
+
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if str is bytes:
+        return bytes(data)
+    return data.decode('utf-8', 'surrogateescape')
+
 def serializeByte(outstream, byte):
     """
     Serialize a single byte.
@@ -20,7 +94,7 @@ def serializeByte(outstream, byte):
         byte: Integer value in the range (0 <= byte < 255).
     """
 
-    outstream.write(chr(byte))
+    outstream.write(_UINT8.pack(byte))
 
 def deserializeByte(instream):
     """
@@ -30,7 +104,7 @@ def deserializeByte(instream):
         instream: Stream object inheriting (io.RawIOBase).
     """
 
-    return int(instream.read(1).encode('hex'), 16)
+    return _UINT8.unpack(instream.read(1))[0]
 
 def serializeShort(outstream, short_integer):
     """
@@ -41,9 +115,7 @@ def serializeShort(outstream, short_integer):
         short_integer: Integer value in the range (0 <= byte < 65536).
     """
 
-    data = int(short_integer)
-    serializeByte(outstream,data%256)
-    serializeByte(outstream,data/256)
+    outstream.write(_UINT16.pack(int(short_integer)))
 
 def deserializeShort(instream):
     """
@@ -53,9 +125,7 @@ def deserializeShort(instream):
         instream: Stream object inheriting (io.RawIOBase).
     """
 
-    data = deserializeByte(instream)
-    data += deserializeByte(instream)*256
-    return data
+    return _UINT16.unpack(instream.read(2))[0]
 
 def serializeInt(outstream, integer):
     """
@@ -66,9 +136,7 @@ def serializeInt(outstream, integer):
         integer: Integer value in the range (0 <= byte < 4294967296).
     """
 
-    data = long(integer)
-    serializeShort(outstream, data%65536)
-    serializeShort(outstream, data/65536)
+    outstream.write(_UINT32.pack(int(integer)))
 
 def deserializeInt(instream):
     """
@@ -78,9 +146,7 @@ def deserializeInt(instream):
         instream: Stream object inheriting (io.RawIOBase).
     """
 
-    data = long(deserializeShort(instream))
-    data += long(deserializeShort(instream))*65536
-    return(data)
+    return _UINT32.unpack(instream.read(4))[0]
 
 def serializeLong(outstream, long_integer):
     """
@@ -91,9 +157,7 @@ def serializeLong(outstream, long_integer):
         long_integer: Integer value in the range (0 <= byte < 2^64).
     """
 
-    data = long(long_integer)
-    serializeInt(outstream, data%4294967296)
-    serializeInt(outstream, data/4294967296)
+    outstream.write(_UINT64.pack(int(long_integer)))
 
 def deserializeLong(instream):
     """
@@ -103,9 +167,20 @@ def deserializeLong(instream):
         instream: Stream object inheriting (io.RawIOBase).
     """
 
-    data = long(deserializeInt(instream))
-    data += long(deserializeInt(instream))*4294967296
-    return(data)
+    return _UINT64.unpack(instream.read(8))[0]
+
+def _intVarType(int_val):
+    """
+    Get the representation type of serializeIntVar for an integer.
+    """
+
+    if int_val < 256:
+        return 0
+    elif int_val < 65536:
+        return 1
+    elif int_val < 4294967296:
+        return 2
+    return 3
 
 def serializeIntVar(outstream, int_val):
     """
@@ -119,20 +194,36 @@ def serializeIntVar(outstream, int_val):
         int_val: Integer value in the range (0 <= byte < 2^64).
     """
 
-    if int_val <= 256:
-        serializeByte(outstream,0)
-        serializeByte(outstream,int_val)
-    elif (int_val > 256) and (int_val <= 65536):
-        serializeByte(outstream,1)
-        serializeShort(outstream,int_val)
-    elif (int_val > 65536) and (int_val <= 4294967296):
-        serializeByte(outstream,2)
-        serializeInt(outstream,int_val)
-    else:
-        serializeByte(outstream,3)
-        serializeLong(outstream,int_val)
+    type_val = _intVarType(int_val)
+    outstream.write(_INTVAR_STRUCTS[type_val].pack(type_val, int_val))
+
+def serializeIntVarLong(outstream, int_val):
+    """
+    Serialize an integer in the 8 byte representation of serializeIntVar
+    regardless of its size. The value can thus be overwritten in place once
+    the final value is known.
+
+    Args:
+        outstream: Stream object inheriting (io.RawIOBase).
+        int_val: Integer value in the range (0 <= byte < 2^64).
+    """
+
+    outstream.write(_INTVAR_STRUCTS[3].pack(3, int_val))
+
+def _unknownCount():
+    return ValueError("Unknown count marker where a length is expected!")
+
+def deserializeIntVar(instream, allow_unknown=False):
+    """
+    Deserialize an integer of serializeIntVar.
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        allow_unknown: Return None for the unknown count marker
+            INTVAR_UNKNOWN (only valid as entry count of a compound)
+            instead of raising ValueError.
+    """
 
-def deserializeIntVar(instream):
     type_val = deserializeByte(instream)
     if type_val == 0:
         return deserializeByte(instream)
@@ -140,9 +231,86 @@ def deserializeIntVar(instream):
         return deserializeShort(instream)
     elif type_val == 2:
         return deserializeInt(instream)
+    elif type_val == INTVAR_UNKNOWN:
+        if not allow_unknown:
+            raise _unknownCount()
+        return None
     else:
         return deserializeLong(instream)
 
+# Layout of the custom floating point formats by byte size:
+# (exponent bits, exponent bias, mantissa bits)
+_FLOAT_LAYOUTS = {4: (8, 127, 23), 8: (11, 1023, 52)}
+
+def _specialToBits(float_val, itemsize):
+    """
+    Get the integer representation |s|exp|mant| of zero, inf, NaN and
+    numbers which are subnormal as double by numerical decomposition.
+
+    Args:
+        float_val: Floating point number.
+        itemsize: Size of the representation in bytes (4 or 8).
+    """
+
+    exp_bits, bias, mant_bits = _FLOAT_LAYOUTS[itemsize]
+    exp_max = (1 << exp_bits) - 1
+    # Special cases
+    if float_val == 0:
+        mant, exp = 0.5, exp_max
+    elif math.isinf(float_val):
+        mant, exp = 0.75, exp_max
+    elif math.isnan(float_val):
+        mant, exp = 0.875, exp_max
+    else:
+        mant, exp = math.frexp(abs(float_val))
+        exp += bias
+    # Sign (NaN and -0. are stored without sign)
+    if float_val < 0:
+        exp += exp_max+1
+    if exp < 0 or exp > 2*exp_max+1:
+        raise ValueError("Value not representable in "
+                         + str(itemsize) + " byte floating point format!")
+    return (exp << mant_bits) + int((mant-0.5)*float(1 << (mant_bits+1)))
+
+def _floatToBits(float_val):
+    """
+    Get the integer representation of a 4 byte floating point number.
+    The number is stored in the format |s|exp|mant| where s is 1 bit, exp is
+    8 bits and mant 23 bits long. For normal numbers this is taken directly
+    from the IEEE 754 bits of the double value.
+    """
+
+    bits = _UINT64.unpack(_IEEE_DOUBLE.pack(float_val))[0]
+    exp = (bits >> 52) & 2047
+    if exp == 0 or exp == 2047:
+        return _specialToBits(float_val, 4)
+    # frexp exponent is (exp-1022), stored with bias 127
+    sign_exp = ((bits >> 63) << 8) + exp - 895
+    if sign_exp < 0 or sign_exp > 511:
+        raise ValueError("Value not representable in "
+                         "4 byte floating point format!")
+    return (sign_exp << 23) + ((bits & _MANT52_MASK) >> 29)
+
+def _bitsToFloat(data):
+    """
+    Get the 4 byte floating point number of its integer representation.
+    """
+
+    sign = data >> 31
+    exp = (data >> 23) & 255
+    mant = data & 8388607
+    # Special cases
+    if exp == 255:
+        if mant == 0:
+            return -0. if sign else 0.
+        elif mant == 4194304:
+            return -float('inf') if sign else float('inf')
+        elif mant == 6291456:
+            return -float('nan') if sign else float('nan')
+    # Normal number: always a normal double with exponent (exp-127-1+1023)
+    return _IEEE_DOUBLE.unpack(_UINT64.pack(
+        (sign << 63) | ((exp+895) << 52) | (mant << 29)))[0]
+
 def serializeFloat(outstream, float_val):
     """
      * Serialize a floating point number of size 4 byte.
@@ -152,77 +320,51 @@ def serializeFloat(outstream, float_val):
      * It is then serialized as a uint32_t to get rid of byte order issues.
     """
 
-    data = long(0)
-    mant, exp = math.frexp(float_val)
-    # Write sign
-    if (mant < 0):
-        mant = -mant
-        data += 2147483648L  # Set bit 31: 2^31
-    exp += 127
-    # Special cases
-    # TODO Eliminate the dependence on the limits include (Flo)
-    if float_val == 0:
-        mant = 0.5
-        exp = 255
-    elif math.isinf(float_val):
-        # Handle inf case
-        mant = 0.75
-        exp = 255
-    elif(math.isnan(float_val)):
-        # Handle quiet NaN case
-        mant = 0.875
-        exp = 255
-    # Write exponent
-    data += exp*8388608L  # Set bits 23-30: 2^23
-    # Write mantissa
-    mant -= 0.5  # Subtract hidden bit
-    data += int(mant*16777216.)  # Set bits 0-22: (0 <= mant < 0.5)
-    serializeInt(outstream,data)
+    outstream.write(_UINT32.pack(_floatToBits(float_val)))
 
 def deserializeFloat(instream):
     """
     Deserialize a floating point number of size 4 byte.
     """
 
-    data = deserializeInt(instream)
-    val = 0.5
-    # Get sign
-    s = data/2147483648L
-    data %= 2147483648L
-    # Get exponent
-    exp = data/8388608L
-    data %= 8388608L
-    # Get mantissa
-    val += (float(data))/16777216.
+    return _bitsToFloat(_UINT32.unpack(instream.read(4))[0])
+
+def _doubleToBits(double_val):
+    """
+    Get the integer representation of an 8 byte floating point number.
+    The number is stored in the format |s|exp|mant| where s is 1 bit, exp is
+    11 bits and mant 52 bits long. For normal numbers this is the IEEE 754
+    representation with the exponent incremented by one.
+    """
+
+    bits = _UINT64.unpack(_IEEE_DOUBLE.pack(double_val))[0]
+    exp = (bits >> 52) & 2047
+    if exp == 0 or exp == 2047:
+        return _specialToBits(double_val, 8)
+    return bits + (1 << 52)
+
+def _bitsToDouble(data):
+    """
+    Get the 8 byte floating point number of its integer representation.
+    """
+
+    sign = data >> 63
+    exp = (data >> 52) & 2047
+    mant = data & _MANT52_MASK
     # Special cases
-    if (val == 0.5) and (exp == 255):
-        # Handle zero case
-        if(s == 1):
-            val = -0.
-        else:
-            val = 0.
-        return val
-    elif (val == 0.75) and (exp == 255):
-        # Handle inf case
-        if(s == 1):
-            val = -float('inf')
-        else:
-            val = float('inf')
-        return val
-    elif (val == 0.875) and (exp == 255):
-        # Handle quiet NaN case
-        if (s == 1):
-            val = -float('nan')
-        else:
-            val = float('nan')
-        return val
-    # Normal number
-    if (s == 1):
-        val = -val
-    exp -= 127
-    # Multiply them together
-    val = math.ldexp(val,exp)
-    return(val)
+    if exp == 2047:
+        if mant == 0:
+            return -0. if sign else 0.
+        elif mant == 2251799813685248:
+            return -float('inf') if sign else float('inf')
+        elif mant == 3377699720527872:
+            return -float('nan') if sign else float('nan')
+    if exp >= 2:
+        # Normal number: IEEE 754 representation with exponent (exp-1)
+        return _IEEE_DOUBLE.unpack(_UINT64.pack(data - (1 << 52)))[0]
+    # Subnormal number
+    val = math.ldexp(0.5 + float(mant)/9007199254740992., exp-1023)
+    return -val if sign else val
 
 def serializeDouble(outstream, double_val):
     """
@@ -233,85 +375,22 @@ def serializeDouble(outstream, double_val):
      * It is then serialized as a uint64_t to get rid of byte order issues.
     """
 
-    data = long(0)
-    mant, exp = math.frexp(double_val)
-    # Write sign
-    if (mant < 0):
-        mant = -mant
-        data += 9223372036854775808L  # Set bit 31: 2^63
-    exp += 1023
-    # Special cases
-    # TODO Eliminate the dependence on the limits include (Flo)
-    if double_val == 0:
-        mant = 0.5
-        exp = 2047
-    elif math.isinf(double_val):
-        # Handle inf case
-        mant = 0.75
-        exp = 2047
-    elif(math.isnan(double_val)):
-        # Handle quiet NaN case
-        mant = 0.875
-        exp = 2047
-    # Write exponent
-    data += long(exp)*4503599627370496L  # Set bits 52-62: 2^52
-    # Write mantissa
-    mant -= 0.5  # Subtract hidden bit
-    data += long(mant*9007199254740992.)  # Set bits 0-51: (0 <= mant < 0.5)
-    serializeLong(outstream,data)
+    outstream.write(_UINT64.pack(_doubleToBits(double_val)))
 
 def deserializeDouble(instream):
     """
     Deserialize a floating point number of size 8 byte.
     """
 
-    data = deserializeLong(instream)
-    val = 0.5
-    # Get sign
-    s = data/9223372036854775808L
-    data %= 9223372036854775808L
-    # Get exponent
-    exp = data/4503599627370496L
-    data %= 4503599627370496L
-    # Get mantissa
-    val += (float(data))/9007199254740992.
-    # Special cases
-    if (val == 0.5) and (exp == 2047):
-        # Handle zero case
-        if(s == 1):
-            val = -0.
-        else:
-            val = 0.
-        return val
-    elif (val == 0.75) and (exp == 2047):
-        # Handle inf case
-        if(s == 1):
-            val = -float('inf')
-        else:
-            val = float('inf')
-        return val
-    elif (val == 0.875) and (exp == 2047):
-        # Handle quiet NaN case
-        if (s == 1):
-            val = -float('nan')
-        else:
-            val = float('nan')
-        return val
-    # Normal number
-    if (s == 1):
-        val = -val
-    exp -= 1023
-    # Multiply them together
-    val = math.ldexp(val,exp)
-    return(val)
+    return _bitsToDouble(_UINT64.unpack(instream.read(8))[0])
 
 def serializeString8(outstream, string):
     """
     Serialize a string with a length in the range (0 <= len < 256).
     """
 
-    serializeByte(outstream, len(string))
-    outstream.write(string)
+    data = _toBytes(string)
+    outstream.write(_UINT8.pack(len(data)) + data)
 
 def deserializeString8(instream):
     """
@@ -319,15 +398,15 @@ def deserializeString8(instream):
     """
 
     string_len = deserializeByte(instream)
-    return instream.read(string_len)
+    return _toNative(instream.read(string_len))
 
 def serializeString16(outstream, string):
     """
     Serialize a string with a length in the range (0 <= len < 2^16).
     """
 
-    serializeShort(outstream, len(string))
-    outstream.write(string)
+    data = _toBytes(string)
+    outstream.write(_UINT16.pack(len(data)) + data)
 
 def deserializeString16(instream):
     """
@@ -335,15 +414,15 @@ def deserializeString16(instream):
     """
 
     string_len = deserializeShort(instream)
-    return instream.read(string_len)
+    return _toNative(instream.read(string_len))
 
 def serializeString32(outstream, string):
     """
     Serialize a string with a length in the range (0 <= len < 2^32).
     """
 
-    serializeInt(outstream, len(string))
-    outstream.write(string)
+    data = _toBytes(string)
+    outstream.write(_UINT32.pack(len(data)) + data)
 
 def deserializeString32(instream):
     """
@@ -351,15 +430,15 @@ def deserializeString32(instream):
     """
 
     string_len = deserializeInt(instream)
-    return instream.read(string_len)
+    return _toNative(instream.read(string_len))
 
 def serializeString64(outstream, string):
     """
     Serialize a string with a length in the range (0 <= len < 2^64).
     """
 
-    serializeLong(outstream, len(string))
-    outstream.write(string)
+    data = _toBytes(string)
+    outstream.write(_UINT64.pack(len(data)) + data)
 
 def deserializeString64(instream):
     """
@@ -367,15 +446,16 @@ def deserializeString64(instream):
     """
 
     string_len = deserializeLong(instream)
-    return instream.read(string_len)
+    return _toNative(instream.read(string_len))
 
 def serializeString(outstream, string):
     """
     Serialize a string with a length in the range (0 <= len < 256).
     """
 
-    serializeIntVar(outstream, len(string))
-    outstream.write(string)
+    data = _toBytes(string)
+    type_val = _intVarType(len(data))
+    outstream.write(_INTVAR_STRUCTS[type_val].pack(type_val, len(data)) + data)
 
 def deserializeString(instream):
     """
@@ -383,193 +463,549 @@ def deserializeString(instream):
     """
 
     string_len = deserializeIntVar(instream)
-    return instream.read(string_len)
+    return _toNative(instream.read(string_len))
 
-def serializeByteArray(outstream, byte_arr):
+def _readExact(instream, size):
     """
-    Serialize a single byte.
+    Read exactly size bytes from the stream.
 
     Args:
-        outstream: Stream object inheriting (io.RawIOBase).
-        byte: Integer value in the range (0 <= byte < 255).
+        instream: Stream object inheriting (io.RawIOBase).
+        size: Number of bytes to read.
     """
 
-    serializeIntVar(outstream, len(byte_arr))
-    for x in byte_arr:
-        serializeByte(outstream, x)
+    data = instream.read(size)
+    if len(data) != size:
+        raise EOFError("Unexpected end of stream!")
+    return data
 
-def deserializeByteArray(instream):
+def skipBytes(instream, size):
     """
-    Deserialize a single byte.
+    Skip size bytes of the stream, by seeking if possible.
 
     Args:
         instream: Stream object inheriting (io.RawIOBase).
+        size: Number of bytes to skip.
+    """
+
+    try:
+        instream.seek(size, 1)
+        return
+    except (AttributeError, IOError, OSError):
+        pass
+    while size > 0:
+        data = instream.read(min(size, 1 << 20))
+        if not data:
+            raise EOFError("Unexpected end of stream!")
+        size -= len(data)
+
+def _integer(value):
+    """
+    Get an array element as an integer, floats are accepted if they are
+    integral (e.g. 2.0).
+    """
+
+    if isinstance(value, numbers.Integral):
+        return value
+    if isinstance(value, numbers.Real) and float(value).is_integer():
+        return int(value)
+    raise ValueError("Array elements must be integers!")
+
+def _uintArray(int_arr, itemsize):
+    """
+    Convert a one-dimensional integer sequence to a numpy array of unsigned
+    integers of itemsize bytes. Values which do not fit (or are not
+    integral) are refused instead of being wrapped or truncated.
+    """
+
+    dtype = _LE_DTYPES[itemsize]
+    arr = numpy.asarray(int_arr)
+    if arr.dtype.kind == 'f' and not isinstance(int_arr, numpy.ndarray):
+        # numpy gives float64 for lists mixing signed and 64 bit unsigned
+        # values, the python integers are checked one by one instead
+        arr = numpy.array(int_arr, dtype=object)
+    if arr.ndim != 1:
+        raise ValueError("Array must be one-dimensional (ndim="
+                         + str(arr.ndim) + ")!")
+    if arr.size == 0 or arr.dtype == dtype:
+        return arr
+    if arr.dtype.kind == 'O':
+        # Python integers beyond the range of the numpy integer types
+        arr = numpy.array([_integer(x) for x in arr], dtype=object)
+        low, high = min(arr), max(arr)
+    elif arr.dtype.kind == 'f':
+        if not numpy.all(numpy.isfinite(arr) & (arr == numpy.floor(arr))):
+            raise ValueError("Array elements must be integers!")
+        low, high = int(arr.min()), int(arr.max())
+    elif arr.dtype.kind not in 'biu':
+        raise ValueError("Array of dtype " + str(arr.dtype)
+                         + " cannot be stored as unsigned integers!")
+    elif numpy.can_cast(arr.dtype, dtype):
+        return arr
+    else:
+        low, high = int(arr.min()), int(arr.max())
+    if low < 0 or high >= 1 << (8*itemsize):
+        raise ValueError("Value out of the range of " + str(itemsize)
+                         + " byte unsigned integers!")
+    return arr.astype(dtype)
+
+def packUIntArray(int_arr, itemsize):
+    """
+    Get the little-endian byte representation of an unsigned integer array.
+    The whole array is converted in one operation instead of element by
+    element.
+
+    Args:
+        int_arr: Sequence of integers (list, numpy.ndarray, ...).
+        itemsize: Size of a single element in bytes (1, 2, 4 or 8).
+    """
+
+    if ASSERT_NUMPY:
+        return numpy.ascontiguousarray(_uintArray(int_arr, itemsize),
+                                       dtype=_LE_DTYPES[itemsize]).tobytes()
+    code = _ARRAY_TYPECODES[itemsize]
+    if code is None:
+        # No matching array type: pack with struct
+        try:
+            return struct.pack('<' + str(len(int_arr))
+                               + _UINT_FORMATS[itemsize], *int_arr)
+        except struct.error:
+            return struct.pack('<' + str(len(int_arr))
+                               + _UINT_FORMATS[itemsize],
+                               *[_integer(x) for x in int_arr])
+    try:
+        arr = array.array(code, int_arr)
+    except TypeError:
+        # Integral floats
+        arr = array.array(code, [_integer(x) for x in int_arr])
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    if hasattr(arr, 'tobytes'):
+        return arr.tobytes()
+    return arr.tostring()
+
+def unpackUIntArray(data, itemsize, count=-1, offset=0):
+    """
+    Convert the little-endian byte representation of an unsigned integer
+    array back into an array (numpy.ndarray if available, list otherwise).
+
+    Args:
+        data: Bytes-like object with a length of a multiple of itemsize.
+        itemsize: Size of a single element in bytes (1, 2, 4 or 8).
+        count: Number of elements to convert (-1 for all until the end).
+        offset: Position of the first element in data.
     """
 
-    array_len = deserializeIntVar(instream)
-    array = None
     if ASSERT_NUMPY:
-        array = numpy.empty(array_len, dtype=numpy.uint8)
+        return numpy.frombuffer(data, dtype=_LE_DTYPES[itemsize], count=count,
+                                offset=offset).astype(_NATIVE_DTYPES[itemsize])
+    if count < 0:
+        count = (len(data)-offset)//itemsize
+    data = data[offset:offset+count*itemsize]
+    code = _ARRAY_TYPECODES[itemsize]
+    if code is None:
+        return list(struct.unpack('<' + str(len(data)//itemsize)
+                                  + _UINT_FORMATS[itemsize], data))
+    arr = array.array(code)
+    if hasattr(arr, 'frombytes'):
+        arr.frombytes(data)
+    elif isinstance(data, bytes):
+        arr.fromstring(data)
     else:
-        array = [None]*array_len
-    for i in range(array_len):
-        array[i] = deserializeByte(instream)
-    return array
+        arr.fromstring(bytes(bytearray(data)))
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr.tolist()
+
+# Number of array elements converted per block when arrays are written from
+# chunks or read into a given output array
+ARRAY_CHUNK_SIZE = 1 << 16
+
+def _isSeekable(stream):
+    """
+    Check whether the position of a stream can be changed.
+    """
+
+    try:
+        return stream.seekable()
+    except AttributeError:
+        # Python 2 file objects have no seekable()
+        try:
+            stream.tell()
+            return True
+        except (AttributeError, IOError, OSError):
+            return False
+
+def _serializeArray(outstream, arr, pack):
+    """
+    Serialize the length and payload of an array. Sequences longer than
+    ARRAY_CHUNK_SIZE (e.g. a numpy.memmap) are converted and written block
+    by block. Other iterables are taken as a series of chunks (sequences).
+    On seekable streams the chunks are written as they come and their
+    total length is written at the end in the 8 byte IntVar
+    representation, on other streams all chunks are converted before the
+    length and the payload are written.
+
+    Args:
+        outstream: Stream object inheriting (io.RawIOBase).
+        arr: Sequence of values or iterable of chunks of values.
+        pack: Function converting a sequence of values into bytes.
+    """
+
+    if hasattr(arr, '__len__'):
+        arr_len = len(arr)
+        serializeIntVar(outstream, arr_len)
+        if arr_len <= ARRAY_CHUNK_SIZE:
+            outstream.write(pack(arr))
+            return
+        for start in range(0, arr_len, ARRAY_CHUNK_SIZE):
+            outstream.write(pack(arr[start:start+ARRAY_CHUNK_SIZE]))
+        return
+    if not _isSeekable(outstream):
+        arr_len = 0
+        payload = []
+        for chunk in arr:
+            payload.append(pack(chunk))
+            arr_len += len(chunk)
+        serializeIntVar(outstream, arr_len)
+        for data in payload:
+            outstream.write(data)
+        return
+    position = outstream.tell()
+    serializeIntVarLong(outstream, 0)
+    arr_len = 0
+    for chunk in arr:
+        outstream.write(pack(chunk))
+        arr_len += len(chunk)
+    end = outstream.tell()
+    outstream.seek(position)
+    serializeIntVarLong(outstream, arr_len)
+    outstream.seek(end)
+
+def _deserializeArray(instream, itemsize, unpack, out):
+    """
+    Deserialize the length and payload of an array. Without out the payload
+    is read at once, otherwise it is read and converted block by block
+    into out.
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        itemsize: Size of a single element in bytes.
+        unpack: Function converting bytes into a sequence of values.
+        out: None, a preallocated array (numpy.ndarray, numpy.memmap,
+            list, ...) or a function(length) returning one.
+    """
+
+    array_len = deserializeIntVar(instream)
+    if out is None:
+        return unpack(_readExact(instream, array_len*itemsize))
+    if callable(out):
+        out = out(array_len)
+    if len(out) < array_len:
+        raise ValueError("Output array is too small ("+str(len(out))+" < "
+                         + str(array_len)+")!")
+    for start in range(0, array_len, ARRAY_CHUNK_SIZE):
+        count = min(ARRAY_CHUNK_SIZE, array_len-start)
+        out[start:start+count] = unpack(_readExact(instream, count*itemsize))
+    if len(out) == array_len:
+        return out
+    return out[:array_len]
+
+def serializeUIntArray(outstream, int_arr, itemsize):
+    """
+    Serialize an unsigned integer array (see _serializeArray for chunked
+    sources).
+
+    Args:
+        outstream: Stream object inheriting (io.RawIOBase).
+        int_arr: Sequence of integers in the range of itemsize bytes or
+            iterable of such sequences.
+        itemsize: Size of a single element in bytes (1, 2, 4 or 8).
+    """
+
+    _serializeArray(outstream, int_arr,
+                    lambda chunk: packUIntArray(chunk, itemsize))
+
+def deserializeUIntArray(instream, itemsize, out=None):
+    """
+    Deserialize an unsigned integer array with a single read of its payload
+    or block by block into out.
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        itemsize: Size of a single element in bytes (1, 2, 4 or 8).
+        out: Optional output array or function(length) returning one.
+    """
+
+    return _deserializeArray(instream, itemsize,
+                             lambda data: unpackUIntArray(data, itemsize), out)
+
+def serializeByteArray(outstream, byte_arr):
+    """
+    Serialize a byte array.
+
+    Args:
+        outstream: Stream object inheriting (io.RawIOBase).
+        byte_arr: Integer values in the range (0 <= byte < 256).
+    """
+
+    serializeUIntArray(outstream, byte_arr, 1)
+
+def deserializeByteArray(instream, out=None):
+    """
+    Deserialize a byte array.
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        out: Optional output array or function(length) returning one.
+    """
+
+    return deserializeUIntArray(instream, 1, out)
 
 def serializeShortArray(outstream, short_arr):
     """
-    Serialize a short integer.
+    Serialize a short integer array.
 
     Args:
         outstream: Stream object inheriting (io.RawIOBase).
-        short_integer: Integer value in the range (0 <= byte < 65536).
+        short_arr: Integer values in the range (0 <= short < 65536).
     """
 
-    serializeIntVar(outstream, len(short_arr))
-    for x in short_arr:
-        serializeShort(outstream, x)
+    serializeUIntArray(outstream, short_arr, 2)
 
-def deserializeShortArray(instream):
+def deserializeShortArray(instream, out=None):
     """
-    Deserialize a short integer.
+    Deserialize a short integer array.
 
     Args:
         instream: Stream object inheriting (io.RawIOBase).
+        out: Optional output array or function(length) returning one.
     """
 
-    array_len = deserializeIntVar(instream)
-    array = None
-    if ASSERT_NUMPY:
-        array = numpy.empty(array_len, dtype=numpy.uint16)
-    else:
-        array = [None]*array_len
-    for i in range(array_len):
-        array[i] = deserializeShort(instream)
-    return array
+    return deserializeUIntArray(instream, 2, out)
 
 def serializeIntArray(outstream, integer_arr):
     """
-    Serialize an integer.
+    Serialize an integer array.
 
     Args:
         outstream: Stream object inheriting (io.RawIOBase).
-        integer: Integer value in the range (0 <= byte < 4294967296).
+        integer_arr: Integer values in the range (0 <= int < 4294967296).
     """
 
-    serializeIntVar(outstream, len(integer_arr))
-    for x in integer_arr:
-        serializeInt(outstream, x)
+    serializeUIntArray(outstream, integer_arr, 4)
 
-def deserializeIntArray(instream):
+def deserializeIntArray(instream, out=None):
     """
-    Deserialize an integer.
+    Deserialize an integer array.
 
     Args:
         instream: Stream object inheriting (io.RawIOBase).
+        out: Optional output array or function(length) returning one.
     """
 
-    array_len = deserializeIntVar(instream)
-    array = None
-    if ASSERT_NUMPY:
-        array = numpy.empty(array_len, dtype=numpy.uint32)
-    else:
-        array = [None]*array_len
-    for i in range(array_len):
-        array[i] = deserializeInt(instream)
-    return array
+    return deserializeUIntArray(instream, 4, out)
 
 def serializeLongArray(outstream, long_arr):
     """
-    Serialize a long integer.
+    Serialize a long integer array.
 
     Args:
         outstream: Stream object inheriting (io.RawIOBase).
-        long_integer: Integer value in the range (0 <= byte < 2^64).
+        long_arr: Integer values in the range (0 <= long < 2^64).
     """
 
-    serializeIntVar(outstream, len(long_arr))
-    for x in long_arr:
-        serializeLong(outstream, x)
+    serializeUIntArray(outstream, long_arr, 8)
 
-def deserializeLongArray(instream):
+def deserializeLongArray(instream, out=None):
     """
-    Deserialize an integer.
+    Deserialize a long integer array.
 
     Args:
         instream: Stream object inheriting (io.RawIOBase).
+        out: Optional output array or function(length) returning one.
+    """
+
+    return deserializeUIntArray(instream, 8, out)
+
+def _packCustomFloatArray(float_arr, itemsize):
+    """
+    Vectorized version of serializeFloat/serializeDouble for numpy.
+    The values are decomposed with numpy.frexp and assembled with integer
+    bit operations into exactly the layout of the scalar functions:
+    |s|exp+bias|mant-0.5| with (mant=0.5, exp=max) for zero,
+    (mant=0.75, exp=max) for inf and (mant=0.875, exp=max) for NaN.
+
+    Args:
+        float_arr: Sequence of floating point numbers.
+        itemsize: Size of a single element in bytes (4 or 8).
+    """
+
+    exp_bits, bias, mant_bits = _FLOAT_LAYOUTS[itemsize]
+    exp_max = (1 << exp_bits) - 1
+    values = numpy.asarray(float_arr, dtype=numpy.float64)
+    if values.ndim != 1:
+        raise ValueError("Array must be one-dimensional (ndim="
+                         + str(values.ndim) + ")!")
+    with numpy.errstate(invalid='ignore'):
+        mant, exp = numpy.frexp(values)
+        is_zero = values == 0
+        is_inf = numpy.isinf(values)
+        is_nan = numpy.isnan(values)
+        # NaN and -0. are stored without sign just like in the scalar case
+        is_neg = values < 0
+    mant = numpy.abs(mant)
+    mant[is_zero] = 0.5
+    mant[is_inf] = 0.75
+    mant[is_nan] = 0.875
+    exp = exp.astype(numpy.int64) + bias
+    exp[is_zero | is_inf | is_nan] = exp_max
+    # Sign and exponent together must fit into the upper bits of the word
+    sign_exp = exp + is_neg.astype(numpy.int64)*(exp_max+1)
+    if len(sign_exp) > 0 and (sign_exp.min() < 0 or
+                              sign_exp.max() > 2*exp_max+1):
+        raise ValueError("Value not representable in "
+                         + str(itemsize) + " byte floating point format!")
+    mant_int = ((mant-0.5)*float(1 << (mant_bits+1))).astype(numpy.uint64)
+    data = numpy.left_shift(sign_exp.astype(numpy.uint64),
+                            numpy.uint64(mant_bits)) | mant_int
+    return data.astype(_LE_DTYPES[itemsize]).tobytes()
+
+def _unpackCustomFloatArray(data, itemsize, count=-1, offset=0):
+    """
+    Vectorized version of deserializeFloat/deserializeDouble for numpy.
+
+    Args:
+        data: Bytes-like object with a length of a multiple of itemsize.
+        itemsize: Size of a single element in bytes (4 or 8).
+        count: Number of elements to convert (-1 for all until the end).
+        offset: Position of the first element in data.
+    """
+
+    exp_bits, bias, mant_bits = _FLOAT_LAYOUTS[itemsize]
+    exp_max = (1 << exp_bits) - 1
+    bits = numpy.frombuffer(data, dtype=_LE_DTYPES[itemsize], count=count,
+                            offset=offset).astype(numpy.uint64)
+    mant_int = bits & numpy.uint64((1 << mant_bits) - 1)
+    exp = (numpy.right_shift(bits, numpy.uint64(mant_bits))
+           & numpy.uint64(exp_max)).astype(numpy.int32)
+    is_neg = numpy.right_shift(bits, numpy.uint64(mant_bits+exp_bits)) != 0
+    val = 0.5 + mant_int.astype(numpy.float64)/float(1 << (mant_bits+1))
+    val[is_neg] = -val[is_neg]
+    result = numpy.ldexp(val, exp-bias)
+    # Special cases
+    is_special = exp == exp_max
+    is_zero = is_special & (mant_int == numpy.uint64(0))
+    is_inf = is_special & (mant_int == numpy.uint64(1 << (mant_bits-1)))
+    is_nan = is_special & (mant_int == numpy.uint64(3 << (mant_bits-2)))
+    result[is_zero] = val[is_zero]*0.
+    result[is_inf] = val[is_inf]*float('inf')
+    result[is_nan] = numpy.where(is_neg[is_nan], -float('nan'), float('nan'))
+    if itemsize == 4:
+        return result.astype(numpy.float32)
+    return result
+
+def packFloatArray(float_arr):
+    """
+    Get the byte representation of a float array, each element in the
+    format of serializeFloat.
+
+    Args:
+        float_arr: Sequence of floating point numbers.
     """
 
-    array_len = deserializeIntVar(instream)
-    array = None
     if ASSERT_NUMPY:
-        array = numpy.empty(array_len, dtype=numpy.uint64)
-    else:
-        array = [None]*array_len
-    for i in range(array_len):
-        array[i] = deserializeLong(instream)
-    return array
+        return _packCustomFloatArray(float_arr, 4)
+    return packUIntArray([_floatToBits(x) for x in float_arr], 4)
+
+def unpackFloatArray(data, count=-1, offset=0):
+    """
+    Convert the byte representation of a float array back into an array
+    (numpy.ndarray if available, list otherwise).
+
+    Args:
+        data: Bytes-like object with a length of a multiple of 4.
+        count: Number of elements to convert (-1 for all until the end).
+        offset: Position of the first element in data.
+    """
+
+    if ASSERT_NUMPY:
+        return _unpackCustomFloatArray(data, 4, count, offset)
+    return [_bitsToFloat(x) for x in unpackUIntArray(data, 4, count, offset)]
+
+def packDoubleArray(double_arr):
+    """
+    Get the byte representation of a double array, each element in the
+    format of serializeDouble.
+
+    Args:
+        double_arr: Sequence of floating point numbers.
+    """
+
+    if ASSERT_NUMPY:
+        return _packCustomFloatArray(double_arr, 8)
+    return packUIntArray([_doubleToBits(x) for x in double_arr], 8)
+
+def unpackDoubleArray(data, count=-1, offset=0):
+    """
+    Convert the byte representation of a double array back into an array
+    (numpy.ndarray if available, list otherwise).
+
+    Args:
+        data: Bytes-like object with a length of a multiple of 8.
+        count: Number of elements to convert (-1 for all until the end).
+        offset: Position of the first element in data.
+    """
+
+    if ASSERT_NUMPY:
+        return _unpackCustomFloatArray(data, 8, count, offset)
+    return [_bitsToDouble(x) for x in unpackUIntArray(data, 8, count, offset)]
 
 def serializeFloatArray(outstream, float_arr):
     """
-    Serialize a long integer.
+    Serialize a float array.
 
     Args:
         outstream: Stream object inheriting (io.RawIOBase).
-        long_integer: Integer value in the range (0 <= byte < 2^64).
+        float_arr: Sequence of floating point numbers or iterable of such
+            sequences.
     """
 
-    serializeIntVar(outstream, len(float_arr))
-    for x in float_arr:
-        serializeFloat(outstream, x)
+    _serializeArray(outstream, float_arr, packFloatArray)
 
-def deserializeFloatArray(instream):
+def deserializeFloatArray(instream, out=None):
     """
-    Deserialize an integer.
+    Deserialize a float array.
 
     Args:
         instream: Stream object inheriting (io.RawIOBase).
+        out: Optional output array or function(length) returning one.
     """
 
-    array_len = deserializeIntVar(instream)
-    array = None
-    if ASSERT_NUMPY:
-        array = numpy.empty(array_len, dtype=numpy.float32)
-    else:
-        array = [None]*array_len
-    for i in range(array_len):
-        array[i] = deserializeFloat(instream)
-    return array
+    return _deserializeArray(instream, 4, unpackFloatArray, out)
 
 def serializeDoubleArray(outstream, double_arr):
     """
-    Serialize a long integer.
+    Serialize a double array.
 
     Args:
         outstream: Stream object inheriting (io.RawIOBase).
-        long_integer: Integer value in the range (0 <= byte < 2^64).
+        double_arr: Sequence of floating point numbers or iterable of such
+            sequences.
     """
 
-    serializeIntVar(outstream, len(double_arr))
-    for x in double_arr:
-        serializeDouble(outstream, x)
+    _serializeArray(outstream, double_arr, packDoubleArray)
 
-def deserializeDoubleArray(instream):
+def deserializeDoubleArray(instream, out=None):
     """
-    Deserialize an integer.
+    Deserialize a double array.
 
     Args:
         instream: Stream object inheriting (io.RawIOBase).
+        out: Optional output array or function(length) returning one.
     """
 
-    array_len = deserializeIntVar(instream)
-    array = None
-    if ASSERT_NUMPY:
-        array = numpy.empty(array_len, dtype=numpy.float64)
-    else:
-        array = [None]*array_len
-    for i in range(array_len):
-        array[i] = deserializeDouble(instream)
-    return array
+    return _deserializeArray(instream, 8, unpackDoubleArray, out)
 
 def serializeStringArray(outstream, string_arr):
     """
@@ -598,3 +1034,569 @@ def deserializeStringArray(instream):
         array[i] = deserializeString(instream)
     return array
 
+# Delta zigzag varint arrays: the differences of consecutive elements (modulo
+# 2^(8*itemsize), the first one to 0) are mapped to unsigned integers by
+# zigzag encoding (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...) and stored as LEB128
+# varints (7 bits per byte, high bit set on all but the last byte).
+# Serialized as IntVar element count, IntVar payload size and the payload.
+
+def _zigzagDeltas(int_arr, itemsize):
+    """
+    Get the zigzag encoded differences of an integer array as numpy.uint64.
+    """
+
+    unsigned = _NATIVE_DTYPES[itemsize]
+    values = _uintArray(int_arr, itemsize).astype(unsigned)
+    delta = values.copy()
+    delta[1:] -= values[:-1]
+    delta = delta.view('i'+str(itemsize))
+    return ((delta << 1) ^ (delta >> (8*itemsize-1))).view(unsigned).astype(
+        numpy.uint64)
+
+def _varIntLengths(zigzag):
+    """
+    Get the number of varint bytes of each element of a numpy.uint64 array.
+    """
+
+    lengths = numpy.ones(len(zigzag), dtype=numpy.intp)
+    for k in range(1, 10):
+        lengths += zigzag >= numpy.uint64(1 << (7*k))
+    return lengths
+
+def _pyZigzagDeltas(int_arr, itemsize):
+    """
+    Pure python version of _zigzagDeltas returning a list.
+    """
+
+    bits = 8*itemsize
+    mask = (1 << bits) - 1
+    result = []
+    previous = 0
+    for x in int_arr:
+        delta = (x - previous) & mask
+        previous = x
+        if delta >> (bits-1):
+            delta -= 1 << bits
+        result.append(((delta << 1) ^ (delta >> (bits-1))) & mask)
+    return result
+
+def deltaArraySize(int_arr, itemsize):
+    """
+    Get the payload size in bytes of an integer array in the delta zigzag
+    varint representation.
+
+    Args:
+        int_arr: Sequence of integers in the range of itemsize bytes.
+        itemsize: Size of a single element in bytes (4 or 8).
+    """
+
+    if ASSERT_NUMPY:
+        return int(_varIntLengths(_zigzagDeltas(int_arr, itemsize)).sum())
+    return sum(max(1, (x.bit_length()+6)//7)
+               for x in _pyZigzagDeltas(int_arr, itemsize))
+
+def packDeltaArray(int_arr, itemsize):
+    """
+    Get the delta zigzag varint payload of an integer array.
+
+    Args:
+        int_arr: Sequence of integers in the range of itemsize bytes.
+        itemsize: Size of a single element in bytes (4 or 8).
+    """
+
+    if not ASSERT_NUMPY:
+        data = bytearray()
+        for x in _pyZigzagDeltas(int_arr, itemsize):
+            while x >= 0x80:
+                data.append((x & 0x7f) | 0x80)
+                x >>= 7
+            data.append(x)
+        return bytes(data)
+    zigzag = _zigzagDeltas(int_arr, itemsize)
+    if len(zigzag) == 0:
+        return b''
+    lengths = _varIntLengths(zigzag)
+    max_len = int(lengths.max())
+    # One row of varint bytes per element, the unused columns are dropped
+    data = numpy.empty((len(zigzag), max_len), dtype=numpy.uint8)
+    for k in range(max_len):
+        data[:, k] = ((zigzag >> numpy.uint64(7*k)) & numpy.uint64(0x7f)) \
+            | ((lengths > k+1).astype(numpy.uint64) << numpy.uint64(7))
+    return data[numpy.arange(max_len) < lengths[:, None]].tobytes()
+
+def unpackDeltaArray(data, count, itemsize, offset=0, size=-1):
+    """
+    Convert a delta zigzag varint payload back into an integer array
+    (numpy.ndarray if available, list otherwise).
+
+    Args:
+        data: Bytes-like object.
+        count: Number of elements.
+        itemsize: Size of a single element in bytes (4 or 8).
+        offset: Position of the payload in data.
+        size: Size of the payload in bytes (-1 for all until the end).
+    """
+
+    if size < 0:
+        size = len(data) - offset
+    if not ASSERT_NUMPY:
+        bits = 8*itemsize
+        mask = (1 << bits) - 1
+        payload = bytearray(data[offset:offset+size])
+        array = []
+        previous = 0
+        x = 0
+        shift = 0
+        for byte in payload:
+            x |= (byte & 0x7f) << shift
+            shift += 7
+            if byte < 0x80:
+                previous = (previous + ((x >> 1) ^ -(x & 1))) & mask
+                array.append(previous)
+                x = 0
+                shift = 0
+        if len(array) != count or shift:
+            raise ValueError("Corrupt delta array!")
+        return array
+    unsigned = _NATIVE_DTYPES[itemsize]
+    payload = numpy.frombuffer(data, dtype=numpy.uint8, count=size,
+                               offset=offset)
+    ends = numpy.flatnonzero(payload < 0x80)
+    if len(ends) != count or (size > 0 and ends[-1] != size-1):
+        raise ValueError("Corrupt delta array!")
+    if count == 0:
+        return numpy.zeros(0, dtype=unsigned)
+    starts = numpy.empty(count, dtype=numpy.intp)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # Position of each byte within its varint
+    position = numpy.arange(size) - numpy.repeat(starts, ends-starts+1)
+    if position.max() > 9:
+        raise ValueError("Corrupt delta array!")
+    parts = (payload & 0x7f).astype(numpy.uint64) \
+        << (7*position).astype(numpy.uint64)
+    zigzag = numpy.bitwise_or.reduceat(parts, starts).astype(unsigned)
+    delta = (zigzag >> unsigned(1)) ^ -(zigzag & unsigned(1))
+    return numpy.cumsum(delta, dtype=unsigned)
+
+def serializeDeltaArray(outstream, int_arr, itemsize):
+    """
+    Serialize an integer array in the delta zigzag varint representation.
+
+    Args:
+        outstream: Stream object inheriting (io.RawIOBase).
+        int_arr: Sequence of integers in the range of itemsize bytes.
+        itemsize: Size of a single element in bytes (4 or 8).
+    """
+
+    data = packDeltaArray(int_arr, itemsize)
+    serializeIntVar(outstream, len(int_arr))
+    serializeIntVar(outstream, len(data))
+    outstream.write(data)
+
+def deserializeDeltaArray(instream, itemsize):
+    """
+    Deserialize an integer array in the delta zigzag varint representation.
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        itemsize: Size of a single element in bytes (4 or 8).
+    """
+
+    array_len = deserializeIntVar(instream)
+    data_len = deserializeIntVar(instream)
+    return unpackDeltaArray(_readExact(instream, data_len), array_len,
+                            itemsize)
+
+
+# In-memory buffer codec.
+# The encode functions append to a bytearray, the decode functions read from
+# any buffer object (bytes, bytearray, memoryview, mmap) at an offset and
+# return the value together with the offset behind it. The decode functions
+# of scalar values take the copy argument of the array decoders as well (it
+# has no effect on them), so that all decoders share one signature.
+
+def _checkSize(buf, offset, size):
+    """
+    Make sure that size bytes are available in the buffer at offset.
+    """
+
+    if offset + size > len(buf):
+        raise EOFError("Unexpected end of buffer!")
+
+def encodeByte(buf, byte):
+    """
+    Append a single byte to the buffer.
+
+    Args:
+        buf: bytearray object.
+        byte: Integer value in the range (0 <= byte < 255).
+    """
+
+    buf += _UINT8.pack(byte)
+
+def decodeByte(buf, offset, copy=True):
+    """
+    Decode a single byte.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+    """
+
+    return _UINT8.unpack_from(buf, offset)[0], offset+1
+
+def encodeShort(buf, short_integer):
+    """
+    Append a short integer to the buffer.
+
+    Args:
+        buf: bytearray object.
+        short_integer: Integer value in the range (0 <= byte < 65536).
+    """
+
+    buf += _UINT16.pack(int(short_integer))
+
+def decodeShort(buf, offset, copy=True):
+    """
+    Decode a short integer.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+    """
+
+    return _UINT16.unpack_from(buf, offset)[0], offset+2
+
+def encodeInt(buf, integer):
+    """
+    Append an integer to the buffer.
+
+    Args:
+        buf: bytearray object.
+        integer: Integer value in the range (0 <= byte < 4294967296).
+    """
+
+    buf += _UINT32.pack(int(integer))
+
+def decodeInt(buf, offset, copy=True):
+    """
+    Decode an integer.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+    """
+
+    return _UINT32.unpack_from(buf, offset)[0], offset+4
+
+def encodeLong(buf, long_integer):
+    """
+    Append a long integer to the buffer.
+
+    Args:
+        buf: bytearray object.
+        long_integer: Integer value in the range (0 <= byte < 2^64).
+    """
+
+    buf += _UINT64.pack(int(long_integer))
+
+def decodeLong(buf, offset, copy=True):
+    """
+    Decode a long integer.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+    """
+
+    return _UINT64.unpack_from(buf, offset)[0], offset+8
+
+def encodeIntVar(buf, int_val):
+    """
+    Append an integer in the representation of serializeIntVar.
+
+    Args:
+        buf: bytearray object.
+        int_val: Integer value in the range (0 <= byte < 2^64).
+    """
+
+    type_val = _intVarType(int_val)
+    buf += _INTVAR_STRUCTS[type_val].pack(type_val, int_val)
+
+def decodeIntVar(buf, offset, allow_unknown=False):
+    """
+    Decode an integer in the representation of serializeIntVar.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+        allow_unknown: Return None for the unknown count marker
+            INTVAR_UNKNOWN (only valid as entry count of a compound)
+            instead of raising ValueError.
+    """
+
+    type_val = _UINT8.unpack_from(buf, offset)[0]
+    if type_val == 0:
+        return _UINT8.unpack_from(buf, offset+1)[0], offset+2
+    elif type_val == 1:
+        return _UINT16.unpack_from(buf, offset+1)[0], offset+3
+    elif type_val == 2:
+        return _UINT32.unpack_from(buf, offset+1)[0], offset+5
+    elif type_val == INTVAR_UNKNOWN:
+        if not allow_unknown:
+            raise _unknownCount()
+        return None, offset+1
+    else:
+        return _UINT64.unpack_from(buf, offset+1)[0], offset+9
+
+def encodeFloat(buf, float_val):
+    """
+    Append a floating point number of size 4 byte.
+
+    Args:
+        buf: bytearray object.
+        float_val: Floating point number.
+    """
+
+    buf += _UINT32.pack(_floatToBits(float_val))
+
+def decodeFloat(buf, offset, copy=True):
+    """
+    Decode a floating point number of size 4 byte.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+    """
+
+    return _bitsToFloat(_UINT32.unpack_from(buf, offset)[0]), offset+4
+
+def encodeDouble(buf, double_val):
+    """
+    Append a floating point number of size 8 byte.
+
+    Args:
+        buf: bytearray object.
+        double_val: Floating point number.
+    """
+
+    buf += _UINT64.pack(_doubleToBits(double_val))
+
+def decodeDouble(buf, offset, copy=True):
+    """
+    Decode a floating point number of size 8 byte.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+    """
+
+    return _bitsToDouble(_UINT64.unpack_from(buf, offset)[0]), offset+8
+
+def encodeString8(buf, string):
+    """
+    Append a string with a length in the range (0 <= len < 256).
+    """
+
+    data = _toBytes(string)
+    buf += _UINT8.pack(len(data))
+    buf += data
+
+def decodeString8(buf, offset, copy=True):
+    """
+    Decode a string with a length in the range (0 <= len < 256).
+    """
+
+    string_len = _UINT8.unpack_from(buf, offset)[0]
+    offset += 1
+    _checkSize(buf, offset, string_len)
+    return _toNative(buf[offset:offset+string_len]), offset+string_len
+
+def encodeString(buf, string):
+    """
+    Append a string with a length in the representation of serializeIntVar.
+    """
+
+    data = _toBytes(string)
+    encodeIntVar(buf, len(data))
+    buf += data
+
+def decodeString(buf, offset, copy=True):
+    """
+    Decode a string with a length in the representation of serializeIntVar.
+    """
+
+    string_len, offset = decodeIntVar(buf, offset)
+    end = offset + string_len
+    if end > len(buf):
+        raise EOFError("Unexpected end of buffer!")
+    return _toNative(buf[offset:end]), end
+
+def encodeUIntArray(buf, int_arr, itemsize):
+    """
+    Append an unsigned integer array.
+
+    Args:
+        buf: bytearray object.
+        int_arr: Sequence of integers in the range of itemsize bytes.
+        itemsize: Size of a single element in bytes (1, 2, 4 or 8).
+    """
+
+    encodeIntVar(buf, len(int_arr))
+    buf += packUIntArray(int_arr, itemsize)
+
+def decodeUIntArray(buf, offset, itemsize, copy=True):
+    """
+    Decode an unsigned integer array.
+
+    Args:
+        buf: Buffer object (bytes, bytearray, memoryview, mmap).
+        offset: Position of the value in the buffer.
+        itemsize: Size of a single element in bytes (1, 2, 4 or 8).
+        copy: If False and numpy is available, the array is a read-only
+            little-endian view into buf instead of a copy. The buffer must
+            stay alive (and an mmap open) as long as the array is used.
+    """
+
+    array_len, offset = decodeIntVar(buf, offset)
+    _checkSize(buf, offset, array_len*itemsize)
+    if copy or not ASSERT_NUMPY:
+        array = unpackUIntArray(buf, itemsize, array_len, offset)
+    else:
+        array = numpy.frombuffer(buf, dtype=_LE_DTYPES[itemsize],
+                                 count=array_len, offset=offset)
+        array.flags.writeable = False
+    return array, offset + array_len*itemsize
+
+def encodeByteArray(buf, byte_arr):
+    """
+    Append a byte array.
+    """
+
+    encodeUIntArray(buf, byte_arr, 1)
+
+def decodeByteArray(buf, offset, copy=True):
+    """
+    Decode a byte array (a read-only view into buf if not copy).
+    """
+
+    return decodeUIntArray(buf, offset, 1, copy)
+
+def encodeShortArray(buf, short_arr):
+    """
+    Append a short integer array.
+    """
+
+    encodeUIntArray(buf, short_arr, 2)
+
+def decodeShortArray(buf, offset, copy=True):
+    """
+    Decode a short integer array (a read-only view into buf if not copy).
+    """
+
+    return decodeUIntArray(buf, offset, 2, copy)
+
+def encodeIntArray(buf, integer_arr):
+    """
+    Append a integer array.
+    """
+
+    encodeUIntArray(buf, integer_arr, 4)
+
+def decodeIntArray(buf, offset, copy=True):
+    """
+    Decode a integer array (a read-only view into buf if not copy).
+    """
+
+    return decodeUIntArray(buf, offset, 4, copy)
+
+def encodeLongArray(buf, long_arr):
+    """
+    Append a long integer array.
+    """
+
+    encodeUIntArray(buf, long_arr, 8)
+
+def decodeLongArray(buf, offset, copy=True):
+    """
+    Decode a long integer array (a read-only view into buf if not copy).
+    """
+
+    return decodeUIntArray(buf, offset, 8, copy)
+
+def encodeFloatArray(buf, float_arr):
+    """
+    Append a float array.
+    """
+
+    encodeIntVar(buf, len(float_arr))
+    buf += packFloatArray(float_arr)
+
+def decodeFloatArray(buf, offset, copy=True):
+    """
+    Decode a float array (always a copy, the values have to be converted).
+    """
+
+    array_len, offset = decodeIntVar(buf, offset)
+    _checkSize(buf, offset, array_len*4)
+    return unpackFloatArray(buf, array_len, offset), offset + array_len*4
+
+def encodeDoubleArray(buf, double_arr):
+    """
+    Append a double array.
+    """
+
+    encodeIntVar(buf, len(double_arr))
+    buf += packDoubleArray(double_arr)
+
+def decodeDoubleArray(buf, offset, copy=True):
+    """
+    Decode a double array (always a copy, the values have to be converted).
+    """
+
+    array_len, offset = decodeIntVar(buf, offset)
+    _checkSize(buf, offset, array_len*8)
+    return unpackDoubleArray(buf, array_len, offset), offset + array_len*8
+
+def encodeStringArray(buf, string_arr):
+    """
+    Append a string array.
+    """
+
+    encodeIntVar(buf, len(string_arr))
+    for x in string_arr:
+        encodeString(buf, x)
+
+def decodeStringArray(buf, offset, copy=True):
+    """
+    Decode a string array (always a copy).
+    """
+
+    array_len, offset = decodeIntVar(buf, offset)
+    array = [None]*array_len
+    for i in range(array_len):
+        array[i], offset = decodeString(buf, offset)
+    return array, offset
+
+def encodeDeltaArray(buf, int_arr, itemsize):
+    """
+    Append an integer array in the delta zigzag varint representation.
+    """
+
+    data = packDeltaArray(int_arr, itemsize)
+    encodeIntVar(buf, len(int_arr))
+    encodeIntVar(buf, len(data))
+    buf += data
+
+def decodeDeltaArray(buf, offset, itemsize, copy=True):
+    """
+    Decode an integer array in the delta zigzag varint representation
+    (always a copy).
+    """
+
+    array_len, offset = decodeIntVar(buf, offset)
+    data_len, offset = decodeIntVar(buf, offset)
+    _checkSize(buf, offset, data_len)
+    return (unpackDeltaArray(buf, array_len, itemsize, offset, data_len),
+            offset + data_len)
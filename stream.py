@@ -0,0 +1,230 @@
+"""
+Streaming access to binary tag compound documents.
+"""
+
+from pyBTC.btc import *
+from pyBTC.serialization import _isSeekable
+
+# Array serializers by data type
+_ARRAY_SERIALIZERS = {
+    DataType.STRING_ARR: serializeStringArray,
+    DataType.UINT8_ARR: serializeByteArray,
+    DataType.UINT16_ARR: serializeShortArray,
+    DataType.UINT32_ARR: serializeIntArray,
+    DataType.UINT64_ARR: serializeLongArray,
+    DataType.FLOAT_ARR: serializeFloatArray,
+    DataType.DOUBLE_ARR: serializeDoubleArray,
+    DataType.UINT32_DELTA_ARR:
+        lambda outstream, arr: serializeDeltaArray(outstream, arr, 4),
+    DataType.UINT64_DELTA_ARR:
+        lambda outstream, arr: serializeDeltaArray(outstream, arr, 8),
+}
+
+class BTagStreamWriter(object):
+    """
+    Writer which emits the entries of a compound document as they are
+    produced, without building the BTagCompound tree in memory.
+
+    The entry count of a compound is only known at its end. On seekable
+    streams the count is reserved in the 8 byte IntVar representation and
+    written at end_compound, which gives a regular document. On other
+    streams the count is written as unknown (INTVAR_UNKNOWN) and the
+    entries are terminated by an entry of type DataType.END, which
+    BTagCompound.deserialize understands as well.
+
+    Usage:
+        writer = BTagStreamWriter(outstream)
+        writer.begin_compound()
+        writer.write_int("id", 3)
+        writer.begin_compound("child")
+        writer.write_array("values", numpy.arange(10))
+        writer.end_compound()
+        writer.end_compound()
+    """
+
+    def __init__(self, outstream, seekable=None):
+        """
+        Args:
+            outstream: Stream object inheriting (io.RawIOBase).
+            seekable: Whether counts are backpatched (default: detected
+                from the stream).
+        """
+
+        self._outstream = outstream
+        if seekable is None:
+            seekable = _isSeekable(outstream)
+        self._seekable = seekable
+        # Open compounds: [position of the count, number of entries]
+        self._stack = []
+
+    def _header(self, tag, type_id):
+        """
+        Write the tag and type of a new entry of the current compound.
+        """
+
+        if not self._stack:
+            raise Exception("No open compound!")
+        self._stack[-1][1] += 1
+        serializeString8(self._outstream, tag)
+        serializeByte(self._outstream, type_id)
+
+    def depth(self):
+        """
+        Get the number of open compounds.
+        """
+
+        return len(self._stack)
+
+    def begin_compound(self, tag=None):
+        """
+        Open a compound. The document root has no tag, nested compounds
+        must have one.
+        """
+
+        if self._stack:
+            if tag is None:
+                raise ValueError("Nested compound needs a tag!")
+            self._header(tag, DataType.COMPOUND)
+        elif tag is not None:
+            raise ValueError("The root compound has no tag!")
+        if self._seekable:
+            position = self._outstream.tell()
+            serializeIntVarLong(self._outstream, 0)
+        else:
+            position = None
+            serializeByte(self._outstream, INTVAR_UNKNOWN)
+        self._stack.append([position, 0])
+
+    def end_compound(self):
+        """
+        Close the current compound.
+        """
+
+        if not self._stack:
+            raise Exception("No open compound!")
+        position, count = self._stack.pop()
+        if position is None:
+            serializeString8(self._outstream, "")
+            serializeByte(self._outstream, DataType.END)
+        else:
+            end = self._outstream.tell()
+            self._outstream.seek(position)
+            serializeIntVarLong(self._outstream, count)
+            self._outstream.seek(end)
+
+    def write_tag(self, tag, btag_obj):
+        """
+        Write an arbitrary tag object (including a complete compound).
+        """
+
+        self._header(tag, btag_obj.get_type_id())
+        btag_obj.serialize(self._outstream)
+
+    def write_byte(self, tag, byte_val):
+        self._header(tag, DataType.UINT8)
+        serializeByte(self._outstream, byte_val)
+
+    def write_short(self, tag, short_val):
+        self._header(tag, DataType.UINT16)
+        serializeShort(self._outstream, short_val)
+
+    def write_int(self, tag, int_val):
+        self._header(tag, DataType.UINT32)
+        serializeInt(self._outstream, int_val)
+
+    def write_long(self, tag, long_val):
+        self._header(tag, DataType.UINT64)
+        serializeLong(self._outstream, long_val)
+
+    def write_float(self, tag, float_val):
+        self._header(tag, DataType.FLOAT)
+        serializeFloat(self._outstream, float_val)
+
+    def write_double(self, tag, double_val):
+        self._header(tag, DataType.DOUBLE)
+        serializeDouble(self._outstream, double_val)
+
+    def write_string(self, tag, string_val):
+        self._header(tag, DataType.STRING)
+        serializeString(self._outstream, string_val)
+
+    def write_array(self, tag, array, type_id=None):
+        """
+        Write an array. Without type_id the data type is chosen from the
+        numpy dtype (or strings/floats for lists). The types of the numeric
+        arrays (not delta arrays) also take an iterable of chunks
+        (sequences), then type_id is required.
+        """
+
+        if type_id is None:
+            type_id = arrayTypeOf(array)
+        self._header(tag, type_id)
+        _ARRAY_SERIALIZERS[type_id](self._outstream, array)
+
+    def close(self):
+        """
+        Close all open compounds.
+        """
+
+        while self._stack:
+            self.end_compound()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+def iterparse(instream, skip=None):
+    """
+    Parse a compound document from a stream as a sequence of events,
+    without building the BTagCompound tree. The events are tuples
+    (event, path, type_id, value) with event being:
+        'start_compound': a compound begins (value is None),
+        'end_compound': a compound ends (value is None),
+        'value': any other entry with its decoded value (plain value for
+            scalars, the array for arrays).
+    The path of an entry is the '/' separated list of the tags leading to
+    it, the root compound has the path ''. Parsing can be stopped at any
+    point by leaving the loop.
+
+    Args:
+        instream: Stream object inheriting (io.RawIOBase).
+        skip: Optional function(path, type_id) which returns True for
+            entries (including whole compounds) that are skipped without
+            decoding and without events.
+    """
+
+    # Open compounds: [path, entry count, entries read]
+    stack = [['', deserializeIntVar(instream, allow_unknown=True), 0]]
+    yield ('start_compound', '', DataType.COMPOUND, None)
+    while stack:
+        top = stack[-1]
+        path, data_len, read = top
+        if data_len is not None and read >= data_len:
+            stack.pop()
+            yield ('end_compound', path, DataType.COMPOUND, None)
+            continue
+        tag = deserializeString8(instream)
+        type_id = deserializeByte(instream)
+        if type_id == DataType.END and data_len is None:
+            stack.pop()
+            yield ('end_compound', path, DataType.COMPOUND, None)
+            continue
+        top[2] += 1
+        if path:
+            entry_path = path + '/' + tag
+        else:
+            entry_path = tag
+        if skip is not None and skip(entry_path, type_id):
+            skipStreamValue(instream, type_id)
+        elif type_id == DataType.COMPOUND:
+            data_len = deserializeIntVar(instream, allow_unknown=True)
+            stack.append([entry_path, data_len, 0])
+            yield ('start_compound', entry_path, DataType.COMPOUND, None)
+        else:
+            value = deserializeValue(instream, type_id)
+            if isinstance(value, ABTag):
+                value = value.get_data()
+            yield ('value', entry_path, type_id, value)
@@ -0,0 +1,281 @@
+"""
+Throughput benchmark of the codecs of every data type and of compound
+shapes (wide, deep, record streams), serialize and deserialize, on streams
+and in-memory buffers.
+
+Usage:
+    python benchmark.py [--filter uint32] [--output results.json]
+                        [--baseline baseline.json] [--threshold 0.1]
+
+With a baseline every case which is slower than baseline * (1 - threshold)
+is reported as regression and the exit code is 1.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.compression import BTagCompressedArr
+
+# Element counts of the arrays and lengths of the strings
+SIZES = (10, 1000, 100000)
+# Number of entries of the wide compound, nesting depth of the deep one
+WIDE_ENTRIES = 1000
+DEEP_LEVELS = 100
+# Number of records of the record streams
+STREAM_RECORDS = 1000
+
+def _array(values, dtype):
+    if ASSERT_NUMPY:
+        return numpy.array(values, dtype=dtype)
+    return list(values)
+
+def _scalarTags():
+    """
+    Tag objects of the scalar data types.
+    """
+
+    return [
+        ('uint8', BTagByte(200)),
+        ('uint16', BTagShort(60000)),
+        ('uint32', BTagInt(4000000000)),
+        ('uint64', BTagLong(2**60 + 7)),
+        ('float', BTagFloat(3.25)),
+        ('double', BTagDouble(3.14159)),
+    ]
+
+def _sizedTags(size):
+    """
+    Tag objects of the strings and array data types with size elements.
+    """
+
+    integers = range(size)
+    return [
+        ('string', BTagString('x'*size)),
+        ('string_arr', BTagStringArr(['item'+str(i) for i in integers])),
+        ('uint8_arr', BTagByteArr(_array([i % 256 for i in integers],
+                                         'uint8'))),
+        ('uint16_arr', BTagShortArr(_array([i % 65536 for i in integers],
+                                           'uint16'))),
+        ('uint32_arr', BTagIntArr(_array(integers, 'uint32'))),
+        ('uint64_arr', BTagLongArr(_array([i*2**33 for i in integers],
+                                          'uint64'))),
+        ('float_arr', BTagFloatArr(_array([i*0.5 for i in integers],
+                                          'float32'))),
+        ('double_arr', BTagDoubleArr(_array([i*0.25 for i in integers],
+                                            'float64'))),
+        ('uint32_delta_arr', BTagDeltaIntArr(_array(
+            [1000 + 3*i for i in integers], 'uint32'))),
+        ('uint64_delta_arr', BTagDeltaLongArr(_array(
+            [10**12 + 1000*i for i in integers], 'uint64'))),
+        ('compressed_arr', BTagCompressedArr(BTagIntArr(_array(
+            [i % 100 for i in integers], 'uint32')))),
+    ]
+
+def _wideCompound():
+    compound = BTagCompound()
+    for i in range(WIDE_ENTRIES):
+        if i % 3 == 0:
+            compound.setInt('int'+str(i), i)
+        elif i % 3 == 1:
+            compound.setDouble('double'+str(i), i*0.5)
+        else:
+            compound.setString('string'+str(i), 'value'+str(i))
+    return compound
+
+def _deepCompound():
+    compound = BTagCompound()
+    compound.setInt('level', DEEP_LEVELS)
+    for i in range(DEEP_LEVELS):
+        parent = BTagCompound()
+        parent.setInt('level', i)
+        parent.setString('name', 'level'+str(i))
+        parent.setTag('child', compound)
+        compound = parent
+    return compound
+
+def _record(i):
+    compound = BTagCompound()
+    compound.setLong('timestamp', 10**12 + i)
+    compound.setInt('id', i)
+    compound.setDouble('value', i*0.1)
+    compound.setString('name', 'record'+str(i))
+    return compound
+
+def _tagCases(name, btag_obj):
+    """
+    Serialize and deserialize cases of a tag object on a stream and on a
+    buffer. Each case is (name, bytes per operation, function).
+    """
+
+    data = btag_obj.to_bytes()
+    tag_class = type(btag_obj)
+    def serialize_stream():
+        btag_obj.serialize(io.BytesIO())
+    def deserialize_stream():
+        tag_class().deserialize(io.BytesIO(data))
+    def serialize_buffer():
+        btag_obj.serialize_into(bytearray())
+    def deserialize_buffer():
+        tag_class().deserialize_from(data, 0)
+    return [
+        (name+'/serialize/stream', len(data), serialize_stream),
+        (name+'/deserialize/stream', len(data), deserialize_stream),
+        (name+'/serialize/buffer', len(data), serialize_buffer),
+        (name+'/deserialize/buffer', len(data), deserialize_buffer),
+    ]
+
+def _recordStreamCases():
+    records = [_record(i) for i in range(STREAM_RECORDS)]
+    outstream = io.BytesIO()
+    for record in records:
+        record.serialize(outstream)
+    data = outstream.getvalue()
+    def serialize_stream():
+        outstream = io.BytesIO()
+        for record in records:
+            record.serialize(outstream)
+    def deserialize_stream():
+        instream = io.BytesIO(data)
+        for i in range(STREAM_RECORDS):
+            BTagCompound().deserialize(instream)
+    def serialize_buffer():
+        buf = bytearray()
+        for record in records:
+            record.serialize_into(buf)
+    def deserialize_buffer():
+        offset = 0
+        for i in range(STREAM_RECORDS):
+            offset = BTagCompound().deserialize_from(data, offset)
+    name = 'records'+str(STREAM_RECORDS)
+    return [
+        (name+'/serialize/stream', len(data), serialize_stream),
+        (name+'/deserialize/stream', len(data), deserialize_stream),
+        (name+'/serialize/buffer', len(data), serialize_buffer),
+        (name+'/deserialize/buffer', len(data), deserialize_buffer),
+    ]
+
+def benchmarkCases(sizes=SIZES):
+    """
+    Get all benchmark cases as (name, bytes per operation, function).
+    """
+
+    cases = []
+    for name, btag_obj in _scalarTags():
+        cases += _tagCases(name, btag_obj)
+    for size in sizes:
+        for name, btag_obj in _sizedTags(size):
+            cases += _tagCases(name+str(size), btag_obj)
+    cases += _tagCases('wide'+str(WIDE_ENTRIES), _wideCompound())
+    cases += _tagCases('deep'+str(DEEP_LEVELS), _deepCompound())
+    cases += _recordStreamCases()
+    return cases
+
+def measure(function, min_time=0.2, repeat=3):
+    """
+    Get the operations per second of a function: the number of calls is
+    raised until a run takes min_time seconds, the best of repeat runs
+    counts.
+    """
+
+    number = 1
+    while True:
+        start = time.time()
+        for i in range(number):
+            function()
+        elapsed = time.time() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed <= 0 else max(2, int(min_time/elapsed) + 1)
+    best = elapsed
+    for r in range(repeat - 1):
+        start = time.time()
+        for i in range(number):
+            function()
+        best = min(best, time.time() - start)
+    return number/best
+
+def runBenchmark(cases, min_time=0.2, repeat=3, out=sys.stdout):
+    """
+    Run the cases and get the results by case name: {"ops": operations per
+    second, "mbps": megabytes per second}.
+    """
+
+    results = {}
+    for name, size, function in cases:
+        ops = measure(function, min_time, repeat)
+        results[name] = {'ops': ops, 'mbps': ops*size/1e6}
+        out.write('%-40s %14.1f ops/s %10.2f MB/s\n'
+                  % (name, ops, results[name]['mbps']))
+        out.flush()
+    return results
+
+def compareBaseline(results, baseline, threshold, out=sys.stdout):
+    """
+    Compare results with those of a baseline. Returns the names of the
+    cases which are slower than baseline * (1 - threshold).
+    """
+
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        ratio = results[name]['ops']/baseline[name]['ops']
+        flag = ''
+        if ratio < 1. - threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        out.write('%-40s %8.2fx%s\n' % (name, ratio, flag))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--filter', default=None,
+                        help="Run only cases whose name contains this text.")
+    parser.add_argument('--sizes', default=None,
+                        help="Comma separated array sizes (default: %s)."
+                        % ','.join(str(size) for size in SIZES))
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help="Minimum duration of a run in seconds.")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Number of runs per case, the best counts.")
+    parser.add_argument('--output', default=None,
+                        help="Save the results to this JSON file.")
+    parser.add_argument('--baseline', default=None,
+                        help="Compare with the results in this JSON file.")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Allowed slowdown against the baseline.")
+    args = parser.parse_args()
+
+    sizes = SIZES
+    if args.sizes:
+        sizes = [int(size) for size in args.sizes.split(',')]
+    cases = benchmarkCases(sizes)
+    if args.filter:
+        cases = [case for case in cases if args.filter in case[0]]
+    results = runBenchmark(cases, args.min_time, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'numpy': ASSERT_NUMPY and numpy.__version__ or None,
+                       'results': results}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        print('')
+        regressions = compareBaseline(results, baseline, args.threshold)
+        if regressions:
+            print('%d regression(s) beyond %.0f%%'
+                  % (len(regressions), 100*args.threshold))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Exchange of compounds over asyncio streams on a loopback connection.
+"""
+
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.decoder import BTCDecoder
+if sys.version_info >= (3, 6):
+    import asyncio
+    from pyBTC.aio import *
+else:
+    asyncio = None
+
+_HOST = '127.0.0.1'
+
+def _document(i):
+    compound = BTagCompound()
+    compound.setInt('i', i)
+    compound.setString('s', 'x'*(i*37 % 300))
+    compound.setLongArray('la', [2**40 + j for j in range(i % 5)])
+    nested = BTagCompound()
+    nested.setDoubleArray('d', [j*0.5 for j in range(i % 7)])
+    compound.setTag('nested', nested)
+    return compound
+
+@unittest.skipIf(asyncio is None, "asyncio streams need Python 3.6+")
+class AsyncioStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.documents = [_document(i) for i in range(20)]
+        self.loop = asyncio.new_event_loop()
+        self.connected = self.loop.create_future()
+        def connected(reader, writer):
+            self.connected.set_result((reader, writer))
+        self.server = self._run(asyncio.start_server(connected, _HOST, 0))
+        port = self.server.sockets[0].getsockname()[1]
+        # Client writes, server reads
+        self.client_reader, self.writer = self._run(
+            asyncio.open_connection(_HOST, port))
+        self.reader, self.server_writer = self._run(self.connected)
+
+    def tearDown(self):
+        self.writer.close()
+        self.server_writer.close()
+        self.server.close()
+        self._run(self.server.wait_closed())
+        self.loop.close()
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def _writeSplit(self, data, size=3):
+        for start in range(0, len(data), size):
+            self.writer.write(data[start:start+size])
+            self._run(self.writer.drain())
+            # Let the reading side handle the piece
+            self._run(asyncio.sleep(0.001))
+
+    def _assertDocuments(self, result):
+        self.assertEqual([compound.to_bytes() for compound in result],
+                         [compound.to_bytes() for compound in self.documents])
+
+    def test_framed_split_writes(self):
+        result = []
+        for compound in self.documents:
+            # The read waits while the frame arrives piece by piece
+            reading = self.loop.create_task(read_compound(self.reader))
+            buf = bytearray()
+            encodeFrame(buf, compound)
+            self._writeSplit(bytes(buf))
+            result.append(self._run(reading))
+        self._assertDocuments(result)
+        self.writer.write_eof()
+        self.assertIsNone(self._run(read_compound(self.reader)))
+
+    def test_write_compounds(self):
+        self._run(write_compounds(self.writer, self.documents, batch_size=100))
+        self._run(write_compound(self.writer, self.documents[0]))
+        self.writer.write_eof()
+        result = []
+        compounds = iter_compounds(self.reader, lazy=True)
+        while True:
+            try:
+                result.append(self._run(compounds.__anext__()))
+            except StopAsyncIteration:
+                break
+        self.assertEqual(result.pop().to_bytes(),
+                         self.documents[0].to_bytes())
+        self._assertDocuments(result)
+
+    def test_unframed_split_writes(self):
+        data = b''.join(compound.to_bytes() for compound in self.documents)
+        self._writeSplit(data, 50)
+        self.writer.write_eof()
+        decoder = BTCDecoder()
+        result = []
+        while True:
+            chunk = self._run(self.reader.read(7))
+            if not chunk:
+                break
+            decoder.feed(chunk)
+            while True:
+                compound = decoder.next_document()
+                if compound is None:
+                    break
+                result.append(compound)
+        decoder.close()
+        self._assertDocuments(result)
+
+    def test_end_of_stream(self):
+        self.writer.write_eof()
+        self.assertIsNone(self._run(read_compound(self.reader)))
+
+    def test_incomplete_frame(self):
+        buf = bytearray()
+        encodeFrame(buf, self.documents[3])
+        self._writeSplit(bytes(buf[:-4]))
+        self.writer.write_eof()
+        self.assertRaises(EOFError, self._run, read_compound(self.reader))
+
+    def test_incomplete_frame_length(self):
+        # Length of type 1 (two bytes) cut after the type byte
+        self.writer.write(b'\x01')
+        self.writer.write_eof()
+        self.assertRaises(EOFError, self._run, read_compound(self.reader))
+
+    def test_invalid_frames(self):
+        self.writer.write(b'\x07')
+        self.assertRaises(ValueError, self._run, read_compound(self.reader))
+        buf = bytearray()
+        encodeFrame(buf, self.documents[5])
+        self.writer.write(bytes(buf))
+        self.assertRaises(ValueError, self._run,
+                          read_compound(self.reader, max_size=10))
+
+if __name__ == "__main__":
+    unittest.main()
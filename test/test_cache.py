@@ -0,0 +1,154 @@
+"""
+Invalidation of the cached bytes of compounds (BTagCompound.enable_cache).
+"""
+
+import os
+import pickle
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+
+def _tree():
+    root = BTagCompound()
+    child = BTagCompound()
+    grandchild = BTagCompound()
+    grandchild.setInt('g', 1)
+    child.setTag('grandchild', grandchild)
+    child.setInt('c', 2)
+    child.setIntArray('a', [1, 2, 3])
+    root.setTag('child', child)
+    root.setInt('r', 3)
+    return root, child, grandchild
+
+def _plainBytes(compound):
+    """
+    Serialization of a compound without any cache.
+    """
+
+    return BTagCompound.from_bytes(compound.to_bytes()).to_bytes()
+
+class CacheTest(unittest.TestCase):
+
+    def _cachedTree(self):
+        root, child, grandchild = _tree()
+        root.enable_cache()
+        root.to_bytes()
+        return root, child, grandchild
+
+    def _assertFresh(self, root, expected):
+        self.assertEqual(root.to_bytes(), expected.to_bytes())
+        self.assertEqual(_plainBytes(root), expected.to_bytes())
+
+    def test_cached_bytes(self):
+        root, child, grandchild = self._cachedTree()
+        self.assertEqual(root.to_bytes(), _tree()[0].to_bytes())
+
+    def test_set_invalidates_ancestors(self):
+        root, child, grandchild = self._cachedTree()
+        grandchild.setInt('g', 5)
+        expected, child2, grandchild2 = _tree()
+        grandchild2.setInt('g', 5)
+        self._assertFresh(root, expected)
+        child.setIntArray('a', [4])
+        child2.setIntArray('a', [4])
+        self._assertFresh(root, expected)
+        root.setString('new', 'entry')
+        expected.setString('new', 'entry')
+        self._assertFresh(root, expected)
+
+    def test_clear_cache_of_nested_compound(self):
+        root, child, grandchild = self._cachedTree()
+        child.clear_cache()
+        child.setInt('c', 99)
+        expected, child2, grandchild2 = _tree()
+        child2.setInt('c', 99)
+        self._assertFresh(root, expected)
+
+    def test_clear_cache_of_middle_compound(self):
+        root, child, grandchild = self._cachedTree()
+        child.clear_cache()
+        grandchild.setInt('g', 7)
+        expected, child2, grandchild2 = _tree()
+        grandchild2.setInt('g', 7)
+        self._assertFresh(root, expected)
+
+    def test_clear_cache_of_root(self):
+        root, child, grandchild = self._cachedTree()
+        root.clear_cache()
+        self.assertIsNone(child._parent)
+        self.assertIsNone(grandchild._parent)
+        grandchild.setInt('g', 8)
+        expected, child2, grandchild2 = _tree()
+        grandchild2.setInt('g', 8)
+        self._assertFresh(root, expected)
+
+    def test_replaced_compound_is_detached(self):
+        root, child, grandchild = self._cachedTree()
+        root.setTag('child', BTagCompound())
+        self.assertIsNone(child._parent)
+        data = root.to_bytes()
+        child.setInt('c', 100)
+        self.assertEqual(root.to_bytes(), data)
+
+    def test_second_caching_parent(self):
+        root, child, grandchild = self._cachedTree()
+        other = BTagCompound()
+        other.enable_cache()
+        self.assertRaises(ValueError, other.setTag, 'child', child)
+        self.assertEqual(other.size(), 0)
+        self.assertTrue(child._parent is root)
+        # Enabling the cache of a parent checks its entries as well
+        other = BTagCompound()
+        other.setTag('child', child)
+        self.assertRaises(ValueError, other.enable_cache)
+        self.assertIsNone(other._pieces)
+        # Once the first parent stopped caching the compound can move
+        root.clear_cache()
+        other.enable_cache()
+        self.assertTrue(child._parent is other)
+
+    def test_compound_in_two_entries(self):
+        root, child, grandchild = self._cachedTree()
+        root.setTag('again', child)
+        root.setTag('child', BTagCompound())
+        self.assertTrue(child._parent is root)
+        child.setInt('c', 100)
+        expected = _tree()[0]
+        expected.setTag('child', BTagCompound())
+        expected.setTag('again', _tree()[1])
+        expected.getTag('again').setInt('c', 100)
+        self._assertFresh(root, expected)
+
+    def test_lazy_compound(self):
+        root = BTagCompound.from_bytes(_tree()[0].to_bytes(), lazy=True)
+        root.enable_cache()
+        root.to_bytes()
+        root.getTag('child').getTag('grandchild').setInt('g', 42)
+        expected, child, grandchild = _tree()
+        grandchild.setInt('g', 42)
+        self._assertFresh(root, expected)
+
+    def test_no_links_without_cache(self):
+        root, child, grandchild = _tree()
+        self.assertIsNone(child._parent)
+        self.assertIsNone(grandchild._parent)
+        decoded = BTagCompound.from_bytes(root.to_bytes())
+        self.assertIsNone(decoded.getTag('child')._parent)
+
+    def test_pickle_drops_cache(self):
+        root, child, grandchild = self._cachedTree()
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(root, protocol))
+            self.assertIsNone(copy._pieces)
+            self.assertEqual(copy.to_bytes(), root.to_bytes())
+            # The parent is not pickled along with a nested compound
+            copy = pickle.loads(pickle.dumps(grandchild, protocol))
+            self.assertIsNone(copy._parent)
+            self.assertEqual(copy.to_bytes(), grandchild.to_bytes())
+
+if __name__ == "__main__":
+    unittest.main()
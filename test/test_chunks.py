@@ -0,0 +1,176 @@
+"""
+Arrays written from chunks and read into given output arrays.
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC import serialization
+from pyBTC.btc import *
+from pyBTC.stream import BTagStreamWriter
+
+class _UnseekableStream(io.RawIOBase):
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start+size]
+
+class ChunkedWriteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.values = [i*7 % 1000 for i in range(100)]
+        self.doubles = [i*0.25 for i in range(100)]
+        serialization.ARRAY_CHUNK_SIZE = 16
+
+    def tearDown(self):
+        serialization.ARRAY_CHUNK_SIZE = ARRAY_CHUNK_SIZE
+
+    def test_seekable_stream(self):
+        outstream = io.BytesIO()
+        serializeIntArray(outstream, _chunks(self.values, 30))
+        serializeDoubleArray(outstream, _chunks(self.doubles, 7))
+        outstream.seek(0)
+        self.assertEqual(list(deserializeIntArray(outstream)), self.values)
+        self.assertEqual(list(deserializeDoubleArray(outstream)), self.doubles)
+        self.assertEqual(outstream.read(), b'')
+
+    def test_unseekable_stream(self):
+        outstream = _UnseekableStream()
+        serializeIntArray(outstream, _chunks(self.values, 30))
+        expected = io.BytesIO()
+        serializeIntArray(expected, self.values)
+        self.assertEqual(bytes(outstream.data), expected.getvalue())
+
+    def test_long_sequence(self):
+        # Written block by block, the bytes do not change
+        outstream = io.BytesIO()
+        serializeLongArray(outstream, self.values)
+        self.assertEqual(outstream.getvalue(),
+                         BTagLongArr(self.values).to_bytes())
+
+    def test_memmap(self):
+        if not ASSERT_NUMPY:
+            self.skipTest("numpy is not available")
+        directory = tempfile.mkdtemp()
+        try:
+            values = numpy.memmap(os.path.join(directory, 'values'),
+                                  dtype=numpy.uint32, mode='w+',
+                                  shape=(len(self.values),))
+            values[:] = self.values
+            btag_obj = BTagIntArr(values)
+            outstream = io.BytesIO()
+            btag_obj.serialize(outstream)
+            self.assertEqual(outstream.getvalue(), btag_obj.to_bytes())
+            self.assertEqual(outstream.getvalue(),
+                             BTagIntArr(self.values).to_bytes())
+            del values, btag_obj
+        finally:
+            shutil.rmtree(directory)
+
+    def test_stream_writer(self):
+        for outstream in (io.BytesIO(), _UnseekableStream()):
+            with BTagStreamWriter(outstream) as writer:
+                writer.begin_compound()
+                writer.write_array('i', _chunks(self.values, 9),
+                                   DataType.UINT32_ARR)
+                writer.write_array('d', _chunks(self.doubles, 50),
+                                   DataType.DOUBLE_ARR)
+            if isinstance(outstream, io.BytesIO):
+                data = outstream.getvalue()
+            else:
+                data = bytes(outstream.data)
+            compound = BTagCompound.from_bytes(data)
+            self.assertEqual(list(compound.getEntry('i')), self.values)
+            self.assertEqual(list(compound.getEntry('d')), self.doubles)
+
+    def test_tags_refuse_iterators(self):
+        for tag_class in (BTagByteArr, BTagShortArr, BTagIntArr, BTagLongArr,
+                          BTagFloatArr, BTagDoubleArr, BTagDeltaIntArr):
+            self.assertRaises(ValueError, tag_class,
+                              _chunks(self.values, 10))
+        compound = BTagCompound()
+        self.assertRaises(ValueError, compound.setLongArray, 'l',
+                          iter(self.values))
+        self.assertRaises(ValueError, arrayTypeOf, iter(self.values))
+
+class OutputArrayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.values = list(range(50, 90))
+        compound = BTagCompound()
+        compound.setIntArray('i', self.values)
+        compound.setString('s', 'text')
+        nested = BTagCompound()
+        nested.setDoubleArray('d', [0.5]*10)
+        compound.setTag('nested', nested)
+        self.data = compound.to_bytes()
+        serialization.ARRAY_CHUNK_SIZE = 16
+
+    def tearDown(self):
+        serialization.ARRAY_CHUNK_SIZE = ARRAY_CHUNK_SIZE
+
+    def _output(self, length):
+        if ASSERT_NUMPY:
+            return numpy.zeros(length, dtype=numpy.uint32)
+        return [0]*length
+
+    def test_tag(self):
+        out = self._output(len(self.values))
+        btag_obj = BTagIntArr()
+        btag_obj.deserialize(io.BytesIO(BTagIntArr(self.values).to_bytes()),
+                             out)
+        self.assertTrue(btag_obj.get_data() is out)
+        self.assertEqual(list(out), self.values)
+
+    def test_sizes(self):
+        data = BTagIntArr(self.values).to_bytes()
+        larger = self._output(len(self.values) + 5)
+        result = deserializeIntArray(io.BytesIO(data), larger)
+        self.assertEqual(list(result), self.values)
+        self.assertEqual(list(larger[len(self.values):]), [0]*5)
+        lengths = []
+        def allocate(length):
+            lengths.append(length)
+            return self._output(length)
+        result = deserializeIntArray(io.BytesIO(data), allocate)
+        self.assertEqual(lengths, [len(self.values)])
+        self.assertEqual(list(result), self.values)
+        self.assertRaises(ValueError, deserializeIntArray, io.BytesIO(data),
+                          self._output(3))
+
+    def test_compound(self):
+        out = self._output(len(self.values))
+        doubles = [None]*10
+        compound = BTagCompound()
+        compound.deserialize(io.BytesIO(self.data),
+                             out={'i': out, 'nested': {'d': doubles}})
+        self.assertTrue(compound.getEntry('i') is out)
+        self.assertTrue(compound.getTag('nested').getEntry('d') is doubles)
+        self.assertEqual(list(out), self.values)
+        self.assertEqual(doubles, [0.5]*10)
+        self.assertEqual(compound.to_bytes(), self.data)
+
+    def test_compound_scalar(self):
+        compound = BTagCompound()
+        self.assertRaises(ValueError, compound.deserialize,
+                          io.BytesIO(self.data), {'s': []})
+
+if __name__ == "__main__":
+    unittest.main()
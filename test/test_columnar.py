@@ -0,0 +1,116 @@
+"""
+Columnar batch encoding of records with the same scalar layout.
+"""
+
+import io
+import os
+import sys
+import unittest
+from collections import OrderedDict
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC import columnar, serialization
+from pyBTC.btc import *
+from pyBTC.columnar import *
+
+def _record(i):
+    compound = BTagCompound()
+    compound.setByte('b', i % 256)
+    compound.setShort('h', i*3 % 65536)
+    compound.setInt('i', i*7)
+    compound.setLong('l', 2**63 + i)
+    compound.setFloat('f', i*0.1)
+    compound.setDouble('d', -i*0.25)
+    compound.setString('s', 'x'*(i % 5))
+    return compound
+
+class ColumnarTest(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [_record(i) for i in range(50)]
+
+    def tearDown(self):
+        serialization.ASSERT_NUMPY = ASSERT_NUMPY
+        columnar.ASSERT_NUMPY = ASSERT_NUMPY
+
+    def _assertRecords(self):
+        outstream = io.BytesIO()
+        serializeColumns(outstream, self.records)
+        outstream.seek(0)
+        columns = deserializeColumns(outstream)
+        self.assertEqual(list(columns), ['b', 'h', 'i', 'l', 'f', 'd', 's'])
+        self.assertEqual(list(columns['l']), [2**63 + i for i in range(50)])
+        self.assertEqual(list(columns['s']),
+                         ['x'*(i % 5) for i in range(50)])
+        compound = BTagCompound.from_bytes(outstream.getvalue())
+        # The floats are rounded just like the scalars of the records
+        self.assertEqual([record.to_bytes()
+                          for record in compoundToRecords(compound)],
+                         [record.to_bytes() for record in self.records])
+
+    def test_records(self):
+        self._assertRecords()
+
+    def test_records_without_numpy(self):
+        serialization.ASSERT_NUMPY = False
+        columnar.ASSERT_NUMPY = False
+        self._assertRecords()
+
+    def test_columns(self):
+        columns = [('d', [0.5, 1.5, 2.5]), ('s', ['a', 'b', 'c'])]
+        expected = [DataType.DOUBLE_ARR, DataType.STRING_ARR]
+        if ASSERT_NUMPY:
+            columns.append(('u', numpy.array([1, 2, 3], dtype=numpy.uint16)))
+            columns.append(('f', numpy.array([1, 2, 3], dtype=numpy.float32)))
+            expected += [DataType.UINT16_ARR, DataType.FLOAT_ARR]
+        compound = columnsToCompound(columns)
+        self.assertEqual(columnsToCompound(OrderedDict(columns)).to_bytes(),
+                         compound.to_bytes())
+        # The column types are chosen from the arrays
+        self.assertEqual([btag_obj.get_type_id()
+                          for tag, btag_obj in compound.items()], expected)
+        result = compoundToColumns(BTagCompound.from_bytes(
+            compound.to_bytes()))
+        self.assertEqual(list(result), [name for name, array in columns])
+        for name, array in columns:
+            self.assertEqual(list(result[name]), list(array))
+        # Integers without a dtype have no data type
+        self.assertRaises(ValueError, columnsToCompound, [('i', [1, 2, 3])])
+
+    def test_structured(self):
+        if not ASSERT_NUMPY:
+            self.skipTest("numpy is not available")
+        outstream = io.BytesIO()
+        serializeColumns(outstream, self.records)
+        outstream.seek(0)
+        result = deserializeColumns(outstream, structured=True)
+        self.assertEqual(len(result), 50)
+        self.assertEqual(result.dtype.names,
+                         ('b', 'h', 'i', 'l', 'f', 'd', 's'))
+        self.assertEqual(result['i'][3], 21)
+        self.assertEqual(result['s'][4], 'xxxx')
+        self.assertEqual(result[10]['d'], -2.5)
+
+    def test_empty(self):
+        self.assertEqual(recordsToCompound([]).size(), 0)
+        self.assertEqual(compoundToRecords(BTagCompound()), [])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, columnsToCompound,
+                          [('a', [0.5, 1.5]), ('b', [1.5])])
+        other = _record(1)
+        other.setInt('extra', 1)
+        self.assertRaises(ValueError, recordsToCompound,
+                          [_record(0), other])
+        nested = _record(0)
+        nested.setTag('n', BTagCompound())
+        self.assertRaises(ValueError, recordsToCompound, [nested])
+        arrays = BTagCompound()
+        arrays.setIntArray('ia', [1, 2])
+        self.assertRaises(ValueError, recordsToCompound, [arrays])
+        self.assertRaises(ValueError, compoundToRecords, _record(0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Compressed documents and compressed array tags.
+"""
+
+import binascii
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.compression import *
+from pyBTC.compression import lzma
+
+CODECS = [Codec.ZLIB, Codec.BZ2] + ([Codec.LZMA] if lzma else [])
+
+# Decodes a document with a compressed array in a new interpreter which has
+# only imported pyBTC.btc, prints the values of the array or the offset
+# behind the document
+_FRESH_IMPORT = """
+import binascii, io, sys
+from pyBTC.btc import *
+assert 'pyBTC.compression' not in sys.modules
+data = binascii.unhexlify(sys.argv[1])
+if sys.argv[2] == 'stream':
+    compound = BTagCompound()
+    compound.deserialize(io.BytesIO(data))
+    print([int(v) for v in compound.getEntry('z')])
+elif sys.argv[2] == 'buffer':
+    print([int(v) for v in BTagCompound.from_bytes(data).getEntry('z')])
+elif sys.argv[2] == 'lazy':
+    compound = BTagCompound.from_bytes(data, lazy=True)
+    print([int(v) for v in compound.getEntry('z')])
+elif sys.argv[2] == 'skip':
+    print(skipValue(data, 0, DataType.COMPOUND))
+else:
+    instream = io.BytesIO(data)
+    skipStreamValue(instream, DataType.COMPOUND)
+    print(instream.tell())
+"""
+
+def _document(size, compressed=True):
+    compound = BTagCompound()
+    compound.setInt('i', 3)
+    array_tag = BTagIntArr([j % 7 for j in range(size)])
+    if compressed:
+        array_tag = BTagCompressedArr(array_tag)
+    compound.setTag('z', array_tag)
+    compound.setString('s', 'behind')
+    return compound
+
+class CompressedDocumentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compound = _document(2000, compressed=False)
+        self.data = self.compound.to_bytes()
+
+    def test_codecs(self):
+        for codec in CODECS:
+            outstream = io.BytesIO()
+            serializeCompressed(outstream, self.compound, codec)
+            outstream.write(b'trailer')
+            self.assertTrue(len(outstream.getvalue()) < len(self.data))
+            outstream.seek(0)
+            compound = deserializeCompressed(outstream)
+            self.assertEqual(compound.to_bytes(), self.data)
+            # The stream is left behind the compressed data
+            self.assertEqual(outstream.read(), b'trailer')
+
+    def test_plain_document(self):
+        instream = io.BytesIO(self.data + b'trailer')
+        compound = deserializeCompressed(instream)
+        self.assertEqual(compound.to_bytes(), self.data)
+        self.assertEqual(instream.read(), b'trailer')
+
+    def test_reader_chunks(self):
+        compressed = io.BytesIO()
+        with CompressedWriter(compressed, Codec.ZLIB, chunk_size=10) as writer:
+            for i in range(100):
+                writer.write(self.data)
+        compressed.seek(0)
+        reader = CompressedReader(compressed, Codec.ZLIB, chunk_size=7)
+        parts = []
+        while True:
+            part = reader.read(33)
+            if not part:
+                break
+            parts.append(part)
+        self.assertEqual(b''.join(parts), self.data*100)
+
+class CompressedArrayTest(unittest.TestCase):
+
+    def test_threshold(self):
+        small = BTagCompressedArr(BTagIntArr([1, 2, 3]), threshold=64)
+        data = small.to_bytes()
+        self.assertEqual(bytearray(data)[1], Codec.NONE)
+        self.assertEqual(data[2:], BTagIntArr([1, 2, 3]).to_bytes())
+        large = BTagCompressedArr(BTagIntArr([1, 2, 3]*100), threshold=64)
+        self.assertEqual(bytearray(large.to_bytes())[1], Codec.ZLIB)
+
+    def test_round_trip(self):
+        for size in (3, 2000):
+            compound = _document(size)
+            data = compound.to_bytes()
+            expected = [j % 7 for j in range(size)]
+            decoded = BTagCompound()
+            decoded.deserialize(io.BytesIO(data))
+            for decoded in (decoded, BTagCompound.from_bytes(data),
+                            BTagCompound.from_bytes(data, lazy=True)):
+                self.assertEqual(list(decoded.getEntry('z')), expected)
+                self.assertEqual(decoded.to_bytes(), data)
+
+    def test_skip(self):
+        for size in (3, 2000):
+            data = _document(size).to_bytes() + b'trailer'
+            self.assertEqual(skipValue(data, 0, DataType.COMPOUND),
+                             len(data) - 7)
+            instream = io.BytesIO(data)
+            skipStreamValue(instream, DataType.COMPOUND)
+            self.assertEqual(instream.read(), b'trailer')
+
+    def test_without_import(self):
+        data = binascii.hexlify(_document(2000).to_bytes()).decode('ascii')
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(path for path in sys.path if path)
+        expected = {
+            'stream': str([j % 7 for j in range(2000)]),
+            'skip': str(len(data)//2),
+        }
+        expected['buffer'] = expected['lazy'] = expected['stream']
+        expected['skip_stream'] = expected['skip']
+        for mode in sorted(expected):
+            output = subprocess.check_output(
+                [sys.executable, '-c', _FRESH_IMPORT, data, mode], env=env)
+            self.assertEqual(output.decode('ascii').strip(), expected[mode])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Records, index and crash recovery of BTagFile.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.container import BTagFile
+
+RECORDS = 200
+
+def _record(i):
+    compound = BTagCompound()
+    compound.setInt('i', i)
+    compound.setString('s', 'x'*(i % 50))
+    compound.setLongArray('a', list(range(i % 7)))
+    return compound
+
+def _numbers(records):
+    return [compound.getEntry('i') for compound in records]
+
+class BTagFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self.path = os.path.join(self._dir, 'records.btc')
+        self.index_path = self.path + '.idx'
+        with BTagFile(self.path, 'w', buffer_size=1024) as records:
+            for i in range(RECORDS):
+                self.assertEqual(records.append(_record(i)), i)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _write(self, path, data):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def test_read(self):
+        with BTagFile(self.path, buffer_size=1024) as records:
+            self.assertEqual(len(records), RECORDS)
+            self.assertEqual(records[17].to_bytes(), _record(17).to_bytes())
+            self.assertEqual(records[-1].getEntry('i'), RECORDS - 1)
+            self.assertEqual(_numbers(records), list(range(RECORDS)))
+            self.assertEqual(_numbers(records.iter_records(10, 20)),
+                             list(range(10, 20)))
+            self.assertRaises(IndexError, records.read, RECORDS)
+            self.assertRaises(IOError, records.append, _record(0))
+
+    def test_iter_records_range(self):
+        with BTagFile(self.path, buffer_size=1024) as records:
+            self.assertEqual(_numbers(records.iter_records(-5)),
+                             list(range(RECORDS - 5, RECORDS)))
+            self.assertEqual(_numbers(records.iter_records(-20, -10)),
+                             list(range(RECORDS - 20, RECORDS - 10)))
+            self.assertEqual(_numbers(records.iter_records(RECORDS)), [])
+            self.assertEqual(_numbers(records.iter_records(5, 2)), [])
+            for start in (-RECORDS - 1, RECORDS + 1):
+                self.assertRaises(IndexError, list,
+                                  records.iter_records(start))
+
+    def test_torn_record(self):
+        size = os.path.getsize(self.path)
+        with open(self.path, 'ab') as f:
+            # Header of 16 payload bytes followed by only 3 of them
+            f.write(b'\x10' + b'\x00'*11 + b'abc')
+        with BTagFile(self.path) as records:
+            self.assertEqual(len(records), RECORDS)
+        # Read-only opening leaves the file as it is
+        self.assertEqual(os.path.getsize(self.path), size + 15)
+        with BTagFile(self.path, 'a') as records:
+            self.assertEqual(len(records), RECORDS)
+            records.append(_record(RECORDS))
+        self.assertTrue(os.path.getsize(self.path) > size)
+        with BTagFile(self.path) as records:
+            self.assertEqual(_numbers(records), list(range(RECORDS + 1)))
+
+    def test_corrupt_last_record(self):
+        data = bytearray(self._read(self.path))
+        data[-1] ^= 0xff
+        self._write(self.path, bytes(data))
+        with BTagFile(self.path, 'a') as records:
+            self.assertEqual(len(records), RECORDS - 1)
+        self.assertEqual(len(self._read(self.index_path)), 8*(RECORDS - 1))
+
+    def test_stale_index(self):
+        index = self._read(self.index_path)
+        # Records written but not indexed and a partial index entry
+        self._write(self.index_path, index[:-8*5 - 3])
+        with BTagFile(self.path) as records:
+            self.assertEqual(len(records), RECORDS)
+            self.assertEqual(records[-2].getEntry('i'), RECORDS - 2)
+        with BTagFile(self.path, 'a'):
+            pass
+        self.assertEqual(self._read(self.index_path), index)
+
+    def test_invalid_index(self):
+        index = self._read(self.index_path)
+        # Offsets which do not increase or point behind the data
+        self._write(self.index_path, index[:8*10] + index[:8] + b'\xff'*8)
+        with BTagFile(self.path, 'a') as records:
+            self.assertEqual(_numbers(records), list(range(RECORDS)))
+        self.assertEqual(self._read(self.index_path), index)
+
+    def test_missing_index(self):
+        index = self._read(self.index_path)
+        os.remove(self.index_path)
+        with BTagFile(self.path) as records:
+            self.assertEqual(len(records), RECORDS)
+        with BTagFile(self.path, 'a'):
+            pass
+        self.assertEqual(self._read(self.index_path), index)
+
+    def test_not_a_container(self):
+        self.assertRaises(ValueError, BTagFile, self.index_path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Incremental decoding with BTCDecoder across arbitrary chunk boundaries.
+"""
+
+import io
+import os
+import random
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.compression import BTagCompressedArr, Codec
+from pyBTC.decoder import BTCDecoder
+from pyBTC.stream import BTagStreamWriter
+
+class _UnseekableStream(io.RawIOBase):
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+def _document(i):
+    compound = BTagCompound()
+    compound.setInt('i', i)
+    compound.setString('s', 'x'*(i % 300))
+    compound.setStringArray('sa', ['a', '', 'c'*i])
+    nested = BTagCompound()
+    nested.setDoubleArray('d', [j*0.5 for j in range(i % 20)])
+    nested.setLong('l', 2**40 + i)
+    compound.setTag('nested', nested)
+    compound.setTag('delta', BTagDeltaLongArr([1000*j for j in range(i % 9)]))
+    size = 3000 if i % 4 == 0 else 3
+    compound.setTag('compressed', BTagCompressedArr(
+        BTagIntArr([j % 5 for j in range(size)]), Codec.ZLIB, threshold=100))
+    return compound
+
+def _unknownCountDocument():
+    """
+    Document with entry counts which are unknown in advance.
+    """
+
+    outstream = _UnseekableStream()
+    writer = BTagStreamWriter(outstream)
+    writer.begin_compound()
+    writer.write_int('a', 1)
+    writer.begin_compound('m')
+    writer.write_string('s', 'hi')
+    writer.end_compound()
+    writer.end_compound()
+    writer.close()
+    return bytes(outstream.data)
+
+class BTCDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.documents = [_document(i) for i in range(40)]
+        self.data = b''.join(compound.to_bytes()
+                             for compound in self.documents)
+
+    def _decode(self, decoder, data, chunk_sizes):
+        result = []
+        position = 0
+        while position < len(data):
+            size = next(chunk_sizes)
+            decoder.feed(data[position:position+size])
+            position += size
+            while True:
+                compound = decoder.next_document()
+                if compound is None:
+                    break
+                result.append(compound)
+        decoder.close()
+        return result
+
+    def _assertDocuments(self, result):
+        self.assertEqual([compound.to_bytes() for compound in result],
+                         [compound.to_bytes() for compound in self.documents])
+
+    def test_fixed_chunk_sizes(self):
+        for size in (1, 2, 3, 7, 64, 4096, len(self.data)):
+            decoder = BTCDecoder()
+            sizes = iter(lambda: size, None)
+            self._assertDocuments(self._decode(decoder, self.data, sizes))
+
+    def test_random_chunk_sizes(self):
+        generator = random.Random(3)
+        sizes = iter(lambda: generator.randint(1, 300), None)
+        self._assertDocuments(self._decode(BTCDecoder(), self.data, sizes))
+
+    def test_chunk_per_document(self):
+        decoder = BTCDecoder()
+        for compound in self.documents:
+            decoder.feed(compound.to_bytes())
+            self.assertEqual(decoder.pending(), 1)
+            self.assertEqual(decoder.next_document().to_bytes(),
+                             compound.to_bytes())
+            self.assertIsNone(decoder.next_document())
+
+    def test_unknown_entry_count(self):
+        data = _unknownCountDocument()
+        decoder = BTCDecoder()
+        result = self._decode(decoder, data*3, iter(lambda: 1, None))
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[2].getTag('m').getEntry('s'), 'hi')
+
+    def test_framed(self):
+        data = bytearray()
+        for compound in self.documents:
+            payload = compound.to_bytes()
+            encodeIntVar(data, len(payload))
+            data += payload
+        decoder = BTCDecoder(framed=True)
+        self._assertDocuments(self._decode(decoder, bytes(data),
+                                           iter(lambda: 5, None)))
+
+    def test_incomplete_document(self):
+        decoder = BTCDecoder()
+        decoder.feed(self.data[:50])
+        self.assertIsNone(decoder.next_document())
+        self.assertRaises(EOFError, decoder.close)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Delta arrays give the same bytes and values with and without numpy.
+"""
+
+import io
+import os
+import random
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC import serialization
+from pyBTC.btc import *
+
+def _cases(itemsize):
+    generator = random.Random(itemsize)
+    top = 256**itemsize
+    return [[], [0], [top - 1], [top - 1, 0, top - 1, 1, 2],
+            sorted(generator.randrange(top) for _ in range(1000)),
+            [generator.randrange(top) for _ in range(1000)],
+            list(range(10**6, 10**6 + 3000, 3))]
+
+class DeltaArrayTest(unittest.TestCase):
+
+    def tearDown(self):
+        serialization.ASSERT_NUMPY = ASSERT_NUMPY
+
+    def _pack(self, arr, itemsize):
+        data = packDeltaArray(arr, itemsize)
+        self.assertEqual(deltaArraySize(arr, itemsize), len(data))
+        self.assertEqual(list(unpackDeltaArray(data, len(arr), itemsize)),
+                         arr)
+        return data
+
+    def test_parity(self):
+        if not ASSERT_NUMPY:
+            self.skipTest("numpy is not available")
+        for itemsize in (4, 8):
+            for arr in _cases(itemsize):
+                serialization.ASSERT_NUMPY = True
+                data = self._pack(arr, itemsize)
+                serialization.ASSERT_NUMPY = False
+                self.assertEqual(self._pack(arr, itemsize), data)
+
+    def test_pure_python(self):
+        serialization.ASSERT_NUMPY = False
+        for itemsize in (4, 8):
+            for arr in _cases(itemsize):
+                self._pack(arr, itemsize)
+
+    def test_sorted_values_shrink(self):
+        arr = list(range(10**6, 10**6 + 3000, 3))
+        self.assertTrue(len(packDeltaArray(arr, 8)) < len(arr) + 8)
+
+    def test_encode_and_serialize(self):
+        arr = list(range(10**6, 10**6 + 3000, 3))
+        buf = bytearray(b'xx')
+        encodeDeltaArray(buf, arr, 4)
+        values, offset = decodeDeltaArray(bytes(buf), 2, 4)
+        self.assertEqual(list(values), arr)
+        self.assertEqual(offset, len(buf))
+        outstream = io.BytesIO()
+        serializeDeltaArray(outstream, arr, 4)
+        self.assertEqual(outstream.getvalue(), bytes(buf[2:]))
+        outstream.seek(0)
+        self.assertEqual(list(deserializeDeltaArray(outstream, 4)), arr)
+
+    def test_malformed_payload(self):
+        for assert_numpy in (ASSERT_NUMPY, False):
+            serialization.ASSERT_NUMPY = assert_numpy
+            # Truncated varint and bytes behind the last value
+            for data in (b'\x80', b'\x01\x01'):
+                self.assertRaises(ValueError, unpackDeltaArray, data, 1, 8)
+
+    def test_compound(self):
+        compound = BTagCompound()
+        compound.setTag('i', BTagDeltaIntArr([5, 3, 2**32 - 1, 0]))
+        compound.setTag('l', BTagDeltaLongArr([2**63, 1, 2**64 - 1]))
+        compound.setTag('e', BTagDeltaLongArr([]))
+        decoded = BTagCompound.from_bytes(compound.to_bytes())
+        self.assertEqual(list(decoded.getEntry('i')), [5, 3, 2**32 - 1, 0])
+        self.assertEqual(list(decoded.getEntry('l')), [2**63, 1, 2**64 - 1])
+        self.assertEqual(list(decoded.getEntry('e')), [])
+        self.assertEqual(decoded.to_bytes(), compound.to_bytes())
+
+    def test_delta_flag(self):
+        sorted_values = list(range(10**6, 10**6 + 3000, 3))
+        spread = [0, 2**32 - 1, 7, 2**31]
+        compound = BTagCompound()
+        compound.setIntArray('sorted', sorted_values, delta=True)
+        compound.setIntArray('spread', spread, delta=True)
+        compound.setLongArray('long', sorted_values, delta=True)
+        compound.setIntArray('plain', sorted_values)
+        self.assertTrue(isinstance(compound.getTag('sorted'), BTagDeltaIntArr))
+        self.assertTrue(isinstance(compound.getTag('spread'), BTagIntArr))
+        self.assertTrue(isinstance(compound.getTag('long'), BTagDeltaLongArr))
+        self.assertTrue(isinstance(compound.getTag('plain'), BTagIntArr))
+        decoded = BTagCompound.from_bytes(compound.to_bytes())
+        for tag, values in (('sorted', sorted_values), ('spread', spread),
+                            ('long', sorted_values)):
+            self.assertEqual(list(decoded.getEntry(tag)), values)
+
+if __name__ == "__main__":
+    unittest.main()
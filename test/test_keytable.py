@@ -0,0 +1,102 @@
+"""
+Keyed compound streams with a shared tag-name table.
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.keytable import *
+
+def _document(i):
+    compound = BTagCompound()
+    compound.setInt('identifier', i)
+    compound.setString('description', 'x'*(i % 5))
+    compound.setDoubleArray('measurements', [j*0.5 for j in range(i % 4)])
+    nested = BTagCompound()
+    nested.setLong('timestamp', 2**40 + i)
+    inner = BTagCompound()
+    inner.setShort('identifier', i % 7)
+    nested.setTag('inner', inner)
+    compound.setTag('metadata', nested)
+    return compound
+
+def _write(documents, keys=()):
+    outstream = io.BytesIO()
+    writer = KeyedWriter(outstream, keys)
+    for compound in documents:
+        writer.write(compound)
+    return outstream.getvalue()
+
+class KeyTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.documents = [_document(i) for i in range(20)]
+        self.plain = b''.join(compound.to_bytes()
+                              for compound in self.documents)
+
+    def _assertDocuments(self, result, documents=None):
+        if documents is None:
+            documents = self.documents
+        self.assertEqual([compound.to_bytes() for compound in result],
+                         [compound.to_bytes() for compound in documents])
+
+    def test_round_trip(self):
+        data = _write(self.documents)
+        self.assertTrue(len(data) < len(self.plain))
+        result = list(KeyedReader(io.BytesIO(data)))
+        self._assertDocuments(result)
+        # The keys of all documents are the same string objects
+        first, last = result[0], result[-1]
+        self.assertTrue(first._tags[0] is last._tags[0])
+        self.assertTrue(first.getTag('metadata')._tags[0] is
+                        last.getTag('metadata')._tags[0])
+
+    def test_lazy_documents(self):
+        documents = [BTagCompound.from_bytes(compound.to_bytes(), lazy=True)
+                     for compound in self.documents]
+        self._assertDocuments(KeyedReader(io.BytesIO(_write(documents))))
+
+    def test_predefined_keys(self):
+        keys = ['identifier', 'metadata']
+        data = _write(self.documents, keys)
+        self.assertTrue(len(data) < len(_write(self.documents)))
+        self._assertDocuments(KeyedReader(io.BytesIO(data), keys))
+        # Without the keys the references are undefined
+        self.assertRaises(ValueError, KeyedReader(io.BytesIO(data)).read)
+
+    def test_extended_keys(self):
+        compound = BTagCompound()
+        for i in range(600):
+            compound.setShort('k'+str(i), i)
+        documents = [compound, compound]
+        result = list(KeyedReader(io.BytesIO(_write(documents))))
+        self._assertDocuments(result, documents)
+
+    def test_end_of_stream(self):
+        self.assertEqual(list(KeyedReader(io.BytesIO(b''))), [])
+        data = _write(self.documents[:1])
+        reader = KeyedReader(io.BytesIO(data))
+        self.assertEqual(reader.read().to_bytes(),
+                         self.documents[0].to_bytes())
+        self.assertTrue(reader.read() is None)
+        self.assertTrue(reader.read() is None)
+
+    def test_invalid_streams(self):
+        self.assertRaises(ValueError, KeyedReader(io.BytesIO(self.plain)).read)
+        data = _write(self.documents[:1])
+        # Unknown count marker instead of the entry count
+        reader = KeyedReader(io.BytesIO(data + b'\xff'))
+        reader.read()
+        self.assertRaises(ValueError, reader.read)
+        # Reference to a key after the next unused one
+        reader = KeyedReader(io.BytesIO(b'BTCK\x00\x01\x05'))
+        self.assertRaises(ValueError, reader.read)
+
+if __name__ == "__main__":
+    unittest.main()
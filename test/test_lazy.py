@@ -0,0 +1,85 @@
+"""
+Lazily decoded compounds (BTagCompound.from_bytes with lazy=True).
+"""
+
+import copy
+import mmap
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+
+def _document():
+    compound = BTagCompound()
+    compound.setInt('i', 7)
+    compound.setString('s', 'text')
+    compound.setLongArray('la', [1, 2**40, 3])
+    compound.setDoubleArray('da', [0.5, -1.25])
+    nested = BTagCompound()
+    nested.setStringArray('sa', ['a', 'b'])
+    inner = BTagCompound()
+    inner.setShortArray('ha', [5, 6])
+    nested.setTag('inner', inner)
+    compound.setTag('nested', nested)
+    return compound
+
+class LazyCompoundTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = _document().to_bytes()
+
+    def _assertDocument(self, compound):
+        self.assertEqual(compound.getEntry('i'), 7)
+        self.assertEqual(list(compound.getEntry('la')), [1, 2**40, 3])
+        inner = compound.getTag('nested').getTag('inner')
+        self.assertEqual(list(inner.getEntry('ha')), [5, 6])
+        self.assertEqual(compound.to_bytes(), self.data)
+
+    def test_access(self):
+        for copy_arrays in (True, False):
+            lazy = BTagCompound.from_bytes(self.data, copy=copy_arrays,
+                                           lazy=True)
+            self.assertEqual(lazy.to_bytes(), self.data)
+            self._assertDocument(lazy)
+
+    def test_pickle(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            lazy = BTagCompound.from_bytes(self.data, lazy=True)
+            self._assertDocument(pickle.loads(pickle.dumps(lazy, protocol)))
+            # Partially decoded
+            lazy.getTag('nested')
+            self._assertDocument(pickle.loads(pickle.dumps(lazy, protocol)))
+
+    def test_deepcopy(self):
+        lazy = BTagCompound.from_bytes(self.data, lazy=True)
+        self._assertDocument(copy.deepcopy(lazy))
+        self._assertDocument(copy.copy(lazy))
+
+    def test_mmap(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'document.btc')
+            with open(path, 'wb') as f:
+                f.write(self.data)
+            with open(path, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                lazy = BTagCompound.from_bytes(buf, copy=False, lazy=True)
+                copies = [pickle.loads(pickle.dumps(lazy, protocol))
+                          for protocol in range(pickle.HIGHEST_PROTOCOL + 1)]
+                copies.append(copy.deepcopy(lazy))
+                buf.close()
+            # The copies do not reference the closed mmap
+            for compound in copies:
+                self._assertDocument(compound)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Parallel encoding and decoding of the top-level entries of compounds.
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.compression import BTagCompressedArr
+from pyBTC.parallel import *
+
+class _UnseekableReader(io.RawIOBase):
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._data.read(size)
+
+def _document():
+    compound = BTagCompound()
+    compound.setInt('i', 3)
+    compound.setLongArray('la', [2**40 + j for j in range(500)])
+    compound.setDoubleArray('da', [j*0.25 for j in range(300)])
+    compound.setStringArray('sa', ['s'*j for j in range(40)])
+    compound.setString('s', 'text')
+    nested = BTagCompound()
+    nested.setIntArray('ia', list(range(200)))
+    nested.setString('name', 'nested')
+    compound.setTag('nested', nested)
+    compound.setTag('delta', BTagDeltaLongArr(list(range(0, 3000, 3))))
+    compound.setTag('z', BTagCompressedArr(BTagIntArr([7]*2000)))
+    return compound
+
+# Small enough to decode most entries in the pool
+THRESHOLD = 64
+
+class ParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compound = _document()
+        self.data = self.compound.to_bytes()
+
+    def test_to_bytes(self):
+        for processes in (False, True):
+            self.assertEqual(toBytesParallel(self.compound, 2, processes,
+                                             THRESHOLD), self.data)
+        # Below the threshold nothing is sent to a pool
+        self.assertEqual(toBytesParallel(self.compound, 2, False), self.data)
+
+    def test_from_bytes(self):
+        for processes in (False, True):
+            compound = fromBytesParallel(self.data, 0, 2, processes,
+                                         THRESHOLD)
+            self.assertEqual(compound.to_bytes(), self.data)
+            self.assertEqual(list(compound.getEntry('la')),
+                             [2**40 + j for j in range(500)])
+        # At an offset within a larger buffer
+        compound = fromBytesParallel(b'xyz' + self.data + b'trailer', 3, 2,
+                                     False, THRESHOLD)
+        self.assertEqual(compound.to_bytes(), self.data)
+
+    def test_lazy_entries(self):
+        lazy = BTagCompound.from_bytes(self.data, lazy=True)
+        self.assertEqual(toBytesParallel(lazy, 2, True, THRESHOLD), self.data)
+
+    def test_stream_trailing_data(self):
+        outstream = io.BytesIO()
+        serializeParallel(outstream, self.compound, 2, False, THRESHOLD)
+        serializeParallel(outstream, self.compound, 2, False, THRESHOLD)
+        outstream.write(b'trailer')
+        data = outstream.getvalue()
+        self.assertEqual(data, self.data*2 + b'trailer')
+        for instream in (io.BytesIO(data), _UnseekableReader(data)):
+            for i in range(2):
+                compound = deserializeParallel(instream, 2, False, THRESHOLD)
+                self.assertEqual(compound.to_bytes(), self.data)
+            self.assertEqual(instream.read(), b'trailer')
+
+    def test_truncated_stream(self):
+        for instream in (io.BytesIO(self.data[:-3]),
+                         _UnseekableReader(self.data[:-3])):
+            self.assertRaises(EOFError, deserializeParallel, instream, 2,
+                              False, THRESHOLD)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+In-place patching of fixed-width values in serialized documents.
+"""
+
+import io
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.patch import *
+from pyBTC.stream import BTagStreamWriter
+
+def _document():
+    compound = BTagCompound()
+    compound.setByte('b', 1)
+    compound.setString('s', 'text')
+    compound.setDouble('d', 0.5)
+    nested = BTagCompound()
+    nested.setLong('l', 2**40)
+    nested.setIntArray('ia', list(range(10)))
+    nested.setFloatArray('fa', [0.5, 1.5])
+    compound.setTag('nested', nested)
+    return compound
+
+def _patch(target, offset=0):
+    """
+    Apply the changes of _patched to a serialized _document.
+    """
+
+    patchValue(target, 'b', 200, offset=offset)
+    patchValue(target, 'd', -2.25, offset=offset)
+    patchValue(target, ('nested', 'l'), 7, offset=offset)
+    patchValue(target, 'nested/ia', 99, index=-1, offset=offset)
+    patchValue(target, 'nested/ia', [20, 21], index=2, offset=offset)
+    patchValue(target, 'nested/fa', [-1.0, 2.0], offset=offset)
+
+def _patched():
+    compound = _document()
+    compound.setByte('b', 200)
+    compound.setDouble('d', -2.25)
+    nested = compound.getTag('nested')
+    nested.setLong('l', 7)
+    nested.setIntArray('ia', [0, 1, 20, 21, 4, 5, 6, 7, 8, 99])
+    nested.setFloatArray('fa', [-1.0, 2.0])
+    return compound
+
+class PatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = _document().to_bytes()
+        self.expected = _patched().to_bytes()
+
+    def test_buffer(self):
+        buf = bytearray(b'xyz' + self.data)
+        _patch(buf, 3)
+        self.assertEqual(bytes(buf[3:]), self.expected)
+        buf = bytearray(self.data)
+        _patch(memoryview(buf))
+        self.assertEqual(bytes(buf), self.expected)
+
+    def test_stream(self):
+        outstream = io.BytesIO(self.data)
+        _patch(outstream)
+        self.assertEqual(outstream.getvalue(), self.expected)
+
+    def test_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'document.btc')
+            with open(path, 'wb') as f:
+                f.write(self.data)
+            with open(path, 'r+b') as f:
+                _patch(f)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), self.expected)
+            with open(path, 'r+b') as f:
+                target = mmap.mmap(f.fileno(), 0)
+                patchValue(target, 'nested/ia', 3, index=0)
+                target.close()
+            compound = BTagCompound()
+            with open(path, 'rb') as f:
+                compound.deserialize(f)
+            self.assertEqual(compound.getTag('nested').getEntry('ia')[0], 3)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_unknown_counts(self):
+        outstream = io.BytesIO()
+        writer = BTagStreamWriter(outstream, seekable=False)
+        writer.begin_compound()
+        writer.write_tag('nested', _document())
+        writer.begin_compound('open')
+        writer.write_int('i', 1)
+        writer.close()
+        data = outstream.getvalue()
+        for target in (bytearray(data), io.BytesIO(data)):
+            patchValue(target, 'open/i', 5)
+            patchValue(target, 'nested/nested/l', 9)
+            if isinstance(target, io.BytesIO):
+                target = target.getvalue()
+            compound = BTagCompound.from_bytes(target)
+            self.assertEqual(compound.getTag('open').getEntry('i'), 5)
+            nested = compound.getTag('nested').getTag('nested')
+            self.assertEqual(nested.getEntry('l'), 9)
+
+    def test_locate(self):
+        for target in (self.data, io.BytesIO(self.data)):
+            type_id, offset = locateValue(target, 'nested/l')
+            self.assertEqual(type_id, DataType.UINT64)
+            self.assertEqual(decodeLong(self.data, offset)[0], 2**40)
+            self.assertEqual(locateValue(target, ['s'])[0], DataType.STRING)
+
+    def test_missing_entries(self):
+        for target in (bytearray(self.data), io.BytesIO(self.data)):
+            for path in ('x', 'nested/x', 'b/x', 'nested/l/x'):
+                self.assertRaises(KeyError, locateValue, target, path)
+                self.assertRaises(KeyError, patchValue, target, path, 1)
+        # Nothing has changed
+        self.assertEqual(target.getvalue(), self.data)
+
+    def test_invalid_patches(self):
+        for target in (bytearray(self.data), io.BytesIO(self.data)):
+            # Values of variable width
+            self.assertRaises(ValueError, patchValue, target, 's', 'txet')
+            self.assertRaises(ValueError, patchValue, target, 'nested', 1)
+            self.assertRaises(ValueError, patchValue, target, 'b', 1, 0)
+            self.assertRaises(ValueError, patchValue, target, 'nested/ia', 1)
+            self.assertRaises(ValueError, patchValue, target, 'nested/ia',
+                              [1, 2])
+            for index in (9, 10, -11):
+                self.assertRaises(IndexError, patchValue, target,
+                                  'nested/ia', [1, 2], index)
+        self.assertEqual(target.getvalue(), self.data)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Projection queries on serialized documents.
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.query import *
+from pyBTC.stream import BTagStreamWriter
+
+def _document():
+    compound = BTagCompound()
+    compound.setInt('id', 42)
+    compound.setString('name', 'doc')
+    meta = BTagCompound()
+    meta.setLong('created', 2**40)
+    meta.setStringArray('labels', ['a', 'b'])
+    inner = BTagCompound()
+    inner.setDouble('x', 0.5)
+    meta.setTag('inner', inner)
+    compound.setTag('meta', meta)
+    compound.setDoubleArray('samples', [0.25*j for j in range(100)])
+    compound.setTag('delta', BTagDeltaIntArr(list(range(50))))
+    compound.setShort('last', 7)
+    return compound
+
+PATHS = ['id', 'meta/created', ['meta', 'inner', 'x'], 'samples', 'last']
+
+class QueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = _document().to_bytes()
+        outstream = io.BytesIO()
+        writer = BTagStreamWriter(outstream, seekable=False)
+        writer.begin_compound()
+        writer.write_int('id', 42)
+        writer.write_string('name', 'doc')
+        writer.begin_compound('meta')
+        writer.write_long('created', 2**40)
+        writer.write_array('labels', ['a', 'b'])
+        writer.begin_compound('inner')
+        writer.write_double('x', 0.5)
+        writer.end_compound()
+        writer.end_compound()
+        writer.write_array('samples', [0.25*j for j in range(100)])
+        writer.write_tag('delta', BTagDeltaIntArr(list(range(50))))
+        writer.write_short('last', 7)
+        writer.close()
+        # The same document with unknown entry counts
+        self.unknown = outstream.getvalue()
+
+    def _targets(self):
+        for data in (self.data, self.unknown):
+            yield data, 0
+            yield bytearray(b'xyz' + data), 3
+            yield io.BytesIO(data + b'trailer'), 0
+
+    def test_values(self):
+        for target, offset in self._targets():
+            result = query(target, PATHS, offset)
+            # Lists of tags are keyed by tuples
+            self.assertEqual(len(result), len(PATHS))
+            self.assertEqual(result['id'], 42)
+            self.assertEqual(result['meta/created'], 2**40)
+            self.assertEqual(result[('meta', 'inner', 'x')], 0.5)
+            self.assertEqual(list(result['samples']),
+                             [0.25*j for j in range(100)])
+            self.assertEqual(result['last'], 7)
+            if isinstance(target, io.BytesIO):
+                # The stream is left behind the document
+                self.assertEqual(target.read(), b'trailer')
+
+    def test_compounds(self):
+        for target, offset in self._targets():
+            result = query(target, ['meta/inner', 'meta/inner/x', 'meta',
+                                    'meta/labels', 'delta'], offset)
+            self.assertTrue(isinstance(result['meta'], BTagCompound))
+            self.assertEqual(result['meta/inner'].getEntry('x'), 0.5)
+            # Paths below selected compounds are taken from them
+            self.assertEqual(result['meta/inner/x'], 0.5)
+            self.assertEqual(list(result['meta/labels']), ['a', 'b'])
+            self.assertEqual(list(result['delta']), list(range(50)))
+
+    def test_missing_paths(self):
+        for target, offset in self._targets():
+            result = query(target, ['id', 'nothing', 'meta/nothing',
+                                    'id/below', 'meta/inner/x/y',
+                                    'meta/inner/nothing'], offset, -1)
+            self.assertEqual(result['id'], 42)
+            for path in ('nothing', 'meta/nothing', 'id/below',
+                         'meta/inner/x/y', 'meta/inner/nothing'):
+                self.assertEqual(result[path], -1)
+        self.assertEqual(query(self.data, ['nothing']), {'nothing': None})
+
+    def test_duplicate_paths(self):
+        result = query(self.data, ['id', 'id', ['id'], 'meta', 'meta/inner'])
+        self.assertEqual(result['id'], 42)
+        self.assertEqual(result[('id',)], 42)
+        self.assertEqual(result['meta/inner'].getEntry('x'), 0.5)
+
+    def test_early_stop(self):
+        # Buffers are only walked until the last path is found, the cut
+        # entry behind is never read
+        end = len(self.data) - len(BTagShort(7).to_bytes()) - 7
+        result = query(self.data[:end], ['id', 'meta/inner/x'])
+        self.assertEqual(result, {'id': 42, 'meta/inner/x': 0.5})
+        self.assertEqual(query(self.data, []), {})
+        self.assertRaises(EOFError, query, self.data[:end], ['last'])
+
+if __name__ == "__main__":
+    unittest.main()
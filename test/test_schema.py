@@ -0,0 +1,113 @@
+"""
+Schema-compiled encoding and decoding of records with a fixed layout.
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.schema import *
+
+def _record(i):
+    compound = BTagCompound()
+    compound.setByte('b', i % 256)
+    compound.setShort('h', i*3 % 65536)
+    compound.setInt('i', i*7)
+    compound.setLong('l', 2**40 + i)
+    compound.setFloat('f', i*0.5)
+    compound.setDouble('d', -i*0.25)
+    return compound
+
+def _mixedRecord(i):
+    compound = _record(i)
+    compound.setString('s', 'x'*(i % 5))
+    compound.setInt('after', i)
+    compound.setIntArray('ia', list(range(i % 4)))
+    nested = BTagCompound()
+    nested.setDouble('nd', i*1.5)
+    compound.setTag('nested', nested)
+    compound.setDouble('last', 0.1)
+    return compound
+
+class SchemaTest(unittest.TestCase):
+
+    def _assertRecords(self, schema, records):
+        data = b''.join(record.to_bytes() for record in records)
+        buf = bytearray()
+        for record in records:
+            self.assertTrue(schema.matches(record))
+            schema.encode_into(buf, record)
+        self.assertEqual(bytes(buf), data)
+        outstream = io.BytesIO()
+        schema.serialize(outstream, records[0])
+        self.assertEqual(outstream.getvalue(), records[0].to_bytes())
+        offset = 0
+        for record in records:
+            decoded, offset = schema.decode(data, offset)
+            self.assertEqual(decoded.to_bytes(), record.to_bytes())
+            # Decoded records are independent of the schema
+            decoded.setInt('i', 1)
+            self.assertEqual(schema.decode(record.to_bytes())[0].to_bytes(),
+                             record.to_bytes())
+        self.assertEqual(offset, len(data))
+
+    def test_scalars(self):
+        records = [_record(i) for i in range(10)]
+        self._assertRecords(BTagSchema(records[0]), records)
+        decoded = BTagSchema(records[0]).decode(records[3].to_bytes())[0]
+        self.assertEqual(decoded.getEntry('l'), 2**40 + 3)
+        self.assertEqual(decoded.getEntry('d'), -0.75)
+
+    def test_variable_width_entries(self):
+        records = [_mixedRecord(i) for i in range(10)]
+        self._assertRecords(BTagSchema(records[0]), records)
+
+    def test_layout_pairs(self):
+        pairs = [('b', DataType.UINT8), ('h', DataType.UINT16),
+                 ('i', DataType.UINT32), ('l', DataType.UINT64),
+                 ('f', DataType.FLOAT), ('d', DataType.DOUBLE)]
+        records = [_record(i) for i in range(3)]
+        self._assertRecords(BTagSchema(pairs), records)
+        self._assertRecords(BTagSchema([]), [BTagCompound()])
+
+    def test_mismatch_fallback(self):
+        schema = BTagSchema(_record(0))
+        extra = _record(1)
+        extra.setInt('extra', 5)
+        retyped = _record(2)
+        retyped.setLong('i', 3)
+        reordered = BTagCompound()
+        for tag, value in reversed(_record(3).items()):
+            reordered.setTag(tag, value)
+        fewer = BTagCompound()
+        fewer.setByte('b', 1)
+        for record in (extra, retyped, reordered, fewer, _mixedRecord(4)):
+            self.assertFalse(schema.matches(record))
+            data = record.to_bytes()
+            # Encoded and decoded by the generic functions
+            self.assertEqual(schema.encode(record), data)
+            decoded, offset = schema.decode(data + b'trailer')
+            self.assertEqual(offset, len(data))
+            self.assertEqual(decoded.to_bytes(), data)
+        # Buffer shorter than the compiled struct
+        self.assertEqual(schema.decode(fewer.to_bytes())[0].to_bytes(),
+                         fewer.to_bytes())
+
+    def test_cached_compound(self):
+        schema = BTagSchema(_mixedRecord(0))
+        record = _mixedRecord(3)
+        record.enable_cache()
+        data = record.to_bytes()
+        self.assertEqual(schema.encode(record), data)
+        record.setInt('after', 77)
+        self.assertEqual(schema.encode(record), record.to_bytes())
+        self.assertEqual(schema.decode(schema.encode(record))[0]
+                         .getEntry('after'), 77)
+
+if __name__ == "__main__":
+    unittest.main()
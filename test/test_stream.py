@@ -0,0 +1,225 @@
+"""
+Documents written entry by entry with BTagStreamWriter and read as events
+with iterparse.
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC.btc import *
+from pyBTC.decoder import BTCDecoder
+from pyBTC.stream import *
+
+class _UnseekableStream(io.RawIOBase):
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+def _document():
+    compound = BTagCompound()
+    compound.setByte('b', 7)
+    compound.setShort('h', 300)
+    compound.setInt('i', 2**32 - 1)
+    compound.setLong('l', 2**40)
+    compound.setFloat('f', -3.25)
+    compound.setDouble('d', 0.1)
+    compound.setString('s', 'text')
+    nested = BTagCompound()
+    nested.setIntArray('ia', list(range(20)))
+    nested.setStringArray('sa', ['a', 'bc'])
+    nested.setTag('empty', BTagCompound())
+    compound.setTag('nested', nested)
+    compound.setDoubleArray('da', [0.5, -1.25])
+    compound.setTag('delta', BTagDeltaLongArr(list(range(0, 300, 3))))
+    return compound
+
+def _write(writer):
+    """
+    Write the entries of _document one by one.
+    """
+
+    writer.begin_compound()
+    writer.write_byte('b', 7)
+    writer.write_short('h', 300)
+    writer.write_int('i', 2**32 - 1)
+    writer.write_long('l', 2**40)
+    writer.write_float('f', -3.25)
+    writer.write_double('d', 0.1)
+    writer.write_string('s', 'text')
+    writer.begin_compound('nested')
+    writer.write_array('ia', list(range(20)), DataType.UINT32_ARR)
+    writer.write_array('sa', ['a', 'bc'])
+    writer.begin_compound('empty')
+    writer.end_compound()
+    writer.end_compound()
+    writer.write_array('da', [0.5, -1.25])
+    writer.write_tag('delta', BTagDeltaLongArr(list(range(0, 300, 3))))
+    writer.end_compound()
+
+def _written(outstream):
+    if isinstance(outstream, io.BytesIO):
+        return outstream.getvalue()
+    return bytes(outstream.data)
+
+class StreamWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = _document().to_bytes()
+
+    def _assertDocument(self, data):
+        compound = BTagCompound()
+        compound.deserialize(io.BytesIO(data))
+        self.assertEqual(compound.to_bytes(), self.data)
+        self.assertEqual(BTagCompound.from_bytes(data).to_bytes(), self.data)
+        # Lazy compounds keep the encoded bytes of nested compounds
+        lazy = BTagCompound.from_bytes(data, lazy=True)
+        self.assertEqual(BTagCompound.from_bytes(lazy.to_bytes()).to_bytes(),
+                         self.data)
+        self.assertEqual(skipValue(data, 0, DataType.COMPOUND), len(data))
+        decoder = BTCDecoder()
+        decoder.feed(data)
+        self.assertEqual(decoder.next_document().to_bytes(), self.data)
+
+    def test_seekable_stream(self):
+        outstream = io.BytesIO()
+        writer = BTagStreamWriter(outstream)
+        _write(writer)
+        self.assertEqual(writer.depth(), 0)
+        data = outstream.getvalue()
+        # The count is backpatched in the 8 byte representation
+        self.assertEqual(bytearray(data)[0], 3)
+        self.assertEqual(decodeIntVar(data, 0), (_document().size(), 9))
+        self._assertDocument(data)
+
+    def test_unseekable_stream(self):
+        for outstream, seekable in ((_UnseekableStream(), None),
+                                    (io.BytesIO(), False)):
+            writer = BTagStreamWriter(outstream, seekable)
+            _write(writer)
+            data = _written(outstream)
+            self.assertEqual(bytearray(data)[0], INTVAR_UNKNOWN)
+            self._assertDocument(data)
+
+    def test_documents_in_sequence(self):
+        for outstream in (io.BytesIO(), _UnseekableStream()):
+            for i in range(3):
+                _write(BTagStreamWriter(outstream))
+            instream = io.BytesIO(_written(outstream))
+            for i in range(3):
+                compound = BTagCompound()
+                compound.deserialize(instream)
+                self.assertEqual(compound.to_bytes(), self.data)
+            self.assertEqual(instream.read(), b'')
+
+    def test_close(self):
+        for outstream in (io.BytesIO(), _UnseekableStream()):
+            with BTagStreamWriter(outstream) as writer:
+                writer.begin_compound()
+                writer.begin_compound('a')
+                writer.begin_compound('b')
+                writer.write_int('i', 1)
+                self.assertEqual(writer.depth(), 3)
+            self.assertEqual(writer.depth(), 0)
+            compound = BTagCompound.from_bytes(_written(outstream))
+            self.assertEqual(compound.getTag('a').getTag('b').getEntry('i'),
+                             1)
+
+    def test_invalid_structure(self):
+        writer = BTagStreamWriter(io.BytesIO())
+        self.assertRaises(Exception, writer.write_int, 'i', 1)
+        self.assertRaises(Exception, writer.end_compound)
+        self.assertRaises(ValueError, writer.begin_compound, 'root')
+        writer.begin_compound()
+        self.assertRaises(ValueError, writer.begin_compound)
+        self.assertRaises(ValueError, writer.write_array, 'a', iter([1]))
+
+def _values(events):
+    """
+    Convert the arrays of events to lists for comparing.
+    """
+
+    return [(event, path, type_id,
+             value if type_id in FIXED_SIZES or value is None or
+             type_id == DataType.STRING else list(value))
+            for event, path, type_id, value in events]
+
+class IterparseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = [
+            ('start_compound', '', DataType.COMPOUND, None),
+            ('value', 'b', DataType.UINT8, 7),
+            ('value', 'h', DataType.UINT16, 300),
+            ('value', 'i', DataType.UINT32, 2**32 - 1),
+            ('value', 'l', DataType.UINT64, 2**40),
+            ('value', 'f', DataType.FLOAT, -3.25),
+            ('value', 'd', DataType.DOUBLE, 0.1),
+            ('value', 's', DataType.STRING, 'text'),
+            ('start_compound', 'nested', DataType.COMPOUND, None),
+            ('value', 'nested/ia', DataType.UINT32_ARR, list(range(20))),
+            ('value', 'nested/sa', DataType.STRING_ARR, ['a', 'bc']),
+            ('start_compound', 'nested/empty', DataType.COMPOUND, None),
+            ('end_compound', 'nested/empty', DataType.COMPOUND, None),
+            ('end_compound', 'nested', DataType.COMPOUND, None),
+            ('value', 'da', DataType.DOUBLE_ARR, [0.5, -1.25]),
+            ('value', 'delta', DataType.UINT64_DELTA_ARR,
+             list(range(0, 300, 3))),
+            ('end_compound', '', DataType.COMPOUND, None),
+        ]
+        self.documents = [_document().to_bytes()]
+        for outstream in (io.BytesIO(), _UnseekableStream()):
+            _write(BTagStreamWriter(outstream))
+            self.documents.append(_written(outstream))
+
+    def test_events(self):
+        for data in self.documents:
+            instream = io.BytesIO(data + b'trailer')
+            self.assertEqual(_values(iterparse(instream)), self.events)
+            # The stream is left behind the document
+            self.assertEqual(instream.read(), b'trailer')
+
+    def test_skip(self):
+        skipped = []
+        def skip(path, type_id):
+            skipped.append(path)
+            return path in ('nested', 'l', 'da', 'delta')
+        expected = [event for event in self.events
+                    if event[1] not in ('l', 'da', 'delta')
+                    and not event[1].startswith('nested')]
+        for data in self.documents:
+            del skipped[:]
+            instream = io.BytesIO(data + b'trailer')
+            self.assertEqual(_values(iterparse(instream, skip)), expected)
+            self.assertEqual(instream.read(), b'trailer')
+            # Entries of skipped compounds are not offered
+            self.assertEqual(skipped, ['b', 'h', 'i', 'l', 'f', 'd', 's',
+                                       'nested', 'da', 'delta'])
+
+    def test_stop(self):
+        for data in self.documents:
+            instream = io.BytesIO(data)
+            for event in iterparse(instream):
+                if event[1] == 's':
+                    break
+            self.assertEqual(event, ('value', 's', DataType.STRING, 'text'))
+            self.assertEqual(deserializeString8(instream), 'nested')
+
+    def test_truncated(self):
+        for data in self.documents:
+            events = iterparse(io.BytesIO(data[:-5]))
+            self.assertRaises(EOFError, list, events)
+
+if __name__ == "__main__":
+    unittest.main()
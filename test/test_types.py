@@ -0,0 +1,164 @@
+"""
+Tag types registered with registerTagType and unknown data types.
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC import btc
+from pyBTC.btc import *
+from pyBTC.decoder import BTCDecoder
+
+POINT = 100
+UNKNOWN = 101
+
+class BTagPoint(ABTag):
+    """
+    Pair of 4 byte unsigned integers.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, point=(0, 0)):
+        super(BTagPoint, self).__init__(tuple(point))
+
+    def get_type_id(self):
+        return POINT
+
+    def serialize(self, outstream):
+        serializeInt(outstream, self._data[0])
+        serializeInt(outstream, self._data[1])
+
+    def deserialize(self, instream):
+        self._data = (deserializeInt(instream), deserializeInt(instream))
+
+    def serialize_into(self, buf):
+        encodeInt(buf, self._data[0])
+        encodeInt(buf, self._data[1])
+
+    def deserialize_from(self, buf, offset, copy=True):
+        x, offset = decodeInt(buf, offset)
+        y, offset = decodeInt(buf, offset)
+        self._data = (x, y)
+        return offset
+
+    def to_string(self, increment):
+        return "p"+str(self._data)
+
+def _document():
+    compound = BTagCompound()
+    compound.setInt('i', 3)
+    compound.setTag('p', BTagPoint((1, 2**32 - 1)))
+    nested = BTagCompound()
+    nested.setTag('q', BTagPoint((5, 6)))
+    compound.setTag('nested', nested)
+    compound.setString('s', 'behind')
+    return compound
+
+class RegisteredTypeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.skipped = []
+        registerTagType(POINT, BTagPoint)
+
+    def tearDown(self):
+        for table in (btc._TAG_CLASSES, btc._DECODERS, btc._BUFFER_DECODERS,
+                      btc._SKIPPERS, btc._STREAM_SKIPPERS):
+            table.pop(POINT, None)
+
+    def _registerSkippers(self):
+        def skipper(buf, offset):
+            self.skipped.append('buffer')
+            return offset + 8
+        def stream_skipper(instream):
+            self.skipped.append('stream')
+            skipBytes(instream, 8)
+        registerTagType(POINT, BTagPoint, skipper=skipper,
+                        stream_skipper=stream_skipper)
+
+    def _assertDocument(self, compound, data):
+        self.assertEqual(compound.getTag('p').get_data(), (1, 2**32 - 1))
+        self.assertEqual(compound.getTag('nested').getTag('q').get_data(),
+                         (5, 6))
+        self.assertEqual(compound.getEntry('s'), 'behind')
+        self.assertEqual(compound.to_bytes(), data)
+
+    def test_round_trip(self):
+        data = _document().to_bytes()
+        outstream = io.BytesIO()
+        _document().serialize(outstream)
+        self.assertEqual(outstream.getvalue(), data)
+        compound = BTagCompound()
+        compound.deserialize(io.BytesIO(data))
+        self._assertDocument(compound, data)
+        self._assertDocument(BTagCompound.from_bytes(data), data)
+        self._assertDocument(BTagCompound.from_bytes(data, lazy=True), data)
+        decoder = BTCDecoder()
+        for i in range(len(data)):
+            decoder.feed(data[i:i+1])
+        self._assertDocument(decoder.next_document(), data)
+
+    def test_skip(self):
+        data = _document().to_bytes() + b'trailer'
+        for skippers in (False, True):
+            if skippers:
+                self._registerSkippers()
+            self.assertEqual(skipValue(data, 0, DataType.COMPOUND),
+                             len(data) - 7)
+            instream = io.BytesIO(data)
+            skipStreamValue(instream, DataType.COMPOUND)
+            self.assertEqual(instream.read(), b'trailer')
+        self.assertEqual(self.skipped, ['buffer']*2 + ['stream']*2)
+
+    def test_reregister(self):
+        self._registerSkippers()
+        # Registering again without skippers falls back to decoding
+        registerTagType(POINT, BTagPoint)
+        data = _document().to_bytes()
+        self.assertEqual(skipValue(data, 0, DataType.COMPOUND), len(data))
+        self.assertEqual(self.skipped, [])
+
+class UnknownTypeTest(unittest.TestCase):
+
+    def setUp(self):
+        buf = bytearray()
+        encodeIntVar(buf, 2)
+        encodeString8(buf, 'i')
+        encodeByte(buf, DataType.UINT32)
+        encodeInt(buf, 3)
+        encodeString8(buf, 'u')
+        encodeByte(buf, UNKNOWN)
+        buf += b'\x00'*8
+        self.data = bytes(buf)
+
+    def test_decode(self):
+        compound = BTagCompound()
+        self.assertRaises(ValueError, compound.deserialize,
+                          io.BytesIO(self.data))
+        self.assertRaises(ValueError, BTagCompound.from_bytes, self.data)
+        self.assertRaises(ValueError, deserializeValue,
+                          io.BytesIO(self.data), UNKNOWN)
+        self.assertRaises(ValueError, decodeValue, self.data, 0, UNKNOWN)
+
+    def test_skip(self):
+        self.assertRaises(ValueError, skipValue, self.data, 0,
+                          DataType.COMPOUND)
+        self.assertRaises(ValueError, skipStreamValue,
+                          io.BytesIO(self.data), DataType.COMPOUND)
+
+    def test_lazy(self):
+        # Lazy entries are skipped when the document is read
+        self.assertRaises(ValueError, BTagCompound.from_bytes, self.data,
+                          lazy=True)
+
+    def test_decoder(self):
+        decoder = BTCDecoder()
+        self.assertRaises(ValueError, decoder.feed, self.data)
+
+if __name__ == "__main__":
+    unittest.main()
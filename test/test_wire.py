@@ -0,0 +1,219 @@
+"""
+The serialized bytes stay identical to the wire format of the original
+element by element codec, and invalid arrays are refused.
+"""
+
+import binascii
+import io
+import os
+import sys
+import unittest
+
+# The directory containing the package (which is imported as pyBTC)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))))
+from pyBTC import serialization
+from pyBTC.btc import *
+from pyBTC.decoder import BTCDecoder
+from pyBTC.schema import BTagSchema
+
+# Serialization of _document() by the original codec
+GOLDEN = binascii.unhexlify(
+    '0012016202c801730360ea01690400286bee016c050700000000000010016606'
+    '0000d0c00164079a9999999999c93f02667a060000807f0464696e6607000000'
+    '000000f87f0373747201000568656c6c6f0262614100030001ff027361420003'
+    '0000ffff070002696143000300000000ffffffff39300000026c614400030000'
+    '000000000000ffffffffffffffff000000000001000002666145000500004040'
+    '0000807f0000e07f5f42220e0000c0ff026461460004182d4454fb2119400393'
+    '00aa4bdd5dfe000000000000f07f000000000000f87f03737461400003000161'
+    '0000000378797a016e00000201780401000000016d0000010464656570010003'
+    '79657305656d707479410000')
+
+def _document():
+    compound = BTagCompound()
+    compound.setByte('b', 200)
+    compound.setShort('s', 60000)
+    compound.setInt('i', 4000000000)
+    compound.setLong('l', 2**60 + 7)
+    compound.setFloat('f', -3.25)
+    compound.setDouble('d', 0.1)
+    compound.setFloat('fz', 0.0)
+    compound.setDouble('dinf', float('inf'))
+    compound.setString('str', 'hello')
+    compound.setByteArray('ba', [0, 1, 255])
+    compound.setShortArray('sa', [0, 65535, 7])
+    compound.setIntArray('ia', [0, 4294967295, 12345])
+    compound.setLongArray('la', [0, 2**64 - 1, 2**40])
+    compound.setFloatArray('fa', [1.5, -0.0, float('nan'), 1e-30,
+                                  float('-inf')])
+    compound.setDoubleArray('da', [3.141592653589793, -2.5e300, 0.0,
+                                   float('inf')])
+    compound.setStringArray('sta', ['a', '', 'xyz'])
+    nested = BTagCompound()
+    nested.setInt('x', 1)
+    inner = BTagCompound()
+    inner.setString('deep', 'yes')
+    nested.setTag('m', inner)
+    compound.setTag('n', nested)
+    compound.setByteArray('empty', [])
+    return compound
+
+class WireFormatTest(unittest.TestCase):
+
+    def tearDown(self):
+        serialization.ASSERT_NUMPY = ASSERT_NUMPY
+
+    def _assertGolden(self):
+        compound = _document()
+        outstream = io.BytesIO()
+        compound.serialize(outstream)
+        self.assertEqual(outstream.getvalue(), GOLDEN)
+        self.assertEqual(compound.to_bytes(), GOLDEN)
+
+    def test_serialize(self):
+        self._assertGolden()
+
+    def test_serialize_without_numpy(self):
+        serialization.ASSERT_NUMPY = False
+        self._assertGolden()
+
+    def test_reserialize(self):
+        compound = BTagCompound()
+        compound.deserialize(io.BytesIO(GOLDEN))
+        self.assertEqual(compound.to_bytes(), GOLDEN)
+        self.assertEqual(BTagCompound.from_bytes(GOLDEN).to_bytes(), GOLDEN)
+        lazy = BTagCompound.from_bytes(GOLDEN, lazy=True)
+        self.assertEqual(lazy.to_bytes(), GOLDEN)
+        self.assertEqual(lazy.getTag('n').getTag('m').getEntry('deep'),
+                         'yes')
+
+    def test_cache_and_schema(self):
+        compound = _document()
+        compound.enable_cache()
+        self.assertEqual(compound.to_bytes(), GOLDEN)
+        self.assertEqual(compound.to_bytes(), GOLDEN)
+        schema = BTagSchema(compound)
+        self.assertEqual(schema.encode(_document()), GOLDEN)
+        decoded, offset = schema.decode(GOLDEN)
+        self.assertEqual(offset, len(GOLDEN))
+        self.assertEqual(decoded.to_bytes(), GOLDEN)
+
+    def test_float_arrays_match_scalars(self):
+        values = [0.0, -0.0, 1.0, -1.5, 1e-40, 3.4e38, 1e300, -1e-300,
+                  float('inf'), float('-inf'), float('nan'), 0.1, 2.0/3]
+        # Within the exponent range of the 4 byte format
+        floats = values[:4] + [3.4e38, 1e-30] + values[8:]
+        scalars = bytearray()
+        for value in floats:
+            encodeFloat(scalars, value)
+        self.assertEqual(packFloatArray(floats), bytes(scalars))
+        scalars = bytearray()
+        for value in values:
+            encodeDouble(scalars, value)
+        self.assertEqual(packDoubleArray(values), bytes(scalars))
+
+
+class ArrayValidationTest(unittest.TestCase):
+
+    def tearDown(self):
+        serialization.ASSERT_NUMPY = ASSERT_NUMPY
+
+    def test_multidimensional_arrays(self):
+        if not ASSERT_NUMPY:
+            self.skipTest("numpy is not available")
+        matrix = numpy.arange(6).reshape(2, 3)
+        for btag_obj in (BTagIntArr(matrix), BTagDoubleArr(matrix*0.5),
+                         BTagDeltaIntArr(matrix)):
+            compound = BTagCompound()
+            compound.setTag('matrix', btag_obj)
+            self.assertRaises(ValueError, compound.to_bytes)
+
+    def test_out_of_range_integers(self):
+        for values in ([-1], [2**32], [2**64 - 1, -1]):
+            self.assertRaises((ValueError, OverflowError),
+                              packUIntArray, values, 4)
+        if ASSERT_NUMPY:
+            self.assertRaises(ValueError, packUIntArray,
+                              numpy.array([-1], dtype=numpy.int64), 4)
+            self.assertRaises(ValueError, packUIntArray,
+                              numpy.array([2**33 + 5]), 4)
+            for values in ([1.5], numpy.array([1.0, 2.5]), [float('nan')],
+                           numpy.array([float('inf')])):
+                self.assertRaises(ValueError, packUIntArray, values, 4)
+            self.assertRaises(ValueError, arrayTypeOf,
+                              numpy.array([-3, 5]))
+
+    def test_integral_floats(self):
+        expected = packUIntArray([2, 0, 2**40], 8)
+        self.assertEqual(packUIntArray([2.0, 0, 2.0**40], 8), expected)
+        if ASSERT_NUMPY:
+            self.assertEqual(packUIntArray(numpy.array([2., 0., 2.**40]), 8),
+                             expected)
+            self.assertRaises(ValueError, packUIntArray, [-1.0], 8)
+        compound = BTagCompound()
+        compound.setIntArray('a', [2.0])
+        self.assertEqual(list(BTagCompound.from_bytes(
+            compound.to_bytes()).getEntry('a')), [2])
+
+    def test_integral_floats_without_numpy(self):
+        serialization.ASSERT_NUMPY = False
+        for itemsize in (1, 2, 4, 8):
+            self.assertEqual(packUIntArray([2.0, 3], itemsize),
+                             packUIntArray([2, 3], itemsize))
+        if sys.version_info[0] >= 3:
+            # Python 2 arrays truncate floats
+            self.assertRaises(ValueError, packUIntArray, [1.5], 4)
+
+    def test_safe_integer_conversions(self):
+        self.assertEqual(packUIntArray([2**64 - 1, 0], 8),
+                         b'\xff'*8 + b'\x00'*8)
+        self.assertEqual(packUIntArray([], 2), b'')
+        if ASSERT_NUMPY:
+            self.assertEqual(packUIntArray(numpy.array([1, 2]), 2),
+                             b'\x01\x00\x02\x00')
+            self.assertEqual(arrayTypeOf(numpy.array([3, 5])),
+                             DataType.UINT64_ARR)
+
+# Compound with an unknown entry count (string entry 's' and END entry)
+UNKNOWN_COUNT = b'\xff' + b'\x01s\x01\x00\x02hi' + b'\x00\xff'
+
+class UnknownCountTest(unittest.TestCase):
+
+    def test_compound_count(self):
+        data = UNKNOWN_COUNT
+        compound = BTagCompound()
+        compound.deserialize(io.BytesIO(data))
+        self.assertEqual(compound.getEntry('s'), 'hi')
+        for lazy in (False, True):
+            compound = BTagCompound.from_bytes(data, lazy=lazy)
+            self.assertEqual(compound.getEntry('s'), 'hi')
+        self.assertEqual(skipValue(data, 0, DataType.COMPOUND), len(data))
+        instream = io.BytesIO(data)
+        skipStreamValue(instream, DataType.COMPOUND)
+        self.assertEqual(instream.tell(), len(data))
+        self.assertIsNone(deserializeIntVar(io.BytesIO(b'\xff'),
+                                            allow_unknown=True))
+        self.assertEqual(decodeIntVar(b'\xff', 0, allow_unknown=True),
+                         (None, 1))
+
+    def test_lengths(self):
+        self.assertRaises(ValueError, deserializeIntVar, io.BytesIO(b'\xff'))
+        self.assertRaises(ValueError, decodeIntVar, b'\xff', 0)
+        self.assertRaises(ValueError, deserializeString, io.BytesIO(b'\xff'))
+        self.assertRaises(ValueError, decodeString, b'\xff', 0)
+        for type_id in (DataType.STRING, DataType.UINT32_ARR,
+                        DataType.STRING_ARR, DataType.UINT64_DELTA_ARR):
+            # Compound with a single entry whose length is the marker
+            data = b'\x00\x01\x01v' + bytes(bytearray([type_id])) + b'\xff'
+            self.assertRaises(ValueError, BTagCompound().deserialize,
+                              io.BytesIO(data))
+            self.assertRaises(ValueError, BTagCompound.from_bytes, data)
+            self.assertRaises(ValueError, skipValue, data, 0,
+                              DataType.COMPOUND)
+            self.assertRaises(ValueError, skipStreamValue, io.BytesIO(data),
+                              DataType.COMPOUND)
+            decoder = BTCDecoder()
+            self.assertRaises(ValueError, decoder.feed, data)
+
+if __name__ == "__main__":
+    unittest.main()